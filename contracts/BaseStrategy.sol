@@ -148,10 +148,26 @@ interface StrategyAPI {
 
     function isActive() external view returns (bool);
 
+    function emergencyExit() external view returns (bool);
+
+    function doHealthCheck() external view returns (bool);
+
+    function healthCheck() external view returns (address);
+
     function delegatedAssets() external view returns (uint256);
 
     function estimatedTotalAssets() external view returns (uint256);
 
+    function minReportDelay() external view returns (uint256);
+
+    function maxReportDelay() external view returns (uint256);
+
+    function profitFactor() external view returns (uint256);
+
+    function debtThreshold() external view returns (uint256);
+
+    function ethToWant(uint256 _amtInWei) external view returns (uint256);
+
     function tendTrigger(uint256 callCost) external view returns (bool);
 
     function tend() external;
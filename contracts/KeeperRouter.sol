@@ -0,0 +1,130 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity >=0.6.0 <0.7.0;
+pragma experimental ABIEncoderV2;
+
+import {StrategyAPI} from "./BaseStrategy.sol";
+
+/**
+ * @title KeeperRouter
+ * @notice
+ *  Lets the keeper bot `harvest` or `tend` many Strategies in a single
+ *  transaction. Each Strategy is called inside its own try/catch, so one that
+ *  reverts (e.g. failing its health check) doesn't take the rest of the batch
+ *  down with it.
+ *
+ *  The router has to be set as the `keeper` of every Strategy it calls, and
+ *  only governance and the keepers it approves may call it.
+ */
+contract KeeperRouter {
+    address public governance;
+    address public pendingGovernance;
+    mapping(address => bool) public keepers;
+
+    event HarvestFailed(address indexed strategy, bytes reason);
+    event TendFailed(address indexed strategy, bytes reason);
+    event UpdateKeeper(address indexed keeper, bool allowed);
+    event UpdateGovernance(address governance);
+
+    modifier onlyGovernance() {
+        require(msg.sender == governance, "!governance");
+        _;
+    }
+
+    modifier onlyKeepers() {
+        require(msg.sender == governance || keepers[msg.sender], "!authorized");
+        _;
+    }
+
+    constructor(address _governance) public {
+        governance = _governance;
+    }
+
+    /**
+     * @notice
+     *  Nominate a new address to use as governance.
+     *
+     *  The change does not go into effect immediately. This function sets a
+     *  pending change, and the governance address is not updated until
+     *  the proposed governance address has accepted the responsibility.
+     *
+     *  This may only be called by the current governance address.
+     * @param _governance The address requested to take over governance.
+     */
+    function setGovernance(address _governance) external onlyGovernance {
+        pendingGovernance = _governance;
+    }
+
+    /**
+     * @notice
+     *  Once a new governance address has been proposed using setGovernance(),
+     *  this function may be called by the proposed address to accept the
+     *  responsibility of taking over governance for this contract.
+     *
+     *  This may only be called by the proposed governance address.
+     * @dev
+     *  setGovernance() should be called by the existing governance address,
+     *  prior to calling this function.
+     */
+    function acceptGovernance() external {
+        require(msg.sender == pendingGovernance, "!pendingGovernance");
+        governance = msg.sender;
+        emit UpdateGovernance(msg.sender);
+    }
+
+    /**
+     * @notice
+     *  Allow or disallow `keeper` to call the router.
+     *
+     *  This may only be called by governance.
+     * @param keeper The address of the keeper bot.
+     * @param allowed Whether it may call the router.
+     */
+    function setKeeper(address keeper, bool allowed) external onlyGovernance {
+        keepers[keeper] = allowed;
+        emit UpdateKeeper(keeper, allowed);
+    }
+
+    /**
+     * @notice
+     *  Call `harvest()` on each of `strategies`, in order. A Strategy that
+     *  reverts is skipped, and its revert data is emitted in `HarvestFailed`.
+     *
+     *  This may only be called by governance or an approved keeper.
+     * @dev
+     *  Calls to addresses without code can't be caught, and revert the batch.
+     * @param strategies The Strategies to harvest.
+     * @return succeeded Whether each Strategy's harvest succeeded.
+     */
+    function harvest(address[] calldata strategies) external onlyKeepers returns (bool[] memory succeeded) {
+        succeeded = new bool[](strategies.length);
+        for (uint256 i = 0; i < strategies.length; i++) {
+            try StrategyAPI(strategies[i]).harvest() {
+                succeeded[i] = true;
+            } catch (bytes memory reason) {
+                emit HarvestFailed(strategies[i], reason);
+            }
+        }
+    }
+
+    /**
+     * @notice
+     *  Call `tend()` on each of `strategies`, in order. A Strategy that
+     *  reverts is skipped, and its revert data is emitted in `TendFailed`.
+     *
+     *  This may only be called by governance or an approved keeper.
+     * @dev
+     *  Calls to addresses without code can't be caught, and revert the batch.
+     * @param strategies The Strategies to tend.
+     * @return succeeded Whether each Strategy's tend succeeded.
+     */
+    function tend(address[] calldata strategies) external onlyKeepers returns (bool[] memory succeeded) {
+        succeeded = new bool[](strategies.length);
+        for (uint256 i = 0; i < strategies.length; i++) {
+            try StrategyAPI(strategies[i]).tend() {
+                succeeded[i] = true;
+            } catch (bytes memory reason) {
+                emit TendFailed(strategies[i], reason);
+            }
+        }
+    }
+}
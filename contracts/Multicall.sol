@@ -0,0 +1,69 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity >=0.6.0 <0.7.0;
+pragma experimental ABIEncoderV2;
+
+/**
+ * @title Multicall
+ * @notice
+ *  Aggregates a batch of read-only calls into a single `eth_call`, so the
+ *  keeper bot can take a consistent snapshot of every Vault and Strategy it
+ *  watches at one block.
+ */
+contract Multicall {
+    struct Call {
+        address target;
+        bytes callData;
+    }
+
+    struct Result {
+        bool success;
+        bytes returnData;
+    }
+
+    /**
+     * @notice
+     *  Executes every call in `calls` with `staticcall` and returns the raw
+     *  return data of each, along with the block it was executed against.
+     * @param calls The calls to execute, in order.
+     * @param requireSuccess If true, revert the whole batch if any call fails.
+     * @return blockNumber The block number the batch was executed at.
+     * @return timestamp The timestamp of that block.
+     * @return results The success flag and return data of each call.
+     */
+    function aggregate(Call[] calldata calls, bool requireSuccess)
+        external
+        view
+        returns (
+            uint256 blockNumber,
+            uint256 timestamp,
+            Result[] memory results
+        )
+    {
+        blockNumber = block.number;
+        timestamp = block.timestamp;
+        results = new Result[](calls.length);
+        for (uint256 i = 0; i < calls.length; i++) {
+            (bool success, bytes memory returnData) = calls[i].target.staticcall(calls[i].callData);
+            if (requireSuccess) {
+                require(success, "!call");
+            }
+            results[i] = Result(success, returnData);
+        }
+    }
+
+    /**
+     * @notice
+     *  Returns the hash of the code deployed at `target`, so callers can tell
+     *  when it has been redeployed (e.g. with `CREATE2`).
+     * @dev
+     *  For a proxy, this is the hash of the proxy itself, which doesn't change
+     *  when it is upgraded to a new implementation.
+     * @param target The address to read the code hash of.
+     * @return codeHash The `extcodehash` of `target`.
+     */
+    function getCodeHash(address target) external view returns (bytes32 codeHash) {
+        assembly {
+            codeHash := extcodehash(target)
+        }
+    }
+}
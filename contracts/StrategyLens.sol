@@ -0,0 +1,104 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity >=0.6.0 <0.7.0;
+pragma experimental ABIEncoderV2;
+
+import {StrategyAPI, StrategyParams} from "./BaseStrategy.sol";
+
+interface VaultLensAPI {
+    function strategies(address _strategy) external view returns (StrategyParams memory);
+
+    function withdrawalQueue(uint256 index) external view returns (address);
+
+    function debtOutstanding(address strategy) external view returns (uint256);
+
+    function creditAvailable(address strategy) external view returns (uint256);
+}
+
+/**
+ * @title StrategyLens
+ * @notice
+ *  Reads everything needed to decide whether a Strategy should be harvested
+ *  in a single call, instead of one call per value. Keepers and dashboards
+ *  can read one Strategy, a list of them, or every Strategy in a Vault's
+ *  withdrawal queue at once.
+ *
+ *  The lens holds no state, so it only has to be deployed once per chain.
+ */
+contract StrategyLens {
+    // NOTE: Must match `MAXIMUM_STRATEGIES` in `Vault.vy`
+    uint256 public constant MAXIMUM_STRATEGIES = 20;
+
+    struct StrategyState {
+        address strategy;
+        address vault;
+        address keeper;
+        StrategyParams params;
+        uint256 debtOutstanding;
+        uint256 creditAvailable;
+        uint256 estimatedTotalAssets;
+        bool emergencyExit;
+        uint256 minReportDelay;
+        uint256 maxReportDelay;
+        uint256 profitFactor;
+        uint256 debtThreshold;
+    }
+
+    /**
+     * @notice
+     *  Read the state of `strategy`, and its parameters in its Vault.
+     * @param strategy The Strategy to read.
+     * @return state The state of `strategy`.
+     */
+    function strategyState(address strategy) public view returns (StrategyState memory state) {
+        StrategyAPI _strategy = StrategyAPI(strategy);
+        VaultLensAPI vault = VaultLensAPI(_strategy.vault());
+
+        state.strategy = strategy;
+        state.vault = address(vault);
+        state.keeper = _strategy.keeper();
+        state.params = vault.strategies(strategy);
+        state.debtOutstanding = vault.debtOutstanding(strategy);
+        state.creditAvailable = vault.creditAvailable(strategy);
+        state.estimatedTotalAssets = _strategy.estimatedTotalAssets();
+        state.emergencyExit = _strategy.emergencyExit();
+        state.minReportDelay = _strategy.minReportDelay();
+        state.maxReportDelay = _strategy.maxReportDelay();
+        state.profitFactor = _strategy.profitFactor();
+        state.debtThreshold = _strategy.debtThreshold();
+    }
+
+    /**
+     * @notice Read the state of each of `strategies`, in order.
+     * @param strategies The Strategies to read, which may be in different Vaults.
+     * @return states The state of each Strategy.
+     */
+    function strategyStates(address[] calldata strategies) external view returns (StrategyState[] memory states) {
+        states = new StrategyState[](strategies.length);
+        for (uint256 i = 0; i < strategies.length; i++) {
+            states[i] = strategyState(strategies[i]);
+        }
+    }
+
+    /**
+     * @notice Read the state of every Strategy in the withdrawal queue of `vault`.
+     * @dev Strategies that were added but not put in the queue are not included.
+     * @param vault The Vault to read the Strategies of.
+     * @return states The state of each Strategy, in withdrawal queue order.
+     */
+    function vaultStrategyStates(address vault) external view returns (StrategyState[] memory states) {
+        address[MAXIMUM_STRATEGIES] memory queue;
+        uint256 length = 0;
+        for (; length < MAXIMUM_STRATEGIES; length++) {
+            queue[length] = VaultLensAPI(vault).withdrawalQueue(length);
+            // NOTE: The queue is kept packed, so the first empty slot ends it
+            if (queue[length] == address(0)) {
+                break;
+            }
+        }
+
+        states = new StrategyState[](length);
+        for (uint256 i = 0; i < length; i++) {
+            states[i] = strategyState(queue[i]);
+        }
+    }
+}
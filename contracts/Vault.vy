@@ -215,6 +215,18 @@ strategies: public(HashMap[address, StrategyParams])
 MAXIMUM_STRATEGIES: constant(uint256) = 20
 DEGRADATION_COEFFICIENT: constant(uint256) = 10 ** 18
 
+# NOTE: Everything off-chain tools need to read the Vault in one call, see `vaultState()`
+struct VaultState:
+    totalAssets: uint256
+    totalDebt: uint256
+    debtRatio: uint256
+    lockedProfit: uint256  # As stored at `lastReport`, see `_calculateLockedProfit()`
+    lockedProfitDegradation: uint256
+    lastReport: uint256
+    totalSupply: uint256
+    numStrategies: uint256  # Length of the active withdrawal queue
+    withdrawalQueue: address[MAXIMUM_STRATEGIES]
+
 # Ordering that `withdraw` uses to determine which strategies to pull funds from
 # NOTE: Does *NOT* have to match the ordering of all the current strategies that
 #       exist, but it is recommended that it does or else withdrawal depth is
@@ -885,6 +897,39 @@ def totalAssets() -> uint256:
     """
     return self._totalAssets()
 
+
+@view
+@external
+def vaultState() -> VaultState:
+    """
+    @notice
+        Returns the totals of this Vault and its active withdrawal queue, all
+        in one call.
+
+        Entries past `numStrategies` are left empty. The parameters of each
+        Strategy aren't included (they don't fit in this contract), read them
+        with `strategies(strategy)` for each one, e.g. through a Multicall.
+    @return The state of this Vault and its withdrawal queue.
+    """
+    state: VaultState = empty(VaultState)
+    state.totalAssets = self._totalAssets()
+    state.totalDebt = self.totalDebt
+    state.debtRatio = self.debtRatio
+    state.lockedProfit = self.lockedProfit
+    state.lockedProfitDegradation = self.lockedProfitDegradation
+    state.lastReport = self.lastReport
+    state.totalSupply = self.totalSupply
+
+    for i in range(MAXIMUM_STRATEGIES):
+        strategy: address = self.withdrawalQueue[i]
+        if strategy == ZERO_ADDRESS:
+            break
+        state.withdrawalQueue[i] = strategy
+        state.numStrategies += 1
+
+    return state
+
+
 @view
 @internal
 def _calculateLockedProfit() -> uint256:
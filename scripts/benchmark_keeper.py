@@ -0,0 +1,27 @@
+"""
+Benchmark the keeper against a fleet deployed on a local chain
+
+    brownie run benchmark_keeper --network development
+
+The fleet and run length can be changed with `BENCHMARK_VAULTS`,
+`BENCHMARK_STRATEGIES` (per Vault, at most 20) and `BENCHMARK_BLOCKS`.
+"""
+from brownie import accounts, network, web3
+from scripts.keeper.benchmark import deploy_fleet, run_benchmark
+import os
+
+
+def main():
+    print(f"You are using the '{network.show_active()}' network")
+    gov, bot = accounts[0], accounts[1]
+
+    num_vaults = int(os.environ.get("BENCHMARK_VAULTS", 5))
+    strategies_per_vault = int(os.environ.get("BENCHMARK_STRATEGIES", 20))
+    num_blocks = int(os.environ.get("BENCHMARK_BLOCKS", 20))
+
+    print(f"Deploying {num_vaults} vaults with {strategies_per_vault} strategies each")
+    fleet = deploy_fleet(gov, bot, num_vaults, strategies_per_vault)
+
+    print(f"Running the keeper for {num_blocks} blocks")
+    report = run_benchmark(web3, fleet, bot, gov, num_blocks)
+    print(report.summary())
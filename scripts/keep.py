@@ -1,17 +1,22 @@
 """
 TODO: Adapt these to Badger Strats
 """
-from brownie import accounts, network, interface, Vault, Token
-from brownie.network.gas.strategies import GasNowScalingStrategy
+from brownie import accounts, network, web3, BadgerRegistry, KeeperRouter, Multicall
 from decimal import Decimal
 from eth_utils import is_checksum_address
+from scripts.keeper.discovery import StrategyDiscovery
+from scripts.keeper.engine import KeeperEngine
+from scripts.keeper.fees import FeeEstimator
+from scripts.keeper.journal import DEFAULT_PATH, KeeperJournal
+from scripts.keeper.loop import keeper_pass
+from scripts.keeper.metrics import DEFAULT_PORT, KeeperMetrics, serve_metrics
+from scripts.keeper.ranking import DEFAULT_GAS_BUDGET, HarvestRanker
+from scripts.keeper.router import batch_failures, submit_batch
+from scripts.keeper.scheduler import HarvestScheduler
+from scripts.keeper.transactions import TxPipeline
+import os
 import requests
-from time import sleep
-
-
-GAS_BUFFER = 1.2
-
-gas_strategy = GasNowScalingStrategy()
+import time
 
 
 def get_address(msg: str) -> str:
@@ -22,90 +27,209 @@ def get_address(msg: str) -> str:
         print(f"I'm sorry, but '{addr}' is not a checksummed address")
 
 
+def report_finished(finished, metrics):
+    for tx in finished:
+        metrics.record_finished(tx)
+        is_batch = isinstance(tx.key, tuple)
+        label = f"batch of {len(tx.key)}" if is_batch else tx.key
+        if tx.receipt is None:
+            print(f"[{label}] Transaction at nonce {tx.nonce} was dropped")
+            continue
+
+        status = "succeeded" if tx.success else "reverted"
+        print(
+            f"[{label}] {tx.receipt.txid} {status}, spent {tx.fee_paid / 10 ** 18} ETH on gas."
+        )
+        if is_batch and tx.success:
+            # NOTE: The router catches reverts, so these only show up as events
+            for strategy, reason in batch_failures(tx.receipt).items():
+                print(f"[{strategy}] Reverted inside the batch: {reason}")
+        if tx.fee_paid > 0:
+            # NOTE: Receipts restored from the journal only have the sender's address
+            balance = web3.eth.get_balance(str(tx.receipt.sender))
+            num_harvests = balance // tx.fee_paid
+            print(
+                f"At this rate, it'll take {num_harvests} harvests to run out of gas."
+            )
+
+
+def journaled_address(journal, key: str, msg: str) -> str:
+    addr = journal.get_config(key)
+    if addr is None:
+        addr = get_address(msg)
+        journal.set_config(key, addr)
+    return addr
+
+
+def send_call(pipeline, metrics, journal, strategy, name: str, tx_params: dict) -> int:
+    report_finished(pipeline.wait_for_capacity(), metrics)
+    try:
+        # NOTE: Fee bumps for stuck transactions are handled by the pipeline
+        pending = pipeline.submit(
+            getattr(strategy, name),
+            tx_params=tx_params,
+            key=strategy.address,
+        )
+    except:
+        print(f"[{strategy.address}] `{name}` call fails")
+        return 0
+    journal.record_tx(pending)
+    metrics.calls.inc(strategy=strategy.address, method=name)
+    return 1
+
+
+def send_batch(
+    pipeline, metrics, journal, router, name: str, strategies, tx_params: dict
+) -> int:
+    if len(strategies) == 0:
+        return 0
+    report_finished(pipeline.wait_for_capacity(), metrics)
+    try:
+        pending = submit_batch(pipeline, router, name, strategies, tx_params)
+    except:
+        print(f"[batch of {len(strategies)}] `{name}` call fails")
+        return 0
+    journal.record_tx(pending)
+    for strategy in strategies:
+        metrics.calls.inc(strategy=strategy.address, method=name)
+    return len(strategies)
+
+
+def report_discovery(update, scheduler):
+    for strategy in update.added:
+        print(f"[{strategy}] Found, now keeping")
+        scheduler.add(strategy)
+    for strategy in update.removed:
+        print(f"[{strategy}] Retired, no longer keeping")
+        scheduler.remove(strategy)
+    for strategy in update.ignored:
+        print(f"[{strategy}] Found, but bot is not set as keeper")
+
+
 def main():
     print(f"You are using the '{network.show_active()}' network")
     bot = accounts.load("bot")
     print(f"You are using: 'bot' [{bot.address}]")
-    # TODO: Allow adding/removing strategies during operation
-    strategies = [interface.StrategyAPI(get_address("Strategy to farm: "))]
-    while input("Add another strategy? (y/[N]): ").lower() == "y":
-        strategies.append(interface.StrategyAPI(get_address("Strategy to farm: ")))
-
-    vault = Vault.at(strategies[0].vault())
-    want = Token.at(vault.token())
 
-    for strategy in strategies:
-        assert (
-            strategy.keeper() == bot.address
-        ), "Bot is not set as keeper! [{strategy.address}]"
-        assert (
-            strategy.vault() == vault.address
-        ), f"Vault mismatch! [{strategy.address}]"
+    # NOTE: Everything needed to resume after a restart is kept here, so only
+    #       the first run asks for anything
+    journal = KeeperJournal(os.environ.get("KEEPER_JOURNAL", DEFAULT_PATH))
+    registry = BadgerRegistry.at(journaled_address(journal, "registry", "Registry: "))
+    author = journaled_address(journal, "author", "Vault author: ")
+    multicall = Multicall.at(journaled_address(journal, "multicall", "Multicall: "))
+
+    # NOTE: With a router, every due Strategy is sent in one transaction per
+    #       pass, and the router (not the bot) is the keeper of each of them
+    router = None
+    keeper = bot.address
+    if "KEEPER_ROUTER" in os.environ:
+        router = KeeperRouter.at(os.environ["KEEPER_ROUTER"])
+        keeper = router.address
+        print(f"Sending harvests and tends through the router at {keeper}")
+
+    # NOTE: Strategies come and go with the registry and Vault logs, so there is
+    #       no need to restart the bot when they change
+    discovery = StrategyDiscovery(web3, registry, author, keeper=keeper)
+    scheduler = HarvestScheduler()
+    latest = web3.eth.get_block("latest")
+    block_number, timestamp = latest.number, latest.timestamp
+
+    metrics = KeeperMetrics()
+    port = int(os.environ.get("KEEPER_METRICS_PORT", DEFAULT_PORT))
+    serve_metrics(metrics, port)
+    print(f"Serving metrics at http://127.0.0.1:{port}/metrics")
+
+    # NOTE: One engine serves every Vault, so the whole fleet is read in one
+    #       batched call per pass, as whoever calls the Strategies
+    engine = KeeperEngine(multicall, bot if router is None else keeper, metrics=metrics)
+    gas_cache = engine.gas_cache
+
+    # NOTE: Fees come from `eth_feeHistory` over a window of recent blocks
+    fees = FeeEstimator(web3)
+
+    # NOTE: Harvests are picked by value per gas within this much gas per block
+    ranker = HarvestRanker(int(os.environ.get("KEEPER_GAS_BUDGET", DEFAULT_GAS_BUDGET)))
+
+    # NOTE: Nonces are reconciled with the node's pending count on start, so
+    #       anything still in the mempool from a previous run isn't clobbered
+    pipeline = TxPipeline(bot, web3)
+    print(f"Starting at nonce {pipeline.nonces.next_nonce}")
+
+    if journal.restore(discovery, scheduler, engine, fees, pipeline):
+        print(
+            f"Resumed {len(discovery)} strategies from '{journal.path}' at block "
+            f"{discovery.last_block}, with {len(pipeline)} transactions in flight"
+        )
+    else:
+        report_discovery(discovery.discover(block_number), scheduler)
 
     while True:
-        starting_balance = bot.balance()
+        loop_started = time.perf_counter()
+        report_finished(pipeline.poll(), metrics)
+        report_discovery(discovery.update(block_number), scheduler)
+        for vault in discovery.vaults.values():
+            engine.add_vault(vault)
+
+        block_pass = keeper_pass(
+            block_number,
+            timestamp,
+            discovery.strategies,
+            scheduler,
+            engine,
+            fees,
+            ranker,
+            pipeline,
+            bot,
+            log=print,
+        )
+        if block_pass is None:
+            journal.checkpoint(discovery, scheduler, engine, fees, pipeline)
+            block_number, timestamp = scheduler.wait(web3, block_number, timestamp)
+            continue
 
         calls_made = 0
-        total_gas_estimate = 0
-        for strategy in strategies:
-            # Display some relevant statistics
-            symbol = want.symbol()
-            credit = vault.creditAvailable(strategy) / 10 ** vault.decimals()
-            print(f"[{strategy.address}] Credit Available: {credit:0.3f} {symbol}")
-            debt = vault.debtOutstanding(strategy) / 10 ** vault.decimals()
-            print(f"[{strategy.address}] Debt Outstanding: {debt:0.3f} {symbol}")
-
-            starting_gas_price = next(gas_strategy.get_gas_price())
-
-            try:
-                tend_gas_estimate = int(
-                    GAS_BUFFER * strategy.tend.estimate_gas({"from": bot})
-                )
-                total_gas_estimate += tend_gas_estimate
-            except ValueError:
-                print(f"[{strategy.address}] `tend` estimate fails")
-                tend_gas_estimate = None
-
-            try:
-                harvest_gas_estimate = int(
-                    GAS_BUFFER * strategy.harvest.estimate_gas({"from": bot})
-                )
-                total_gas_estimate += harvest_gas_estimate
-            except ValueError:
-                print(f"[{strategy.address}] `harvest` estimate fails")
-                harvest_gas_estimate = None
-
-            if harvest_gas_estimate and strategy.harvestTrigger(
-                harvest_gas_estimate * starting_gas_price
+        fee = block_pass.fee
+        if router is None:
+            for name, strategies in (
+                ("tend", block_pass.tends),
+                ("harvest", block_pass.harvests),
             ):
-                try:
-                    strategy.harvest({"from": bot, "gas_price": gas_strategy})
-                    calls_made += 1
-                except:
-                    print(f"[{strategy.address}] `harvest` call fails")
-
-            elif tend_gas_estimate and strategy.tendTrigger(
-                tend_gas_estimate * starting_gas_price
+                for strategy in strategies:
+                    calls_made += send_call(
+                        pipeline, metrics, journal, strategy, name, fee.tx_params()
+                    )
+        else:
+            for name, strategies in (
+                ("harvest", block_pass.harvests),
+                ("tend", block_pass.tends),
             ):
-                try:
-                    strategy.tend({"from": bot, "gas_price": gas_strategy})
-                    calls_made += 1
-                except:
-                    print(f"[{strategy.address}] `tend` call fails")
+                calls_made += send_batch(
+                    pipeline,
+                    metrics,
+                    journal,
+                    router,
+                    name,
+                    strategies,
+                    fee.tx_params(),
+                )
+
+        # NOTE: Revoked strategies are kept until all their debt is returned
+        for strategy in discovery.drop_retired(block_pass.snapshot):
+            print(f"[{strategy}] All debt returned, no longer keeping")
+            scheduler.remove(strategy)
+
+        print(f"Gas estimate cache: {gas_cache.hits} hits, {gas_cache.misses} misses")
 
         # Check running 10 `tend`s & `harvest`s per strategy at estimated gas price
         # would empty the balance of the bot account
-        if bot.balance() < 10 * total_gas_estimate * starting_gas_price:
+        if bot.balance() < 10 * block_pass.total_gas_estimate * fee.gas_price:
             print(f"Need more ether please! {bot.address}")
 
-        # Wait a minute if we didn't make any calls
         if calls_made > 0:
-            gas_cost = (starting_balance - bot.balance()) / 10 ** 18
-            num_harvests = bot.balance() // (starting_balance - bot.balance())
-            print(f"Made {calls_made} calls, spent {gas_cost} ETH on gas.")
-            print(
-                f"At this rate, it'll take {num_harvests} harvests to run out of gas."
-            )
-        else:
-            print("Sleeping for 60 seconds...")
-            sleep(60)
+            print(f"Sent {calls_made} calls, {len(pipeline)} transactions in flight.")
+
+        journal.checkpoint(discovery, scheduler, engine, fees, pipeline)
+        metrics.loop.observe(time.perf_counter() - loop_started)
+
+        # Sleep until the next block, or until another strategy becomes eligible
+        block_number, timestamp = scheduler.wait(web3, block_number, timestamp)
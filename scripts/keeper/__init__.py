@@ -0,0 +1,3 @@
+"""
+Building blocks for the keeper bot in `scripts/keep.py`
+"""
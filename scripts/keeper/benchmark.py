@@ -0,0 +1,285 @@
+"""
+Benchmark harness for the keeper bot
+
+Deploys a fleet of Vaults, each with up to `MAXIMUM_STRATEGIES` `TestStrategy`s,
+on a local chain and runs the keeper against it for a fixed number of blocks.
+Yield is simulated the same way `NormalOperation.rule_harvest` does it, by
+transferring tokens straight to each Strategy before every block.
+
+For every block, the harness records how long the keeper's pass took and how
+many RPC requests it made, and for every transaction it sent, the gas it used.
+Deployment and yield transfers happen outside of the measured window.
+"""
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from brownie import Multicall, TestStrategy, Token, Vault, chain
+
+from scripts.keeper.discovery import MAXIMUM_STRATEGIES
+from scripts.keeper.engine import KeeperEngine
+from scripts.keeper.fees import FeeEstimate, FeeEstimator
+from scripts.keeper.loop import keeper_pass
+from scripts.keeper.ranking import HarvestRanker
+from scripts.keeper.scheduler import HarvestScheduler
+from scripts.keeper.transactions import DEFAULT_POLL_INTERVAL, TxPipeline
+
+
+MAX_BPS = 10_000
+MAX_UINT256 = 2 ** 256 - 1
+DEFAULT_YIELD_BPS = 100  # 1% per block, same as `NormalOperation.rule_harvest`
+DEFAULT_BLOCK_TIME = 13  # seconds
+
+
+@dataclass
+class FleetVault:
+    vault: object
+    token: object
+    strategies: List = field(default_factory=list)
+
+
+@dataclass
+class Fleet:
+    multicall: object
+    vaults: List[FleetVault] = field(default_factory=list)
+
+    @property
+    def strategies(self) -> List:
+        return [strategy for item in self.vaults for strategy in item.strategies]
+
+
+def deploy_fleet(
+    gov, keeper, num_vaults: int, strategies_per_vault: int = MAXIMUM_STRATEGIES
+) -> Fleet:
+    """
+    Deploy `num_vaults` Vaults, each with its own token and `strategies_per_vault`
+    Strategies sharing all of its debt. `gov` holds the rest of every token,
+    and acts as the farm that pays out the yield.
+    """
+    if not 0 < strategies_per_vault <= MAXIMUM_STRATEGIES:
+        raise ValueError(f"Vaults hold at most {MAXIMUM_STRATEGIES} Strategies")
+
+    fleet = Fleet(gov.deploy(Multicall))
+    debt_ratio = MAX_BPS // strategies_per_vault
+    for _ in range(num_vaults):
+        token = gov.deploy(Token, 18)
+        vault = gov.deploy(Vault)
+        vault.initialize(token, gov, gov, "", "", gov, gov, {"from": gov})
+        vault.setDepositLimit(MAX_UINT256, {"from": gov})
+
+        amount = token.balanceOf(gov) // 2
+        token.approve(vault, amount, {"from": gov})
+        vault.deposit(amount, {"from": gov})
+
+        item = FleetVault(vault, token)
+        for _ in range(strategies_per_vault):
+            strategy = gov.deploy(TestStrategy)
+            strategy.initialize(vault, gov, gov, keeper, {"from": gov})
+            vault.addStrategy(strategy, debt_ratio, 0, MAX_UINT256, 1000, {"from": gov})
+            item.strategies.append(strategy)
+        fleet.vaults.append(item)
+
+    return fleet
+
+
+def simulate_yield(fleet: Fleet, farm, yield_bps: int = DEFAULT_YIELD_BPS):
+    for item in fleet.vaults:
+        for strategy in item.strategies:
+            amount = item.token.balanceOf(strategy) * yield_bps // MAX_BPS
+            if amount > 0:
+                item.token.transfer(strategy, amount, {"from": farm})
+
+
+class RpcCounter:
+    """
+    Counts every JSON-RPC request made through `web3`, by method, while
+    `counting` is active. Safe to use with the engine's thread pool.
+    """
+
+    def __init__(self, web3):
+        self.web3 = web3
+        self.requests = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def total(self) -> int:
+        return sum(self.requests.values())
+
+    def _middleware(self, make_request, web3):
+        def middleware(method, params):
+            with self._lock:
+                self.requests[method] += 1
+            return make_request(method, params)
+
+        return middleware
+
+    @contextmanager
+    def counting(self):
+        # NOTE: The provider caches its middleware chain, so requests can only be
+        #       intercepted reliably by adding (and removing) a middleware
+        self.web3.middleware_onion.add(self._middleware, "rpc_counter")
+        try:
+            yield self
+        finally:
+            self.web3.middleware_onion.remove("rpc_counter")
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if len(values) == 0:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class BenchmarkReport:
+    num_vaults: int
+    num_strategies: int
+    loop_latencies: List[float] = field(default_factory=list)  # seconds, per block
+    rpc_calls: List[int] = field(default_factory=list)  # per block
+    rpc_methods: Counter = field(default_factory=Counter)
+    # NOTE: Gas used by each mined transaction, by method name
+    gas_used: Dict[str, List[int]] = field(default_factory=dict)
+    reverted: int = 0
+    deferred: int = 0  # harvests left out of a block by the gas budget
+
+    @property
+    def harvests(self) -> int:
+        return len(self.gas_used.get("harvest", []))
+
+    def gas_per_call(self, method: str) -> float:
+        gas_used = self.gas_used.get(method, [])
+        return sum(gas_used) / len(gas_used) if len(gas_used) > 0 else 0.0
+
+    def summary(self) -> str:
+        latencies = self.loop_latencies
+        blocks = max(len(latencies), 1)
+        lines = [
+            f"Fleet: {self.num_vaults} vaults, {self.num_strategies} strategies",
+            f"Blocks: {len(latencies)}",
+            "Loop latency: "
+            f"mean {sum(latencies) / blocks:0.3f}s, "
+            f"p50 {_percentile(latencies, 0.5):0.3f}s, "
+            f"p95 {_percentile(latencies, 0.95):0.3f}s, "
+            f"max {max(latencies, default=0.0):0.3f}s",
+            f"RPC calls: {sum(self.rpc_calls) / blocks:0.1f} per block "
+            f"({sum(self.rpc_calls)} total)",
+        ]
+        for method, count in self.rpc_methods.most_common():
+            lines.append(f"  {method}: {count}")
+        for method in sorted(self.gas_used):
+            lines.append(
+                f"Gas per {method}: {self.gas_per_call(method):0.0f} "
+                f"({len(self.gas_used[method])} sent)"
+            )
+        lines.append(f"Reverted: {self.reverted}")
+        lines.append(f"Deferred: {self.deferred}")
+        return "\n".join(lines)
+
+
+class _KeeperRun:
+    """
+    The same `keeper_pass` as `scripts/keep.py` runs, without discovery, the
+    journal or any logging, and with blocks mined by the harness instead of
+    waited on.
+    """
+
+    def __init__(self, web3, fleet: Fleet, bot, report: BenchmarkReport):
+        self.report = report
+        self.bot = bot
+        self.strategies = {strategy.address: strategy for strategy in fleet.strategies}
+        self.engine = KeeperEngine(fleet.multicall, bot)
+        for item in fleet.vaults:
+            self.engine.add_vault(item.vault)
+        self.scheduler = HarvestScheduler(self.strategies)
+        self.ranker = HarvestRanker()
+        self.pipeline = TxPipeline(bot, web3)
+        self.fees = FeeEstimator(web3)
+        self._methods: Dict[int, str] = {}
+
+    def _record(self, finished):
+        for tx in finished:
+            method = self._methods.pop(tx.nonce)
+            if tx.receipt is None:
+                continue
+            self.report.gas_used.setdefault(method, []).append(tx.gas_used)
+            if not tx.success:
+                self.report.reverted += 1
+
+    def _send(self, strategy, name: str, fee: FeeEstimate):
+        self._record(self.pipeline.wait_for_capacity())
+        pending = self.pipeline.submit(
+            getattr(strategy, name),
+            tx_params=fee.tx_params(),
+            key=strategy.address,
+        )
+        self._methods[pending.nonce] = name
+
+    def step(self, block_number: int, timestamp: int):
+        self._record(self.pipeline.poll())
+        block_pass = keeper_pass(
+            block_number,
+            timestamp,
+            self.strategies,
+            self.scheduler,
+            self.engine,
+            self.fees,
+            self.ranker,
+            self.pipeline,
+            self.bot,
+        )
+        if block_pass is None:
+            return
+
+        self.report.deferred += len(block_pass.deferred)
+        for name, strategies in (
+            ("tend", block_pass.tends),
+            ("harvest", block_pass.harvests),
+        ):
+            for strategy in strategies:
+                self._send(strategy, name, block_pass.fee)
+
+    def drain(self):
+        self._record(self.pipeline.poll())
+        while len(self.pipeline) > 0:
+            time.sleep(DEFAULT_POLL_INTERVAL)
+            self._record(self.pipeline.poll())
+
+
+def run_benchmark(
+    web3,
+    fleet: Fleet,
+    bot,
+    farm,
+    num_blocks: int,
+    yield_bps: int = DEFAULT_YIELD_BPS,
+    block_time: int = DEFAULT_BLOCK_TIME,
+) -> BenchmarkReport:
+    """
+    Run the keeper with `bot` against `fleet` for `num_blocks` blocks, with
+    `farm` paying out `yield_bps` of each Strategy's balance before every one.
+    """
+    report = BenchmarkReport(len(fleet.vaults), len(fleet.strategies))
+    run = _KeeperRun(web3, fleet, bot, report)
+    counter = RpcCounter(web3)
+
+    for _ in range(num_blocks):
+        simulate_yield(fleet, farm, yield_bps)
+        chain.sleep(block_time)
+        chain.mine()
+        block = chain[-1]
+
+        calls_before = counter.total
+        with counter.counting():
+            started = time.perf_counter()
+            run.step(block.number, block.timestamp)
+            report.loop_latencies.append(time.perf_counter() - started)
+        report.rpc_calls.append(counter.total - calls_before)
+
+    # NOTE: Picks up the receipts of whatever was sent in the last block
+    run.drain()
+    report.rpc_methods = counter.requests
+    return report
@@ -0,0 +1,233 @@
+"""
+Registry-driven Strategy discovery for the keeper bot
+
+The initial set of Strategies is every Strategy in the `withdrawalQueue` of
+every Vault an author has added to `BadgerRegistry`. After that, the set is
+kept current from the logs emitted since the last update, so Vaults and
+Strategies can come and go without rescanning everything or restarting.
+
+NOTE: A revoked Strategy still has to be harvested to return its debt, so it
+      is only dropped once a snapshot shows it has none left.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+
+from brownie import Vault, interface
+from eth_utils import event_abi_to_log_topic, to_checksum_address
+from hexbytes import HexBytes
+
+
+MAXIMUM_STRATEGIES = 20  # Size of `Vault.withdrawalQueue`
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+REGISTRY_EVENTS = ("NewVault", "RemoveVault")
+VAULT_EVENTS = ("StrategyAdded", "StrategyRevoked", "StrategyMigrated")
+
+
+@dataclass
+class DiscoveryUpdate:
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    # NOTE: Strategies that were found, but have someone else as keeper
+    ignored: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.ignored)
+
+
+def _event_abis(abi, names) -> Dict[bytes, dict]:
+    return {
+        bytes(event_abi_to_log_topic(item)): item
+        for item in abi
+        if item["type"] == "event" and item["name"] in names
+    }
+
+
+def _decode_addresses(event_abi: dict, log) -> Dict[str, str]:
+    """
+    Decode the `address` arguments of a log. Every argument of the events used
+    here is static, so each one is a single 32 byte word.
+    """
+    topics = iter(log["topics"][1:])
+    data = HexBytes(log["data"])
+    words = iter(data[i : i + 32] for i in range(0, len(data), 32))
+    decoded = {}
+    for arg in event_abi["inputs"]:
+        word = HexBytes(next(topics) if arg["indexed"] else next(words))
+        if arg["type"] == "address":
+            decoded[arg["name"]] = to_checksum_address(word[-20:])
+    return decoded
+
+
+class StrategyDiscovery:
+    def __init__(self, web3, registry, author: str, keeper: Optional[str] = None):
+        self.web3 = web3
+        self.registry = registry
+        self.author = author
+        # NOTE: If set, only Strategies with this keeper are tracked
+        self.keeper = keeper
+        self.vaults: Dict[str, object] = {}
+        self.strategies: Dict[str, object] = {}
+        self.vault_of: Dict[str, str] = {}
+        self.retiring: Set[str] = set()
+        self.last_block: Optional[int] = None
+        self._registry_events = _event_abis(registry.abi, REGISTRY_EVENTS)
+        self._vault_events = _event_abis(Vault.abi, VAULT_EVENTS)
+
+    def __contains__(self, strategy: str) -> bool:
+        return strategy in self.strategies
+
+    def __len__(self) -> int:
+        return len(self.strategies)
+
+    def by_vault(self) -> Dict[str, List]:
+        grouped = {vault: [] for vault in self.vaults}
+        for address, strategy in self.strategies.items():
+            grouped[self.vault_of[address]].append(strategy)
+        return grouped
+
+    def _add_strategy(self, vault: str, address: str, update: DiscoveryUpdate):
+        if address in self.strategies:
+            return
+        strategy = interface.StrategyAPI(address)
+        if self.keeper is not None and strategy.keeper() != self.keeper:
+            update.ignored.append(address)
+            return
+        self.strategies[address] = strategy
+        self.vault_of[address] = vault
+        update.added.append(address)
+
+    def _remove_strategy(self, address: str, update: DiscoveryUpdate):
+        if address not in self.strategies:
+            return
+        del self.strategies[address]
+        del self.vault_of[address]
+        self.retiring.discard(address)
+        update.removed.append(address)
+
+    def _add_vault(self, address: str, block_number: int, update: DiscoveryUpdate):
+        if address in self.vaults:
+            return
+        vault = Vault.at(address)
+        self.vaults[address] = vault
+        for idx in range(MAXIMUM_STRATEGIES):
+            strategy = vault.withdrawalQueue(idx, block_identifier=block_number)
+            if strategy == ZERO_ADDRESS:
+                break  # NOTE: The queue is always kept packed
+            self._add_strategy(address, strategy, update)
+
+    def _remove_vault(self, address: str, update: DiscoveryUpdate):
+        if self.vaults.pop(address, None) is None:
+            return
+        for strategy in [s for s, vault in self.vault_of.items() if vault == address]:
+            self._remove_strategy(strategy, update)
+
+    def restore(
+        self,
+        vaults: Iterable[str],
+        vault_of: Dict[str, str],
+        retiring: Iterable[str],
+        last_block: int,
+    ):
+        """
+        Pick up from the state of an earlier run instead of calling `discover`.
+        Later calls to `update` only replay the logs since `last_block`.
+        """
+        for address in vaults:
+            self.vaults[address] = Vault.at(address)
+        for address, vault in vault_of.items():
+            self.strategies[address] = interface.StrategyAPI(address)
+            self.vault_of[address] = vault
+        self.retiring = set(retiring)
+        self.last_block = last_block
+
+    def discover(self, block_number: Optional[int] = None) -> DiscoveryUpdate:
+        """
+        Build the full set from scratch as of `block_number` (default: latest).
+        Later calls to `update` pick up from there.
+        """
+        if block_number is None:
+            block_number = self.web3.eth.block_number
+
+        update = DiscoveryUpdate()
+        for vault in self.registry.fromAuthor(
+            self.author, block_identifier=block_number
+        ):
+            self._add_vault(vault, block_number, update)
+        self.last_block = block_number
+        return update
+
+    def _get_logs(self, addresses, events, from_block: int, to_block: int):
+        if len(addresses) == 0:
+            return []
+        return self.web3.eth.get_logs(
+            {
+                "address": list(addresses),
+                "fromBlock": from_block,
+                "toBlock": to_block,
+                # NOTE: Matches any of these events in the first topic
+                "topics": [["0x" + topic.hex() for topic in events]],
+            }
+        )
+
+    def update(self, to_block: Optional[int] = None) -> DiscoveryUpdate:
+        """
+        Apply every relevant log emitted since the last update, up to `to_block`.
+        """
+        if self.last_block is None:
+            return self.discover(to_block)
+        if to_block is None:
+            to_block = self.web3.eth.block_number
+        if to_block <= self.last_block:
+            return DiscoveryUpdate()
+
+        from_block = self.last_block + 1
+        logs = self._get_logs(
+            [self.registry.address], self._registry_events, from_block, to_block
+        ) + self._get_logs(self.vaults, self._vault_events, from_block, to_block)
+
+        update = DiscoveryUpdate()
+        # NOTE: Replay in the order they were emitted
+        for log in sorted(logs, key=lambda log: (log["blockNumber"], log["logIndex"])):
+            topic = bytes(HexBytes(log["topics"][0]))
+            if topic in self._registry_events:
+                event_abi = self._registry_events[topic]
+                args = _decode_addresses(event_abi, log)
+                if args["author"] != self.author:
+                    continue
+                if event_abi["name"] == "NewVault":
+                    # NOTE: Its queue already reflects anything it emitted since
+                    self._add_vault(args["vault"], to_block, update)
+                else:
+                    self._remove_vault(args["vault"], update)
+                continue
+
+            vault = to_checksum_address(log["address"])
+            if vault not in self.vaults:
+                continue  # NOTE: Removed earlier in this batch
+
+            event_abi = self._vault_events[topic]
+            args = _decode_addresses(event_abi, log)
+            if event_abi["name"] == "StrategyAdded":
+                self._add_strategy(vault, args["strategy"], update)
+            elif event_abi["name"] == "StrategyRevoked":
+                if args["strategy"] in self.strategies:
+                    self.retiring.add(args["strategy"])
+            else:  # StrategyMigrated
+                # NOTE: All of the old version's debt moves to the new one
+                self._remove_strategy(args["oldVersion"], update)
+                self._add_strategy(vault, args["newVersion"], update)
+
+        self.last_block = to_block
+        return update
+
+    def drop_retired(self, snapshot) -> List[str]:
+        """
+        Stop tracking revoked Strategies that a snapshot shows have no debt left.
+        """
+        update = DiscoveryUpdate()
+        for address in list(self.retiring):
+            strategy = snapshot.strategies.get(address)
+            if strategy is not None and strategy.params.totalDebt == 0:
+                self._remove_strategy(address, update)
+        return update.removed
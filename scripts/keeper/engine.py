@@ -0,0 +1,331 @@
+"""
+Concurrent read engine for the keeper bot
+
+Brownie calls are blocking, so every RPC read is pushed onto a thread pool and
+awaited from asyncio. A semaphore bounds how many reads are in flight at once,
+so a large fleet doesn't hammer the node.
+
+One engine serves Strategies across any number of Vaults. Which Vault each
+Strategy belongs to, and the static details of each Vault, are read once and
+cached.
+
+A pass goes through three stages:
+1. Every Vault's and Strategy's state is read in one batched `eth_call` (see
+   `snapshot.py`)
+2. Strategies that can't trigger a harvest at any gas price are ruled out
+   off-chain (see `triggers.py`), everything else has its gas estimated
+   concurrently, unless a recent estimate is still valid (see `gas_cache.py`)
+3. The triggers are read in a second batched `eth_call` with those estimates
+
+Strategies that can't be read (or whose Vault can't be) are left out of the
+pass and reported in `KeeperSnapshot.unreadable`, so one broken Strategy
+doesn't stop the rest of the fleet from being kept.
+
+Harvests that triggered can then be simulated before they are sent (see
+`health.py`), so the ones that would revert are never broadcast.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from brownie import Vault
+
+from scripts.keeper.gas_cache import GasEstimateCache, GasFingerprint, fingerprint
+from scripts.keeper.health import (
+    HarvestSimulation,
+    read_health_checks,
+    simulate_harvest,
+)
+from scripts.keeper.metrics import KeeperMetrics
+from scripts.keeper.snapshot import (
+    KeeperSnapshot,
+    StrategySnapshot,
+    VaultInfo,
+    read_strategy_vaults,
+    read_triggers,
+    read_vault_info,
+    take_snapshot,
+)
+from scripts.keeper.triggers import can_harvest_trigger
+
+
+GAS_BUFFER = 1.2
+DEFAULT_CONCURRENCY = 16
+
+
+@dataclass
+class StrategyReads:
+    strategy: object
+    snapshot: StrategySnapshot
+    tend_gas_estimate: Optional[int]
+    harvest_gas_estimate: Optional[int]
+    harvest_trigger: Optional[bool] = None
+    tend_trigger: Optional[bool] = None
+    # NOTE: True if `harvestTrigger` was ruled out off-chain, without estimating gas
+    ruled_out: bool = False
+
+    @property
+    def credit(self) -> int:
+        return self.snapshot.credit_available
+
+    @property
+    def debt(self) -> int:
+        return self.snapshot.debt_outstanding
+
+    @property
+    def harvest_triggered(self) -> bool:
+        return bool(self.harvest_trigger)
+
+    @property
+    def tend_triggered(self) -> bool:
+        # NOTE: Same precedence as before, `tend` is only considered if `harvest` isn't
+        return not self.harvest_triggered and bool(self.tend_trigger)
+
+    @property
+    def gas_estimate(self) -> int:
+        # NOTE: Failed estimates don't count towards the bot's balance check
+        return (self.tend_gas_estimate or 0) + (self.harvest_gas_estimate or 0)
+
+
+class KeeperEngine:
+    def __init__(
+        self,
+        multicall,
+        bot,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        onchain_triggers: Iterable[str] = (),
+        gas_cache: Optional[GasEstimateCache] = None,
+        metrics: Optional[KeeperMetrics] = None,
+    ):
+        self.multicall = multicall
+        self.bot = bot
+        self.concurrency = concurrency
+        # NOTE: Strategies that override `harvestTrigger` can't be evaluated off-chain
+        self.onchain_triggers = set(onchain_triggers)
+        self.gas_cache = GasEstimateCache() if gas_cache is None else gas_cache
+        self.metrics = KeeperMetrics() if metrics is None else metrics
+        self.vaults: Dict[str, object] = {}
+        self.vault_info: Dict[str, VaultInfo] = {}
+        self._vault_of: Dict[str, str] = {}
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+        self._semaphore = None
+
+    def add_vault(self, vault):
+        """
+        Use an already loaded Vault contract, instead of loading it when one of
+        its Strategies is first seen.
+        """
+        self.vaults.setdefault(vault.address, vault)
+
+    def restore(self, vault_of: Dict[str, str], vault_info: Dict[str, VaultInfo]):
+        """
+        Seed what would otherwise be read the first time each Strategy and
+        Vault is seen, e.g. from the journal of an earlier run.
+        """
+        self._vault_of.update(vault_of)
+        self.vault_info.update(vault_info)
+
+    def vault_of(self, strategy: str) -> str:
+        return self._vault_of[strategy]
+
+    async def _call(self, fn, *args):
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def _estimate(self, method, name: str) -> Optional[int]:
+        estimate_gas = self.metrics.gas_estimate.timed(method.estimate_gas, method=name)
+        try:
+            return int(GAS_BUFFER * await self._call(estimate_gas, {"from": self.bot}))
+        except ValueError:
+            return None
+
+    async def _cached_estimate(
+        self, strategy, method: str, fingerprint: GasFingerprint, block_number: int
+    ) -> Optional[int]:
+        estimate = self.gas_cache.get(
+            strategy.address, method, fingerprint, block_number
+        )
+        if estimate is None:
+            estimate = await self._estimate(getattr(strategy, method), method)
+            # NOTE: Failed estimates aren't cached, they may only fail transiently
+            if estimate is not None:
+                self.gas_cache.put(
+                    strategy.address, method, fingerprint, block_number, estimate
+                )
+        return estimate
+
+    async def _skip(self) -> None:
+        return None
+
+    async def _group_by_vault(
+        self, strategies
+    ) -> Tuple[Dict[str, List], Dict[str, str]]:
+        unknown = [
+            strategy
+            for strategy in strategies
+            if strategy.address not in self._vault_of
+        ]
+        if len(unknown) > 0:
+            self._vault_of.update(
+                await self._call(
+                    self.metrics.rpc_read.timed(
+                        read_strategy_vaults, call="strategy_vaults"
+                    ),
+                    self.multicall,
+                    unknown,
+                )
+            )
+
+        groups = {}
+        unreadable = {}
+        for strategy in strategies:
+            if strategy.address in self._vault_of:
+                groups.setdefault(self._vault_of[strategy.address], []).append(strategy)
+            else:
+                unreadable[strategy.address] = "vault"
+
+        for address in groups:
+            if address not in self.vaults:
+                self.vaults[address] = await self._call(Vault.at, address)
+        new_vaults = [
+            self.vaults[address] for address in groups if address not in self.vault_info
+        ]
+        if len(new_vaults) > 0:
+            self.vault_info.update(
+                await self._call(
+                    self.metrics.rpc_read.timed(read_vault_info, call="vault_info"),
+                    self.multicall,
+                    new_vaults,
+                )
+            )
+        for address in list(groups):
+            if address not in self.vault_info:
+                for strategy in groups.pop(address):
+                    unreadable[strategy.address] = f"details of {address}"
+        return groups, unreadable
+
+    def ruled_out(self, snapshot: StrategySnapshot, timestamp: int) -> bool:
+        return (
+            snapshot.address not in self.onchain_triggers
+            and not can_harvest_trigger(snapshot, timestamp)
+        )
+
+    async def estimate_strategy(
+        self, strategy, snapshot: KeeperSnapshot, estimate_harvest: bool = True
+    ) -> Tuple[Optional[int], Optional[int]]:
+        key = fingerprint(
+            snapshot.vault_of(strategy.address), snapshot.strategies[strategy.address]
+        )
+        return await asyncio.gather(
+            (
+                self._cached_estimate(strategy, "harvest", key, snapshot.block_number)
+                if estimate_harvest
+                else self._skip()
+            ),
+            self._cached_estimate(strategy, "tend", key, snapshot.block_number),
+        )
+
+    async def read_all(
+        self, strategies, gas_price: int
+    ) -> Tuple[KeeperSnapshot, List[StrategyReads]]:
+        # NOTE: Semaphore must be created inside the running event loop
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        groups, unreadable = await self._group_by_vault(strategies)
+        snapshot = await self._call(
+            self.metrics.rpc_read.timed(take_snapshot, call="snapshot"),
+            self.multicall,
+            [(self.vaults[address], group) for address, group in groups.items()],
+        )
+        snapshot = replace(snapshot, unreadable={**unreadable, **snapshot.unreadable})
+        strategies = [
+            strategy
+            for strategy in strategies
+            if strategy.address in snapshot.strategies
+        ]
+
+        with self.metrics.trigger_evaluation.time(where="offchain"):
+            ruled_out = [
+                self.ruled_out(
+                    snapshot.strategies[strategy.address], snapshot.timestamp
+                )
+                for strategy in strategies
+            ]
+        estimates = await asyncio.gather(
+            *(
+                self.estimate_strategy(strategy, snapshot, estimate_harvest=not skip)
+                for strategy, skip in zip(strategies, ruled_out)
+            )
+        )
+
+        call_costs = {
+            strategy.address: tuple(
+                None if estimate is None else estimate * gas_price
+                for estimate in strategy_estimates
+            )
+            for strategy, strategy_estimates in zip(strategies, estimates)
+        }
+        triggers = await self._call(
+            self.metrics.trigger_evaluation.timed(read_triggers, where="onchain"),
+            self.multicall,
+            strategies,
+            call_costs,
+        )
+
+        return snapshot, [
+            StrategyReads(
+                strategy,
+                snapshot.strategies[strategy.address],
+                tend_gas_estimate,
+                harvest_gas_estimate,
+                *triggers[strategy.address],
+                ruled_out=skip,
+            )
+            for strategy, (harvest_gas_estimate, tend_gas_estimate), skip in zip(
+                strategies, estimates, ruled_out
+            )
+        ]
+
+    def run_pass(
+        self, strategies, gas_price: int
+    ) -> Tuple[KeeperSnapshot, List[StrategyReads]]:
+        return asyncio.run(self.read_all(strategies, gas_price))
+
+    async def simulate_all(
+        self, snapshot: KeeperSnapshot, strategies
+    ) -> Dict[str, HarvestSimulation]:
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        # NOTE: Only to explain the simulations that revert, see `health.py`
+        configs = await self._call(
+            self.metrics.rpc_read.timed(read_health_checks, call="health_checks"),
+            self.multicall,
+            strategies,
+        )
+        simulate = self.metrics.rpc_read.timed(
+            simulate_harvest, call="simulate_harvest"
+        )
+        simulations = await asyncio.gather(
+            *(
+                self._call(
+                    simulate,
+                    strategy,
+                    self.bot,
+                    snapshot.strategies[strategy.address],
+                    snapshot.block_number,
+                    configs[strategy.address],
+                )
+                for strategy in strategies
+            )
+        )
+        return {simulation.strategy: simulation for simulation in simulations}
+
+    def preflight(
+        self, snapshot: KeeperSnapshot, strategies
+    ) -> Dict[str, HarvestSimulation]:
+        """
+        Simulate `harvest` for each of `strategies` at the block of `snapshot`.
+        """
+        if len(strategies) == 0:
+            return {}
+        return asyncio.run(self.simulate_all(snapshot, strategies))
@@ -0,0 +1,163 @@
+"""
+EIP-1559 fee estimator for the keeper bot
+
+Fees are worked out from `eth_feeHistory` over a rolling window of recent
+blocks. The window is cached, so each new block only fetches the blocks added
+since the last update, and the estimate is computed once per block and shared
+by everything the keeper sends in it.
+
+The priority fee is a percentile of the rewards paid across the window, and the
+max fee leaves room for the base fee to keep rising for a few blocks. Nodes
+without EIP-1559 (no `baseFeePerGas` in their blocks) fall back to `eth_gasPrice`.
+"""
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Iterable, Optional
+
+
+DEFAULT_WINDOW = 20  # blocks
+# NOTE: Each block's reward is its priority fee at this percentile of gas used,
+#       and the priority fee is this percentile of those rewards over the window
+DEFAULT_REWARD_PERCENTILE = 50
+DEFAULT_WINDOW_PERCENTILE = 50
+# NOTE: Covers the base fee going up by 12.5% in each of the next ~6 blocks
+DEFAULT_BASE_FEE_MULTIPLIER = 2
+DEFAULT_PRIORITY_FEE = 10 ** 9  # when no block in the window had any transactions
+
+
+def _to_int(value) -> int:
+    # NOTE: Raw RPC results are hex strings, formatted ones are already ints
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+@dataclass(frozen=True)
+class FeeBlock:
+    number: int
+    base_fee: int
+    gas_used_ratio: float
+    reward: int  # priority fee at `reward_percentile` of the gas used
+
+
+@dataclass(frozen=True)
+class FeeEstimate:
+    block_number: int
+    # NOTE: All `None` for nodes without EIP-1559
+    base_fee: Optional[int]  # of the next block
+    priority_fee: Optional[int]
+    max_fee: Optional[int]
+    gas_price: int  # expected price paid per unit of gas
+
+    @property
+    def is_legacy(self) -> bool:
+        return self.base_fee is None
+
+    @property
+    def max_gas_price(self) -> int:
+        # NOTE: The most that could be paid per unit of gas, for budgeting
+        return self.gas_price if self.is_legacy else self.max_fee
+
+    def tx_params(self) -> dict:
+        if self.is_legacy:
+            return {"gas_price": self.gas_price}
+        return {"max_fee": self.max_fee, "priority_fee": self.priority_fee}
+
+
+class FeeEstimator:
+    def __init__(
+        self,
+        web3,
+        window: int = DEFAULT_WINDOW,
+        reward_percentile: float = DEFAULT_REWARD_PERCENTILE,
+        window_percentile: float = DEFAULT_WINDOW_PERCENTILE,
+        base_fee_multiplier: float = DEFAULT_BASE_FEE_MULTIPLIER,
+        default_priority_fee: int = DEFAULT_PRIORITY_FEE,
+    ):
+        self.web3 = web3
+        self.window = window
+        self.reward_percentile = reward_percentile
+        self.window_percentile = window_percentile
+        self.base_fee_multiplier = base_fee_multiplier
+        self.default_priority_fee = default_priority_fee
+        self.blocks: Deque[FeeBlock] = deque(maxlen=window)
+        self.next_base_fee: Optional[int] = None
+        # NOTE: Unknown until the first estimate
+        self.supports_eip1559: Optional[bool] = None
+        self._estimate: Optional[FeeEstimate] = None
+
+    def restore(
+        self,
+        blocks: Iterable[FeeBlock],
+        next_base_fee: Optional[int],
+        supports_eip1559: Optional[bool],
+    ):
+        """
+        Resume with the window of an earlier run, so only newer blocks are fetched.
+        """
+        self.blocks.extend(blocks)
+        self.next_base_fee = next_base_fee
+        self.supports_eip1559 = supports_eip1559
+
+    def _fee_history(self, block_count: int, newest_block: int):
+        return self.web3.manager.request_blocking(
+            "eth_feeHistory",
+            [hex(block_count), hex(newest_block), [self.reward_percentile]],
+        )
+
+    def update(self, block_number: int):
+        """
+        Extend the window up to `block_number`, only fetching blocks that aren't
+        in it already.
+        """
+        first = max(block_number - self.window + 1, 0)
+        if len(self.blocks) > 0:
+            if block_number <= self.blocks[-1].number:
+                return
+            first = max(first, self.blocks[-1].number + 1)
+
+        history = self._fee_history(block_number - first + 1, block_number)
+        oldest = _to_int(history["oldestBlock"])
+        # NOTE: Has one more item than the others, the next block's base fee
+        base_fees = [_to_int(fee) for fee in history["baseFeePerGas"]]
+        rewards = history.get("reward") or []
+        for idx, ratio in enumerate(history["gasUsedRatio"]):
+            reward = _to_int(rewards[idx][0]) if idx < len(rewards) else 0
+            self.blocks.append(FeeBlock(oldest + idx, base_fees[idx], ratio, reward))
+        self.next_base_fee = base_fees[-1]
+
+    def priority_fee(self) -> int:
+        # NOTE: Empty blocks report a reward of zero, which says nothing
+        rewards = sorted(block.reward for block in self.blocks if block.gas_used_ratio)
+        if len(rewards) == 0:
+            return self.default_priority_fee
+        idx = int(self.window_percentile / 100 * len(rewards))
+        return rewards[min(idx, len(rewards) - 1)]
+
+    def estimate(self, block_number: Optional[int] = None) -> FeeEstimate:
+        """
+        Fees to send with at `block_number` (default: latest). Computed once per
+        block, later calls for the same block return the same estimate.
+        """
+        if block_number is None:
+            block_number = self.web3.eth.block_number
+        if self._estimate is not None and self._estimate.block_number == block_number:
+            return self._estimate
+
+        if self.supports_eip1559 is None:
+            block = self.web3.eth.get_block(block_number)
+            self.supports_eip1559 = block.get("baseFeePerGas") is not None
+
+        if not self.supports_eip1559:
+            gas_price = self.web3.eth.gas_price
+            self._estimate = FeeEstimate(block_number, None, None, None, gas_price)
+            return self._estimate
+
+        self.update(block_number)
+        priority_fee = self.priority_fee()
+        self._estimate = FeeEstimate(
+            block_number=block_number,
+            base_fee=self.next_base_fee,
+            priority_fee=priority_fee,
+            max_fee=int(self.base_fee_multiplier * self.next_base_fee) + priority_fee,
+            gas_price=self.next_base_fee + priority_fee,
+        )
+        return self._estimate
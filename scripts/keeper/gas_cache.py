@@ -0,0 +1,103 @@
+"""
+Gas estimate cache for the keeper bot
+
+The gas used by `tend` and `harvest` mostly depends on how much the Strategy
+has to move around, so an estimate stays good for as long as those inputs don't
+change. Estimates are cached per Strategy against a fingerprint of those
+inputs (taken from the same snapshot the keeper already reads), and dropped
+once they are too many blocks old.
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from scripts.keeper.snapshot import StrategySnapshot, VaultSnapshot
+
+
+DEFAULT_MAX_AGE = 100  # blocks
+
+
+@dataclass(frozen=True)
+class GasFingerprint:
+    total_debt: int
+    vault_balance: int
+    debt_outstanding: int
+    emergency_exit: bool
+    # NOTE: Of the code at the Strategy's own address. A proxy keeps its code when
+    #       it is upgraded, so estimates from before an upgrade are only dropped
+    #       once they are `max_age` blocks old
+    code_hash: bytes
+
+
+def fingerprint(vault: VaultSnapshot, strategy: StrategySnapshot) -> GasFingerprint:
+    return GasFingerprint(
+        total_debt=strategy.params.totalDebt,
+        vault_balance=vault.total_idle,
+        debt_outstanding=strategy.debt_outstanding,
+        emergency_exit=strategy.emergency_exit,
+        code_hash=bytes(strategy.code_hash),
+    )
+
+
+@dataclass
+class CacheEntry:
+    fingerprint: GasFingerprint
+    block_number: int
+    estimate: int
+
+
+class GasEstimateCache:
+    def __init__(self, max_age: int = DEFAULT_MAX_AGE):
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Tuple[str, str], CacheEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def get(
+        self, strategy: str, method: str, fingerprint: GasFingerprint, block_number: int
+    ) -> Optional[int]:
+        """
+        The cached estimate for calling `method` on `strategy`, or `None` if
+        there isn't one for `fingerprint` that is recent enough at `block_number`.
+        """
+        key = (strategy, method)
+        entry = self._entries.get(key)
+        if entry is not None and (
+            entry.fingerprint != fingerprint
+            or block_number - entry.block_number > self.max_age
+        ):
+            del self._entries[key]
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry.estimate
+
+    def put(
+        self,
+        strategy: str,
+        method: str,
+        fingerprint: GasFingerprint,
+        block_number: int,
+        estimate: int,
+    ):
+        self._entries[(strategy, method)] = CacheEntry(
+            fingerprint, block_number, estimate
+        )
+
+    def entries(self) -> Dict[Tuple[str, str], CacheEntry]:
+        return dict(self._entries)
+
+    def invalidate(self, strategy: str):
+        for key in [key for key in self._entries if key[0] == strategy]:
+            del self._entries[key]
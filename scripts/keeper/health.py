@@ -0,0 +1,220 @@
+"""
+Pre-flight harvest simulation for the keeper bot
+
+`BaseStrategy.harvest()` reverts with `!healthcheck` if the profit or loss it
+reports is out of the bounds set in `CommonHealthCheck`, and the keeper would
+still pay for the reverted transaction. Each candidate harvest is simulated
+with an `eth_call` first, so doomed harvests can be skipped without spending
+any gas.
+
+NOTE: The simulation alone decides whether a harvest is skipped, since it runs
+      the health check the Strategy actually has, custom checks included. The
+      profit and loss are also run through an off-chain copy of
+      `CommonHealthCheck._executeDefaultCheck`, only to report how far over its
+      limits a harvest that reverted was.
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from brownie import CommonHealthCheck
+from brownie.exceptions import VirtualMachineError
+
+from scripts.keeper.snapshot import CallBatch, StrategySnapshot
+
+
+MAX_BPS = 10_000
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+
+@dataclass(frozen=True)
+class HealthCheckLimits:
+    profit_limit_ratio: int
+    loss_limit_ratio: int
+
+
+@dataclass(frozen=True)
+class HealthCheckConfig:
+    # NOTE: `None` if the next harvest won't be health checked at all
+    health_check: Optional[str]
+    # NOTE: `None` if a custom check is set, or the limits couldn't be read
+    limits: Optional[HealthCheckLimits]
+
+
+UNCHECKED = HealthCheckConfig(None, None)
+
+
+def execute_default_check(
+    profit: int, loss: int, total_debt: int, limits: HealthCheckLimits
+) -> bool:
+    """
+    Mirror of `CommonHealthCheck._executeDefaultCheck`.
+    """
+    if profit > (total_debt * limits.profit_limit_ratio) // MAX_BPS:
+        return False
+    if loss > (total_debt * limits.loss_limit_ratio) // MAX_BPS:
+        return False
+    return True
+
+
+def read_health_checks(multicall, strategies) -> Dict[str, HealthCheckConfig]:
+    """
+    Read how the next harvest of each Strategy will be health checked. Costs
+    two `eth_call`s however many Strategies and health checks there are.
+    """
+    batch = CallBatch()
+    indices = {
+        strategy.address: (
+            batch.add(strategy.doHealthCheck),
+            batch.add(strategy.healthCheck),
+        )
+        for strategy in strategies
+    }
+    if len(batch) == 0:
+        return {}
+    _, _, results = batch.execute(multicall)
+
+    # NOTE: `harvest` skips the check if it's disabled, or no contract is set
+    active = {
+        address: results[health_check]
+        for address, (do_health_check, health_check) in indices.items()
+        if results[do_health_check]
+        and results[health_check] not in (None, ZERO_ADDRESS)
+    }
+
+    batch = CallBatch()
+    defaults = {}
+    limits = {}
+    for address, health_check in active.items():
+        contract = CommonHealthCheck.at(health_check)
+        if health_check not in defaults:
+            defaults[health_check] = (
+                batch.add(contract.profitLimitRatio),
+                batch.add(contract.lossLimitRatio),
+            )
+        limits[address] = (
+            batch.add(contract.strategiesLimits, address),
+            batch.add(contract.checks, address),
+        )
+    results = batch.execute(multicall)[2] if len(batch) > 0 else []
+
+    configs = {}
+    for address in indices:
+        if address not in active:
+            configs[address] = UNCHECKED
+            continue
+
+        health_check = active[address]
+        profit_limit_ratio, loss_limit_ratio = (
+            results[i] for i in defaults[health_check]
+        )
+        strategy_limits, custom_check = (results[i] for i in limits[address])
+        if None in (
+            profit_limit_ratio,
+            loss_limit_ratio,
+            strategy_limits,
+            custom_check,
+        ):
+            # NOTE: Not a `CommonHealthCheck`, only the simulation can tell
+            configs[address] = HealthCheckConfig(health_check, None)
+        elif custom_check != ZERO_ADDRESS:
+            configs[address] = HealthCheckConfig(health_check, None)
+        elif strategy_limits[2]:  # `Limits.exists`
+            configs[address] = HealthCheckConfig(
+                health_check, HealthCheckLimits(strategy_limits[0], strategy_limits[1])
+            )
+        else:
+            configs[address] = HealthCheckConfig(
+                health_check, HealthCheckLimits(profit_limit_ratio, loss_limit_ratio)
+            )
+    return configs
+
+
+def _bps(amount: int, total_debt: int) -> str:
+    if total_debt == 0:
+        return f"{amount} with no totalDebt"
+    return f"{amount * MAX_BPS // total_debt} bps"
+
+
+@dataclass(frozen=True)
+class HarvestSimulation:
+    strategy: str
+    profit: Optional[int]  # `None` if the simulation reverted
+    revert_msg: Optional[str] = None
+    # NOTE: What the default check was given, if it applies. Reverted
+    #       simulations have no profit, so theirs is estimated from the snapshot
+    checked_profit: Optional[int] = None
+    loss: Optional[int] = None
+    total_debt: Optional[int] = None
+    limits: Optional[HealthCheckLimits] = None
+
+    @property
+    def would_revert(self) -> bool:
+        return self.profit is None
+
+    @property
+    def healthy(self) -> Optional[bool]:
+        """
+        Result of the off-chain default check, `None` if it doesn't apply.
+        """
+        if self.limits is None:
+            return None
+        return execute_default_check(
+            self.checked_profit, self.loss, self.total_debt, self.limits
+        )
+
+    @property
+    def reason(self) -> Optional[str]:
+        if not self.would_revert:
+            return None
+        reason = self.revert_msg or "reverted"
+        if self.healthy is False:
+            reason += (
+                f" (profit {_bps(self.checked_profit, self.total_debt)}, limit "
+                f"{self.limits.profit_limit_ratio} bps; est. loss "
+                f"{_bps(self.loss, self.total_debt)}, limit "
+                f"{self.limits.loss_limit_ratio} bps)"
+            )
+        return reason
+
+
+def estimated_loss(snapshot: StrategySnapshot) -> int:
+    # NOTE: What `prepareReturn` typically reports, `harvest` only returns the
+    #       profit
+    if snapshot.estimated_total_assets is None:
+        return 0
+    return max(snapshot.params.totalDebt - snapshot.estimated_total_assets, 0)
+
+
+def simulate_harvest(
+    strategy,
+    sender,
+    snapshot: StrategySnapshot,
+    block_number: int,
+    config: HealthCheckConfig = UNCHECKED,
+) -> HarvestSimulation:
+    """
+    Simulate `strategy.harvest()` from `sender` as an `eth_call` at `block_number`.
+    """
+    try:
+        profit = strategy.harvest.call({"from": sender}, block_identifier=block_number)
+    except VirtualMachineError as e:
+        profit, revert_msg = None, e.revert_msg
+    else:
+        revert_msg = None
+    if config.limits is None:
+        return HarvestSimulation(strategy.address, profit, revert_msg)
+
+    total_debt = snapshot.params.totalDebt
+    checked_profit = profit
+    if checked_profit is None:
+        # NOTE: Same estimate as `harvestTrigger`
+        checked_profit = max((snapshot.estimated_total_assets or 0) - total_debt, 0)
+    return HarvestSimulation(
+        strategy.address,
+        profit,
+        revert_msg,
+        checked_profit=checked_profit,
+        loss=estimated_loss(snapshot),
+        total_debt=total_debt,
+        limits=config.limits,
+    )
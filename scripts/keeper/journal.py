@@ -0,0 +1,341 @@
+"""
+Crash-safe journal for the keeper bot
+
+Everything the keeper learns that is expensive to learn again is kept in a
+local SQLite database: the addresses it was started with, the Strategies it
+discovered (and the block it discovered them up to), when each one is next
+due, cached gas estimates, the fee history window, and every transaction still
+in flight. A restarted keeper restores all of it without any prompts or
+rescans, and polls its in-flight transactions instead of sending them again.
+
+Transactions are journaled as soon as they are broadcast. Everything else is
+written once per loop by `checkpoint`, in a single SQLite transaction, so a
+crash at any point leaves the journal at the last complete loop. Only rows that
+changed since the last checkpoint are written, so a quiet loop over a large
+fleet costs a handful of writes rather than a rewrite of every table.
+"""
+import json
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from brownie.network.transaction import TransactionReceipt
+from web3.exceptions import TransactionNotFound
+
+from scripts.keeper.fees import FeeBlock
+from scripts.keeper.gas_cache import GasFingerprint
+from scripts.keeper.snapshot import VaultInfo
+from scripts.keeper.transactions import PendingTx
+
+
+DEFAULT_PATH = "keeper-journal.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS config (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS vaults (
+    address TEXT PRIMARY KEY,
+    info TEXT
+);
+CREATE TABLE IF NOT EXISTS strategies (
+    address TEXT PRIMARY KEY,
+    vault TEXT NOT NULL,
+    retiring INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS schedule (
+    strategy TEXT PRIMARY KEY,
+    eligible_at INTEGER NOT NULL,
+    deadline INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS gas_estimates (
+    strategy TEXT NOT NULL,
+    method TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    estimate INTEGER NOT NULL,
+    PRIMARY KEY (strategy, method)
+);
+CREATE TABLE IF NOT EXISTS fee_blocks (
+    number INTEGER PRIMARY KEY,
+    base_fee INTEGER NOT NULL,
+    gas_used_ratio REAL NOT NULL,
+    reward INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    nonce INTEGER PRIMARY KEY,
+    key TEXT NOT NULL,
+    txids TEXT NOT NULL,
+    sent_at REAL NOT NULL,
+    submitted_at REAL NOT NULL
+);
+"""
+
+# NOTE: The primary key of each table `checkpoint` keeps in sync, which are the
+#       first columns of every row
+KEYS = {
+    "vaults": ("address",),
+    "strategies": ("address",),
+    "schedule": ("strategy",),
+    "gas_estimates": ("strategy", "method"),
+    "fee_blocks": ("number",),
+    "transactions": ("nonce",),
+}
+
+
+def _encode_fingerprint(fingerprint: GasFingerprint) -> str:
+    # NOTE: uint256 values don't fit in a SQLite integer
+    return json.dumps(
+        [
+            str(fingerprint.total_debt),
+            str(fingerprint.vault_balance),
+            str(fingerprint.debt_outstanding),
+            fingerprint.emergency_exit,
+            fingerprint.code_hash.hex(),
+        ]
+    )
+
+
+def _decode_fingerprint(data: str) -> GasFingerprint:
+    total_debt, vault_balance, debt_outstanding, emergency_exit, code_hash = json.loads(
+        data
+    )
+    return GasFingerprint(
+        int(total_debt),
+        int(vault_balance),
+        int(debt_outstanding),
+        emergency_exit,
+        bytes.fromhex(code_hash),
+    )
+
+
+def _encode_vault_info(info: Optional[VaultInfo]) -> Optional[str]:
+    if info is None:
+        return None
+    return json.dumps([info.token, info.decimals, info.symbol, info.want_symbol])
+
+
+def _tx_row(pending: PendingTx) -> tuple:
+    return (
+        pending.nonce,
+        json.dumps(pending.key),
+        json.dumps([receipt.txid for receipt in pending.receipts]),
+        pending.sent_at,
+        pending.submitted_at,
+    )
+
+
+def _load_receipts(txids: List[str]) -> List[TransactionReceipt]:
+    receipts = []
+    for txid in txids:
+        # NOTE: Doesn't wait for it, the pipeline polls for the receipt itself
+        try:
+            receipt = TransactionReceipt(
+                txid, silent=True, required_confs=0, is_blocking=False
+            )
+        except TransactionNotFound:
+            # NOTE: Replaced by a fee bump, or dropped while the bot was down
+            continue
+        receipts.append(receipt)
+    return receipts
+
+
+class KeeperJournal:
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        # NOTE: Transactions are managed explicitly, see `_transaction`
+        self._db = sqlite3.connect(path, isolation_level=None)
+        # NOTE: With write-ahead logging, a crash mid-write only loses that write
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        # NOTE: The rows of each table as of the last checkpoint, by primary key
+        self._written: Dict[str, Dict[tuple, tuple]] = {}
+
+    def close(self):
+        self._db.close()
+
+    @contextmanager
+    def _transaction(self):
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._db
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def get_config(self, key: str) -> Optional[str]:
+        row = self._db.execute(
+            "SELECT value FROM config WHERE key = ?", (key,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def set_config(self, key: str, value: str):
+        self._db.execute(
+            "INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)", (key, value)
+        )
+
+    def record_tx(self, pending: PendingTx):
+        """
+        Journal a transaction right after it is broadcast, before anything else
+        can go wrong.
+        """
+        row = _tx_row(pending)
+        self._db.execute(
+            "INSERT OR REPLACE INTO transactions VALUES (?, ?, ?, ?, ?)", row
+        )
+        written = self._written.get("transactions")
+        if written is not None:
+            written[row[:1]] = row
+
+    def _sync(self, db, table: str, rows: List[tuple]) -> Dict[tuple, tuple]:
+        """
+        Make `table` hold exactly `rows`, writing only the ones that changed
+        since the last checkpoint and deleting the ones that are gone.
+        """
+        keys = KEYS[table]
+        written = self._written.get(table)
+        if written is None:
+            # NOTE: First checkpoint since opening, so compare against the disk
+            written = {
+                row[: len(keys)]: row for row in db.execute(f"SELECT * FROM {table}")
+            }
+        current = {row[: len(keys)]: row for row in rows}
+
+        where = " AND ".join(f"{column} = ?" for column in keys)
+        db.executemany(
+            f"DELETE FROM {table} WHERE {where}",
+            [key for key in written if key not in current],
+        )
+        if len(rows) > 0:
+            values = ", ".join("?" * len(rows[0]))
+            db.executemany(
+                f"INSERT OR REPLACE INTO {table} VALUES ({values})",
+                [row for key, row in current.items() if written.get(key) != row],
+            )
+        return current
+
+    def checkpoint(self, discovery, scheduler, engine, fees, pipeline):
+        """
+        Bring the journal up to the current state of every component, atomically.
+        """
+        if discovery.last_block is None:
+            return  # NOTE: Nothing has been discovered yet
+        tables = {
+            "vaults": [
+                (address, _encode_vault_info(engine.vault_info.get(address)))
+                for address in discovery.vaults
+            ],
+            "strategies": [
+                (address, vault, int(address in discovery.retiring))
+                for address, vault in discovery.vault_of.items()
+            ],
+            "schedule": [
+                (strategy, entry.eligible_at, entry.deadline)
+                for strategy, entry in scheduler.entries().items()
+            ],
+            "gas_estimates": [
+                (
+                    strategy,
+                    method,
+                    _encode_fingerprint(entry.fingerprint),
+                    entry.block_number,
+                    entry.estimate,
+                )
+                for (strategy, method), entry in engine.gas_cache.entries().items()
+            ],
+            "fee_blocks": [
+                (block.number, block.base_fee, block.gas_used_ratio, block.reward)
+                for block in fees.blocks
+            ],
+            # NOTE: Drops the ones that finished, and picks up any fee bumps
+            "transactions": [_tx_row(pending) for pending in pipeline.pending()],
+        }
+
+        written = {}
+        with self._transaction() as db:
+            self.set_config("last_block", str(discovery.last_block))
+            self.set_config(
+                "fees", json.dumps([fees.next_base_fee, fees.supports_eip1559])
+            )
+            for table, rows in tables.items():
+                written[table] = self._sync(db, table, rows)
+        # NOTE: Only once committed, a rolled back checkpoint wrote nothing
+        self._written.update(written)
+
+    def restore(self, discovery, scheduler, engine, fees, pipeline) -> bool:
+        """
+        Load the last checkpoint into every component. Returns `False`, leaving
+        them untouched, if there isn't one.
+        """
+        last_block = self.get_config("last_block")
+        if last_block is None:
+            return False
+
+        db = self._db
+        vaults = db.execute("SELECT address, info FROM vaults").fetchall()
+        strategies = db.execute(
+            "SELECT address, vault, retiring FROM strategies"
+        ).fetchall()
+        discovery.restore(
+            [address for address, _ in vaults],
+            {address: vault for address, vault, _ in strategies},
+            [address for address, _, retiring in strategies if retiring],
+            int(last_block),
+        )
+        for vault in discovery.vaults.values():
+            engine.add_vault(vault)
+        engine.restore(
+            dict(discovery.vault_of),
+            {
+                address: VaultInfo(address, *json.loads(info))
+                for address, info in vaults
+                if info is not None
+            },
+        )
+
+        for strategy, eligible_at, deadline in db.execute(
+            "SELECT strategy, eligible_at, deadline FROM schedule"
+        ):
+            scheduler.restore(strategy, eligible_at, deadline)
+        for strategy in discovery.strategies:
+            scheduler.add(strategy)
+
+        for strategy, method, fingerprint, block_number, estimate in db.execute(
+            "SELECT * FROM gas_estimates"
+        ):
+            engine.gas_cache.put(
+                strategy,
+                method,
+                _decode_fingerprint(fingerprint),
+                block_number,
+                estimate,
+            )
+
+        next_base_fee, supports_eip1559 = json.loads(self.get_config("fees"))
+        fees.restore(
+            [
+                FeeBlock(*row)
+                for row in db.execute("SELECT * FROM fee_blocks ORDER BY number")
+            ],
+            next_base_fee,
+            supports_eip1559,
+        )
+
+        for nonce, key, txids, sent_at, submitted_at in db.execute(
+            "SELECT * FROM transactions ORDER BY nonce"
+        ):
+            receipts = _load_receipts(json.loads(txids))
+            key = json.loads(key)
+            # NOTE: Batches are keyed by a tuple, which JSON turns into a list
+            if isinstance(key, list):
+                key = tuple(key)
+            if len(receipts) == 0:
+                # NOTE: Nothing left to mine at this nonce, so it isn't resumed
+                pipeline.drop(key, nonce, submitted_at)
+                continue
+            pipeline.resume(PendingTx(key, nonce, receipts, sent_at, submitted_at))
+
+        return True
@@ -0,0 +1,144 @@
+"""
+One pass of the keeper bot, run once per block
+
+`keeper_pass` decides what to send at a block: it reads every Strategy that is
+due, simulates the harvests that triggered, and ranks them within the gas
+budget. Sending is left to the caller, so `scripts/keep.py` and the benchmark
+harness (see `benchmark.py`) run exactly the same pass, and only differ in how
+they send transactions and what they log.
+"""
+from dataclasses import dataclass
+from typing import Callable, List, Mapping, Optional
+
+from scripts.keeper.engine import KeeperEngine, StrategyReads
+from scripts.keeper.fees import FeeEstimate, FeeEstimator
+from scripts.keeper.ranking import HarvestCandidate, HarvestRanker
+from scripts.keeper.scheduler import HarvestScheduler
+from scripts.keeper.snapshot import KeeperSnapshot
+from scripts.keeper.transactions import TxPipeline
+
+
+@dataclass
+class KeeperPass:
+    fee: FeeEstimate
+    snapshot: KeeperSnapshot
+    results: List[StrategyReads]
+    # NOTE: In the order they should be sent, best first
+    harvests: List
+    tends: List
+    deferred: List[HarvestCandidate]
+
+    @property
+    def total_gas_estimate(self) -> int:
+        return sum(reads.gas_estimate for reads in self.results)
+
+
+def _silent(message: str):
+    pass
+
+
+def keeper_pass(
+    block_number: int,
+    timestamp: int,
+    strategies: Mapping[str, object],
+    scheduler: HarvestScheduler,
+    engine: KeeperEngine,
+    fees: FeeEstimator,
+    ranker: HarvestRanker,
+    pipeline: TxPipeline,
+    bot,
+    log: Callable[[str], None] = _silent,
+) -> Optional[KeeperPass]:
+    """
+    Decide which of `strategies` (by address) to harvest and tend at
+    `block_number`, and reschedule every one that was read. Returns `None`
+    if none of them is due at `timestamp`.
+    """
+    # NOTE: Strategies inside their `minReportDelay` window can't trigger, so
+    #       don't spend any reads on them
+    due = [strategies[s] for s in scheduler.pop_due(timestamp)]
+    if len(due) == 0:
+        return None
+
+    # NOTE: One fee computation per block, shared by every call sent in it
+    fee = fees.estimate(block_number)
+    # NOTE: Gas estimates are fanned out concurrently, everything else is read
+    #       in one batched call against the same block
+    snapshot, results = engine.run_pass(due, fee.gas_price)
+    log(
+        f"Snapshot of {len(due)} strategies in {len(snapshot.vaults)} vaults "
+        f"taken at block {snapshot.block_number}"
+    )
+    # NOTE: Anything that couldn't be read is tried again on the next pass
+    for address, failed in snapshot.unreadable.items():
+        log(f"[{address}] Snapshot read failed ({failed}), skipping")
+        scheduler.retry(address)
+
+    # NOTE: Anything that would revert (e.g. failing the health check) is
+    #       caught here, instead of paying for the reverted transaction
+    simulations = engine.preflight(
+        snapshot, [reads.strategy for reads in results if reads.harvest_triggered]
+    )
+
+    harvests = {}
+    tends = []
+    for reads in results:
+        strategy = reads.strategy
+        scheduler.schedule_from_snapshot(reads.snapshot)
+        if snapshot.timestamp >= scheduler.deadline(strategy.address):
+            log(f"[{strategy.address}] `maxReportDelay` has passed")
+
+        # Display some relevant statistics
+        info = engine.vault_info[reads.snapshot.vault]
+        credit = reads.credit / 10 ** info.decimals
+        log(f"[{strategy.address}] Credit Available: {credit:0.3f} {info.want_symbol}")
+        debt = reads.debt / 10 ** info.decimals
+        log(f"[{strategy.address}] Debt Outstanding: {debt:0.3f} {info.want_symbol}")
+
+        if reads.tend_gas_estimate is None:
+            log(f"[{strategy.address}] `tend` estimate fails")
+        if reads.ruled_out:
+            log(f"[{strategy.address}] `harvest` can't trigger yet")
+        elif reads.harvest_gas_estimate is None:
+            log(f"[{strategy.address}] `harvest` estimate fails")
+
+        # NOTE: Don't send again while the last transaction is still pending
+        if pipeline.is_pending(strategy.address):
+            log(f"[{strategy.address}] Waiting on a pending transaction")
+            continue
+
+        simulation = simulations.get(strategy.address)
+        if simulation is not None and simulation.would_revert:
+            log(f"[{strategy.address}] `harvest` would revert: {simulation.reason}")
+            continue
+
+        if reads.harvest_triggered:
+            # NOTE: Harvests are ranked against each other before sending
+            harvests[strategy.address] = reads
+        elif reads.tend_triggered:
+            tends.append(strategy)
+
+    plan = ranker.plan(
+        [
+            ranker.candidate(
+                reads.snapshot, reads.harvest_gas_estimate, snapshot.timestamp
+            )
+            for reads in harvests.values()
+        ],
+        fee.max_gas_price,
+        bot.balance(),
+    )
+    for candidate in plan.deferred:
+        log(
+            f"[{candidate.strategy}] `harvest` deferred, "
+            f"{candidate.value / 10 ** 18:0.6f} ETH of value carried forward"
+        )
+
+    return KeeperPass(
+        fee=fee,
+        snapshot=snapshot,
+        results=results,
+        harvests=[harvests[c.strategy].strategy for c in plan.selected],
+        tends=tends,
+        deferred=plan.deferred,
+    )
@@ -0,0 +1,246 @@
+"""
+Instrumentation for the keeper bot
+
+Timings of each stage of the hot path are kept in histograms, and per-Strategy
+totals in counters, so it is possible to tell which stage limits throughput.
+Everything is rendered in the Prometheus text format, and can be served over
+HTTP from a background thread for scraping.
+"""
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Sequence, Tuple
+
+
+# NOTE: In seconds, from a single RPC call up to a transaction that's been stuck
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+    120,
+    300,
+)
+DEFAULT_PORT = 8000
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if len(labels) == 0:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\""))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class _Metric(ABC):
+    type = ""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        """
+        The lines of this metric in the Prometheus text format.
+        """
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only go up")
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # NOTE: Per label set, the count of each bucket (not cumulative), sum and count
+        self._values: Dict[Tuple, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts, total, count = self._values.get(
+                key, ([0] * len(self.buckets), 0.0, 0)
+            )
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[idx] += 1
+                    break
+            self._values[key] = (counts, total + value, count + 1)
+
+    def count(self, **labels) -> int:
+        return self._values.get(tuple(sorted(labels.items())), (None, 0.0, 0))[2]
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def timed(self, fn, **labels):
+        """
+        Wrap `fn` so every call to it is observed, wherever it runs.
+        """
+
+        def wrapper(*args, **kwargs):
+            with self.time(**labels):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(
+                (key, (list(c), s, n)) for key, (c, s, n) in self._values.items()
+            )
+        lines = self._header()
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = key + (("le", _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(labels)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class KeeperMetrics:
+    def __init__(self):
+        self.rpc_read = Histogram(
+            "keeper_rpc_read_seconds",
+            "Latency of batched reads and simulations, by call",
+        )
+        self.gas_estimate = Histogram(
+            "keeper_gas_estimate_seconds", "Latency of gas estimates, by method"
+        )
+        self.trigger_evaluation = Histogram(
+            "keeper_trigger_evaluation_seconds",
+            "Time spent evaluating triggers, off-chain or on-chain",
+        )
+        self.tx_confirmation = Histogram(
+            "keeper_tx_confirmation_seconds", "Time from first broadcast to being mined"
+        )
+        self.loop = Histogram("keeper_loop_seconds", "Duration of a keeper pass")
+        self.calls = Counter(
+            "keeper_calls_total", "Transactions sent, by strategy and method"
+        )
+        self.reverts = Counter(
+            "keeper_reverts_total", "Transactions that reverted, by strategy"
+        )
+        self.gas_used = Counter(
+            "keeper_gas_used_total", "Gas used by mined transactions"
+        )
+        self.fees_paid = Counter(
+            "keeper_fees_paid_wei_total", "Fees paid for mined transactions"
+        )
+
+    @property
+    def metrics(self) -> List[_Metric]:
+        return [value for value in vars(self).values() if isinstance(value, _Metric)]
+
+    def record_finished(self, tx):
+        """
+        Record a `FinishedTx` from the transaction pipeline.
+        """
+        if tx.receipt is None:
+            return
+        # NOTE: Batches would make a new label for every combination
+        strategy = "batch" if isinstance(tx.key, tuple) else tx.key
+        self.tx_confirmation.observe(tx.latency)
+        if not tx.success:
+            self.reverts.inc(strategy=strategy)
+        self.gas_used.inc(tx.gas_used, strategy=strategy)
+        self.fees_paid.inc(tx.fee_paid, strategy=strategy)
+
+    def render(self) -> str:
+        return (
+            "\n".join(line for metric in self.metrics for line in metric.render())
+            + "\n"
+        )
+
+
+def serve_metrics(
+    metrics: KeeperMetrics, port: int = DEFAULT_PORT, host: str = "127.0.0.1"
+):
+    """
+    Serve `metrics` at `http://{host}:{port}/metrics` from a daemon thread.
+    Returns the server, call `shutdown()` on it to stop serving.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # NOTE: Don't clutter the keeper's output with every scrape
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
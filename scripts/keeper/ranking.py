@@ -0,0 +1,176 @@
+"""
+Budget-aware harvest ranking for the keeper bot
+
+When many Strategies trigger at once, there usually isn't room (or ether) to
+harvest all of them in the same block. Each one is scored by what its harvest
+is worth, `credit + profit` as `harvestTrigger` computes it (converted to wei
+with `ethToWant`), per unit of its gas estimate. The harvests to send are then
+picked as a 0/1 knapsack of those values within a per-block gas budget, which
+is further capped by what the bot's balance can pay for at the current price.
+
+Strategies past their `maxReportDelay` must be harvested regardless, so they
+take their share of the budget first. Strategies that are deferred carry their
+value forward, so one that keeps losing out eventually wins a spot.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from scripts.keeper.snapshot import StrategySnapshot
+from scripts.keeper.triggers import want_to_eth
+
+
+DEFAULT_GAS_BUDGET = 5_000_000  # per block
+# NOTE: Gas is bucketed to this resolution for the knapsack, rounding up, so a
+#       selection can never go over the limit
+DEFAULT_GAS_GRANULARITY = 10_000
+
+
+def harvest_value(snapshot: StrategySnapshot) -> Optional[int]:
+    """
+    `credit + profit` in `want`, as `harvestTrigger` computes it. `None` if
+    `estimatedTotalAssets` reverted.
+    """
+    total = snapshot.estimated_total_assets
+    if total is None:
+        return None
+    profit = max(total - snapshot.params.totalDebt, 0)
+    return snapshot.credit_available + profit
+
+
+@dataclass(frozen=True)
+class HarvestCandidate:
+    strategy: str
+    gas: int
+    value: int  # in wei, including anything carried forward
+    forced: bool = False  # past `maxReportDelay`
+
+    @property
+    def score(self) -> float:
+        return self.value / max(self.gas, 1)
+
+
+@dataclass
+class HarvestPlan:
+    gas_limit: int
+    # NOTE: In the order they should be sent, best first
+    selected: List[HarvestCandidate] = field(default_factory=list)
+    deferred: List[HarvestCandidate] = field(default_factory=list)
+
+    @property
+    def gas(self) -> int:
+        return sum(candidate.gas for candidate in self.selected)
+
+
+def _knapsack(
+    candidates: Sequence[HarvestCandidate], gas_limit: int, granularity: int
+) -> List[int]:
+    """
+    Indices of the subset of `candidates` with the most value that fits in
+    `gas_limit`.
+    """
+    cells = gas_limit // granularity
+    weights = [-(-candidate.gas // granularity) for candidate in candidates]
+    best = [0] * (cells + 1)
+    taken = []
+    for weight, candidate in zip(weights, candidates):
+        row = bytearray(cells + 1)
+        for cell in range(cells, weight - 1, -1):
+            value = best[cell - weight] + candidate.value
+            if value > best[cell]:
+                best[cell] = value
+                row[cell] = 1
+        taken.append(row)
+
+    chosen = []
+    cell = cells
+    for idx in reversed(range(len(candidates))):
+        if taken[idx][cell]:
+            chosen.append(idx)
+            cell -= weights[idx]
+    return chosen
+
+
+def select_harvests(
+    candidates: Iterable[HarvestCandidate],
+    gas_limit: int,
+    granularity: int = DEFAULT_GAS_GRANULARITY,
+) -> HarvestPlan:
+    by_score = sorted(candidates, key=lambda c: (not c.forced, -c.score))
+    plan = HarvestPlan(gas_limit)
+    remaining = gas_limit
+
+    optional = []
+    for candidate in by_score:
+        if not candidate.forced:
+            optional.append(candidate)
+        elif candidate.gas <= remaining:
+            plan.selected.append(candidate)
+            remaining -= candidate.gas
+        else:
+            plan.deferred.append(candidate)
+
+    chosen = set(_knapsack(optional, remaining, granularity))
+    leftover = []
+    for idx, candidate in enumerate(optional):
+        if idx in chosen:
+            plan.selected.append(candidate)
+            remaining -= candidate.gas
+        else:
+            leftover.append(candidate)
+
+    # NOTE: Anything that still fits goes too (e.g. it has no value to score,
+    #       but triggered anyway), it is only lost to bucketing otherwise
+    for candidate in leftover:
+        if candidate.gas <= remaining:
+            plan.selected.append(candidate)
+            remaining -= candidate.gas
+        else:
+            plan.deferred.append(candidate)
+
+    plan.selected.sort(key=lambda c: (not c.forced, -c.score))
+    return plan
+
+
+class HarvestRanker:
+    def __init__(
+        self,
+        gas_budget: int = DEFAULT_GAS_BUDGET,
+        granularity: int = DEFAULT_GAS_GRANULARITY,
+    ):
+        self.gas_budget = gas_budget
+        self.granularity = granularity
+        # NOTE: Value carried forward by Strategies that were deferred
+        self.carried: Dict[str, int] = {}
+
+    def candidate(
+        self, snapshot: StrategySnapshot, gas_estimate: int, timestamp: int
+    ) -> HarvestCandidate:
+        value = harvest_value(snapshot)
+        value_in_wei = None if value is None else want_to_eth(snapshot, value)
+        return HarvestCandidate(
+            strategy=snapshot.address,
+            gas=gas_estimate,
+            # NOTE: Harvests that can't be valued still triggered, so they are
+            #       only ranked last
+            value=(value_in_wei or 0) + self.carried.get(snapshot.address, 0),
+            forced=timestamp - snapshot.params.lastReport >= snapshot.max_report_delay,
+        )
+
+    def gas_limit(self, gas_price: int, balance: int) -> int:
+        if gas_price == 0:
+            return self.gas_budget
+        return min(self.gas_budget, balance // gas_price)
+
+    def plan(
+        self, candidates: Iterable[HarvestCandidate], gas_price: int, balance: int
+    ) -> HarvestPlan:
+        """
+        Pick which of `candidates` to harvest this block, with `balance` wei
+        available to pay for them at `gas_price`.
+        """
+        plan = select_harvests(
+            candidates, self.gas_limit(gas_price, balance), self.granularity
+        )
+        # NOTE: Strategies that aren't candidates anymore don't carry anything
+        self.carried = {c.strategy: c.value for c in plan.deferred}
+        return plan
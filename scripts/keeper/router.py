@@ -0,0 +1,54 @@
+"""
+Batched harvests and tends through `KeeperRouter`
+
+Instead of one transaction per Strategy, every Strategy that is due in a pass
+can be sent to the router in a single transaction, saving the base cost and
+the broadcast round-trip of all the others. The router catches each revert, so
+the outcome of every Strategy has to be read from its events.
+
+A batch is tracked by the pipeline under a tuple of the Strategies in it, which
+keeps any of them from being sent again while the batch is pending.
+"""
+from typing import Dict, Sequence
+
+from scripts.keeper.transactions import PendingTx, TxPipeline
+
+
+FAILURE_EVENTS = ("HarvestFailed", "TendFailed")
+ERROR_SELECTOR = bytes.fromhex("08c379a0")  # `Error(string)`
+
+
+def revert_reason(data: bytes) -> str:
+    """
+    Decode the revert string of `require`/`revert`, or the raw data otherwise.
+    """
+    data = bytes(data)
+    if data[:4] != ERROR_SELECTOR:
+        return "0x" + data.hex()
+    length = int.from_bytes(data[36:68], "big")
+    return data[68 : 68 + length].decode(errors="replace")
+
+
+def submit_batch(
+    pipeline: TxPipeline, router, name: str, strategies: Sequence, tx_params: dict
+) -> PendingTx:
+    """
+    Call `name` ("harvest" or "tend") on every one of `strategies` through
+    `router`, in one transaction.
+    """
+    addresses = [strategy.address for strategy in strategies]
+    return pipeline.submit(
+        getattr(router, name), addresses, tx_params=tx_params, key=tuple(addresses)
+    )
+
+
+def batch_failures(receipt) -> Dict[str, str]:
+    """
+    The Strategies that reverted inside a router transaction, with the reason.
+    """
+    failures = {}
+    for name in FAILURE_EVENTS:
+        if name in receipt.events:
+            for event in receipt.events[name]:
+                failures[event["strategy"]] = revert_reason(event["reason"])
+    return failures
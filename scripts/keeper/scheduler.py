@@ -0,0 +1,150 @@
+"""
+Block-driven scheduler for the keeper bot
+
+Each Strategy can't be harvested until `minReportDelay` has passed since its
+last report, and must be harvested once `maxReportDelay` has passed. The
+scheduler keeps a heap of the next time each Strategy becomes eligible, so the
+keeper only reads the Strategies that could possibly trigger, and sleeps until
+either a new block arrives or the next deadline is due.
+"""
+import heapq
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+
+DEFAULT_POLL_INTERVAL = 1.0  # seconds between checks for a new block
+
+
+@dataclass
+class ScheduleEntry:
+    eligible_at: int  # `lastReport + minReportDelay`
+    deadline: int  # `lastReport + maxReportDelay`
+    version: int = 0
+
+
+class HarvestScheduler:
+    def __init__(self, strategies: Iterable[str] = ()):
+        self._heap = []
+        self._entries: Dict[str, ScheduleEntry] = {}
+        for strategy in strategies:
+            self.add(strategy)
+
+    def __contains__(self, strategy: str) -> bool:
+        return strategy in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, strategy: str):
+        # NOTE: Nothing is known about it yet, so it is due right away
+        if strategy not in self._entries:
+            self.schedule(strategy, 0, 0, 0)
+
+    def schedule(
+        self,
+        strategy: str,
+        last_report: int,
+        min_report_delay: int,
+        max_report_delay: int,
+    ):
+        entry = self._entries.get(strategy)
+        version = 0 if entry is None else entry.version + 1
+        entry = ScheduleEntry(
+            last_report + min_report_delay, last_report + max_report_delay, version
+        )
+        self._entries[strategy] = entry
+        # NOTE: Older heap items for this Strategy are skipped lazily by version
+        heapq.heappush(self._heap, (entry.eligible_at, version, strategy))
+
+    def restore(self, strategy: str, eligible_at: int, deadline: int):
+        # NOTE: Same as a report at time 0 with these delays
+        self.schedule(strategy, 0, eligible_at, deadline)
+
+    def retry(self, strategy: str):
+        """
+        Make `strategy` due again on the next pass, keeping its schedule, e.g.
+        after it couldn't be read.
+        """
+        entry = self._entries[strategy]
+        self.restore(strategy, entry.eligible_at, entry.deadline)
+
+    def entries(self) -> Dict[str, ScheduleEntry]:
+        return dict(self._entries)
+
+    def schedule_from_snapshot(self, snapshot):
+        self.schedule(
+            snapshot.address,
+            snapshot.params.lastReport,
+            snapshot.min_report_delay,
+            snapshot.max_report_delay,
+        )
+
+    def remove(self, strategy: str):
+        # NOTE: Any heap items left behind are dropped when they surface
+        self._entries.pop(strategy, None)
+
+    def _is_current(self, version: int, strategy: str) -> bool:
+        entry = self._entries.get(strategy)
+        return entry is not None and entry.version == version
+
+    def pop_due(self, timestamp: int) -> List[str]:
+        """
+        Remove and return every Strategy that is outside of its `minReportDelay`
+        window at `timestamp`. Callers are expected to `schedule` them again
+        once they have fresh data.
+        """
+        due = []
+        while self._heap and self._heap[0][0] <= timestamp:
+            _, version, strategy = heapq.heappop(self._heap)
+            if self._is_current(version, strategy):
+                due.append(strategy)
+        return due
+
+    def deadline(self, strategy: str) -> int:
+        return self._entries[strategy].deadline
+
+    def next_wakeup(self, after: int) -> Optional[int]:
+        """
+        The earliest time after `after` that any Strategy becomes eligible.
+        """
+        # NOTE: Strategies eligible at or before `after` sit at the head of the
+        #       heap until they are harvested, so scan the live entries instead
+        return min(
+            (
+                entry.eligible_at
+                for entry in self._entries.values()
+                if entry.eligible_at > after
+            ),
+            default=None,
+        )
+
+    def wait(
+        self,
+        web3,
+        block_number: int,
+        timestamp: int,
+        poll_interval=DEFAULT_POLL_INTERVAL,
+    ):
+        """
+        Block until a block after `block_number` is mined, or until the next
+        Strategy becomes eligible after `timestamp` (the time the keeper last
+        evaluated at), whichever comes first.
+
+        Returns the `(block_number, timestamp)` to evaluate at next.
+        """
+        wakeup = self.next_wakeup(timestamp)
+        started = time.time()
+        while True:
+            block = web3.eth.get_block("latest")
+            if block.number > block_number:
+                # NOTE: Never go backwards, in case we woke early for a deadline
+                return block.number, max(block.timestamp, timestamp)
+
+            now = timestamp + int(time.time() - started)
+            # NOTE: Strategies already eligible at `timestamp` were just evaluated,
+            #       so only a new block can change their outcome
+            if wakeup is not None and wakeup <= now:
+                return block_number, wakeup
+
+            time.sleep(poll_interval)
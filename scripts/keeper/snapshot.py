@@ -0,0 +1,305 @@
+"""
+Per-block snapshot of everything the keeper reads
+
+Every read is batched through `Multicall.aggregate`, so the state of a whole
+fleet (across any number of Vaults) costs a single `eth_call` and all values
+are consistent with one block. Triggers depend on gas estimates, so they are
+read in a second batch.
+
+Things that never change for a Vault (its token, decimals and symbols) are read
+once with `read_vault_info` and cached by the caller.
+
+A read that fails only takes out the Vault or Strategy it is about: that
+Strategy is left out of the results and reported as unreadable, and the rest
+of the fleet is read as usual.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Mapping, Optional, Sequence, Tuple
+
+
+WEI_PER_ETH = 10 ** 18
+
+
+@dataclass(frozen=True)
+class StrategyParams:
+    performanceFee: int
+    activation: int
+    debtRatio: int
+    minDebtPerHarvest: int
+    maxDebtPerHarvest: int
+    lastReport: int
+    totalDebt: int
+    totalGain: int
+    totalLoss: int
+
+
+@dataclass(frozen=True)
+class VaultInfo:
+    address: str
+    token: str
+    decimals: int
+    symbol: str
+    want_symbol: str
+
+
+@dataclass(frozen=True)
+class VaultSnapshot:
+    address: str
+    total_assets: int
+    total_debt: int
+    locked_profit: int
+
+    @property
+    def total_idle(self) -> int:
+        # NOTE: `totalAssets` is the Vault's token balance plus `totalDebt`
+        return self.total_assets - self.total_debt
+
+
+@dataclass(frozen=True)
+class StrategySnapshot:
+    address: str
+    vault: str
+    params: StrategyParams
+    credit_available: int
+    debt_outstanding: int
+    expected_return: int
+    min_report_delay: int
+    max_report_delay: int
+    profit_factor: int
+    debt_threshold: int
+    emergency_exit: bool
+    code_hash: bytes
+    # NOTE: Strategy-side reads are `None` if the call reverted
+    estimated_total_assets: Optional[int]
+    eth_to_want: Optional[int]  # `ethToWant(1 ether)`
+
+
+@dataclass(frozen=True)
+class KeeperSnapshot:
+    block_number: int
+    timestamp: int
+    vaults: Dict[str, VaultSnapshot]
+    strategies: Dict[str, StrategySnapshot]
+    # NOTE: Strategies left out of `strategies`, with the reads that failed
+    unreadable: Dict[str, str] = field(default_factory=dict)
+
+    def vault_of(self, strategy: str) -> VaultSnapshot:
+        return self.vaults[self.strategies[strategy].vault]
+
+
+class CallBatch:
+    """
+    Collects contract calls, runs them through `Multicall.aggregate` and
+    decodes each result with the ABI of the method that produced it.
+    """
+
+    def __init__(self):
+        self._calls = []
+        self._methods = []
+
+    def __len__(self):
+        return len(self._calls)
+
+    def add(self, method, *args) -> int:
+        # NOTE: Brownie tracks the address of the contract a method belongs to
+        return self.add_at(method._address, method, *args)
+
+    def add_at(self, target: str, method, *args) -> int:
+        """
+        Call `method` on `target` instead, for contracts sharing the same ABI.
+        """
+        self._calls.append((target, method.encode_input(*args)))
+        self._methods.append(method)
+        return len(self._calls) - 1
+
+    def execute(self, multicall) -> Tuple[int, int, list]:
+        block_number, timestamp, results = multicall.aggregate(self._calls, False)
+        decoded = [
+            method.decode_output(data) if success else None
+            for method, (success, data) in zip(self._methods, results)
+        ]
+        return block_number, timestamp, decoded
+
+
+# NOTE: Vault-side reads and Strategy config getters should never revert
+REQUIRED_FIELDS = (
+    "params",
+    "credit_available",
+    "debt_outstanding",
+    "expected_return",
+    "min_report_delay",
+    "max_report_delay",
+    "profit_factor",
+    "debt_threshold",
+    "emergency_exit",
+    "code_hash",
+)
+
+
+def _failed(values: Mapping[str, object], fields: Iterable[str]) -> Optional[str]:
+    failed = [name for name in fields if values[name] is None]
+    return ", ".join(failed) if len(failed) > 0 else None
+
+
+def read_vault_info(multicall, vaults) -> Dict[str, VaultInfo]:
+    """
+    Read the static details of every Vault in two `eth_call`s. Vaults with a
+    failed read are left out.
+    """
+    batch = CallBatch()
+    indices = {
+        vault.address: (
+            batch.add(vault.token),
+            batch.add(vault.decimals),
+            batch.add(vault.symbol),
+        )
+        for vault in vaults
+    }
+    if len(batch) == 0:
+        return {}
+    _, _, results = batch.execute(multicall)
+    details = {
+        address: tuple(results[idx] for idx in idxs)
+        for address, idxs in indices.items()
+        if all(results[idx] is not None for idx in idxs)
+    }
+    if len(details) == 0:
+        return {}
+
+    batch = CallBatch()
+    # NOTE: `symbol()` is the same call for the Vault and its token
+    want_symbols = {
+        vault.address: batch.add_at(details[vault.address][0], vault.symbol)
+        for vault in vaults
+        if vault.address in details
+    }
+    _, _, results = batch.execute(multicall)
+    return {
+        address: VaultInfo(
+            address, token, decimals, symbol, results[want_symbols[address]]
+        )
+        for address, (token, decimals, symbol) in details.items()
+        if results[want_symbols[address]] is not None
+    }
+
+
+def take_snapshot(
+    multicall, groups: Iterable[Tuple[object, Sequence[object]]]
+) -> KeeperSnapshot:
+    """
+    Read every Vault and Strategy in one `eth_call`. `groups` pairs each Vault
+    with the Strategies of it to read.
+
+    Strategies with a failed read, or whose Vault has one, end up in
+    `unreadable` instead of `strategies`.
+    """
+    batch = CallBatch()
+
+    vault_indices = {}
+    indices = {}
+    for vault, strategies in groups:
+        vault_indices[vault.address] = {
+            "total_assets": batch.add(vault.totalAssets),
+            "total_debt": batch.add(vault.totalDebt),
+            "locked_profit": batch.add(vault.lockedProfit),
+        }
+        for strategy in strategies:
+            indices[strategy.address] = {
+                "vault": vault.address,
+                "params": batch.add(vault.strategies, strategy),
+                "credit_available": batch.add(vault.creditAvailable, strategy),
+                "debt_outstanding": batch.add(vault.debtOutstanding, strategy),
+                "expected_return": batch.add(vault.expectedReturn, strategy),
+                "min_report_delay": batch.add(strategy.minReportDelay),
+                "max_report_delay": batch.add(strategy.maxReportDelay),
+                "profit_factor": batch.add(strategy.profitFactor),
+                "debt_threshold": batch.add(strategy.debtThreshold),
+                "emergency_exit": batch.add(strategy.emergencyExit),
+                "code_hash": batch.add(multicall.getCodeHash, strategy),
+                "estimated_total_assets": batch.add(strategy.estimatedTotalAssets),
+                "eth_to_want": batch.add(strategy.ethToWant, WEI_PER_ETH),
+            }
+
+    block_number, timestamp, results = batch.execute(multicall)
+
+    vaults = {}
+    failed_vaults = {}
+    for address, fields in vault_indices.items():
+        values = {field: results[idx] for field, idx in fields.items()}
+        failed = _failed(values, fields)
+        if failed is not None:
+            failed_vaults[address] = f"{failed} of {address}"
+            continue
+        vaults[address] = VaultSnapshot(address=address, **values)
+
+    snapshots = {}
+    unreadable = {}
+    for address, fields in indices.items():
+        vault = fields.pop("vault")
+        values = {field: results[idx] for field, idx in fields.items()}
+        failed = failed_vaults.get(vault) or _failed(values, REQUIRED_FIELDS)
+        if failed is not None:
+            unreadable[address] = failed
+            continue
+        values["params"] = StrategyParams(*values["params"])
+        snapshots[address] = StrategySnapshot(address=address, vault=vault, **values)
+
+    return KeeperSnapshot(
+        block_number=block_number,
+        timestamp=timestamp,
+        vaults=vaults,
+        strategies=snapshots,
+        unreadable=unreadable,
+    )
+
+
+def read_strategy_vaults(multicall, strategies) -> Dict[str, str]:
+    """
+    Read which Vault each Strategy belongs to, which never changes. Strategies
+    with a failed read are left out.
+    """
+    batch = CallBatch()
+    indices = {strategy.address: batch.add(strategy.vault) for strategy in strategies}
+    if len(batch) == 0:
+        return {}
+    _, _, results = batch.execute(multicall)
+    return {
+        address: results[idx]
+        for address, idx in indices.items()
+        if results[idx] is not None
+    }
+
+
+def read_triggers(
+    multicall,
+    strategies,
+    call_costs: Mapping[str, Tuple[Optional[int], Optional[int]]],
+) -> Dict[str, Tuple[Optional[bool], Optional[bool]]]:
+    """
+    Read `harvestTrigger` and `tendTrigger` in one `eth_call`.
+
+    `call_costs` maps a Strategy address to its estimated `(harvest, tend)`
+    call cost in wei. Triggers are only read for costs that are known, and
+    come back as `None` otherwise (or if the call reverted).
+    """
+    batch = CallBatch()
+    indices = {}
+    for strategy in strategies:
+        harvest_cost, tend_cost = call_costs.get(strategy.address, (None, None))
+        indices[strategy.address] = (
+            (
+                None
+                if harvest_cost is None
+                else batch.add(strategy.harvestTrigger, harvest_cost)
+            ),
+            None if tend_cost is None else batch.add(strategy.tendTrigger, tend_cost),
+        )
+
+    if len(batch) == 0:
+        return {address: (None, None) for address in indices}
+
+    _, _, results = batch.execute(multicall)
+    return {
+        address: tuple(None if idx is None else results[idx] for idx in idxs)
+        for address, idxs in indices.items()
+    }
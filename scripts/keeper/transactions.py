@@ -0,0 +1,241 @@
+"""
+Transaction pipeline for the keeper bot
+
+Brownie normally waits for every receipt before returning, so one slow
+confirmation would stall the whole fleet. Instead, the keeper hands out nonces
+locally and broadcasts with `required_confs=0`, so several `harvest`/`tend`
+transactions can be in flight at once. Each block, the pipeline checks which
+nonces have been mined, and rebroadcasts anything that has been pending for too
+long at the same nonce with a higher fee.
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, List, Optional
+
+from web3.exceptions import TransactionNotFound
+
+
+DEFAULT_MAX_IN_FLIGHT = 8
+DEFAULT_REPLACE_AFTER = 120  # seconds pending before a fee bump
+# NOTE: Most nodes require at least a 10% bump to accept a replacement
+DEFAULT_FEE_INCREMENT = 1.125
+DEFAULT_POLL_INTERVAL = 1.0
+
+
+class NonceManager:
+    """
+    Hands out consecutive nonces for `address` without asking the node each
+    time. The starting nonce is read from the node's pending count, which
+    includes anything still in the mempool from before a restart.
+    """
+
+    def __init__(self, web3, address: str):
+        self.web3 = web3
+        self.address = address
+        self._lock = threading.Lock()
+        self._next = None
+        self.reconcile()
+
+    @property
+    def next_nonce(self) -> int:
+        return self._next
+
+    def reconcile(self) -> int:
+        """
+        Resync with the node's pending nonce. Only safe when nothing sent through
+        this manager is still being broadcast.
+        """
+        with self._lock:
+            self._next = self.web3.eth.get_transaction_count(self.address, "pending")
+            return self._next
+
+    def send(self, broadcast):
+        """
+        Call `broadcast(nonce)` with the next nonce. The nonce is only consumed
+        if `broadcast` returns, so a transaction that fails before reaching the
+        node (e.g. it reverts during gas estimation) doesn't leave a gap.
+        """
+        with self._lock:
+            result = broadcast(self._next)
+            self._next += 1
+            return result
+
+
+@dataclass
+class PendingTx:
+    key: Hashable
+    nonce: int
+    # NOTE: Every broadcast for this nonce, the most recent one last
+    receipts: List = field(default_factory=list)
+    sent_at: float = 0.0  # of the most recent broadcast
+    submitted_at: float = 0.0  # of the first broadcast
+
+    @property
+    def latest(self):
+        return self.receipts[-1]
+
+    @property
+    def replacements(self) -> int:
+        return len(self.receipts) - 1
+
+
+@dataclass
+class FinishedTx:
+    key: Hashable
+    nonce: int
+    receipt: Optional[object]  # `None` if another transaction took this nonce
+    success: bool
+    gas_used: int = 0
+    fee_paid: int = 0  # in wei
+    latency: float = 0.0  # seconds from the first broadcast until it was seen mined
+
+
+class TxPipeline:
+    def __init__(
+        self,
+        account,
+        web3,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        replace_after: float = DEFAULT_REPLACE_AFTER,
+        fee_increment: float = DEFAULT_FEE_INCREMENT,
+    ):
+        self.account = account
+        self.web3 = web3
+        self.max_in_flight = max_in_flight
+        self.replace_after = replace_after
+        self.fee_increment = fee_increment
+        self.nonces = NonceManager(web3, account.address)
+        self._in_flight: Dict[int, PendingTx] = {}
+        self._dropped: List[FinishedTx] = []
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    @property
+    def has_capacity(self) -> bool:
+        return len(self._in_flight) < self.max_in_flight
+
+    def is_pending(self, key: Hashable) -> bool:
+        # NOTE: Batches are keyed by a tuple of the keys of everything in them
+        return any(
+            pending.key == key
+            or (isinstance(pending.key, tuple) and key in pending.key)
+            for pending in self._in_flight.values()
+        )
+
+    def pending(self) -> List[PendingTx]:
+        return [self._in_flight[nonce] for nonce in sorted(self._in_flight)]
+
+    def resume(self, pending: PendingTx):
+        """
+        Track a transaction broadcast by an earlier run, so it is polled (and
+        bumped) like any other instead of being sent again.
+        """
+        self._in_flight[pending.nonce] = pending
+
+    def drop(self, key: Hashable, nonce: int, submitted_at: float):
+        """
+        Give up on a transaction broadcast by an earlier run that the node no
+        longer knows about, e.g. one dropped from the mempool while the bot was
+        down. The next `poll` reports it as dropped.
+        """
+        self._dropped.append(
+            FinishedTx(key, nonce, None, False, latency=time.time() - submitted_at)
+        )
+
+    def submit(
+        self, method, *args, tx_params: Optional[dict] = None, key: Hashable = None
+    ):
+        """
+        Broadcast `method(*args)` without waiting for it to be mined.
+
+        `tx_params` should use a fixed `gas_price` (or `max_fee`/`priority_fee`),
+        as fee bumps are handled by the pipeline rather than a Brownie gas strategy.
+        Raises if the call would revert, in which case no nonce is used.
+        """
+        if not self.has_capacity:
+            raise ValueError("Too many transactions in flight")
+
+        def broadcast(nonce):
+            params = dict(tx_params or {})
+            params.update({"from": self.account, "nonce": nonce, "required_confs": 0})
+            return nonce, method(*args, params)
+
+        nonce, receipt = self.nonces.send(broadcast)
+        now = time.time()
+        pending = PendingTx(key, nonce, [receipt], now, now)
+        self._in_flight[nonce] = pending
+        return pending
+
+    def _find_mined(self, pending: PendingTx):
+        # NOTE: Any of the broadcasts for a nonce may be the one that got mined
+        for receipt in reversed(pending.receipts):
+            try:
+                return receipt, self.web3.eth.get_transaction_receipt(receipt.txid)
+            except TransactionNotFound:
+                continue
+        return None, None
+
+    def _replace(self, pending: PendingTx):
+        try:
+            receipt = pending.latest.replace(increment=self.fee_increment)
+        except ValueError:
+            # NOTE: Already confirmed, it will be picked up on the next `poll`
+            return
+        pending.receipts.append(receipt)
+        pending.sent_at = time.time()
+
+    def poll(self) -> List[FinishedTx]:
+        """
+        Check every in-flight transaction without blocking. Returns the ones
+        that have been mined since the last poll, and bumps the fee of any that
+        have been pending for longer than `replace_after`.
+        """
+        finished, self._dropped = self._dropped, []
+        if len(self._in_flight) == 0:
+            return finished
+
+        # NOTE: Everything below the mined nonce is final, one way or another
+        mined_nonce = self.web3.eth.get_transaction_count(self.account.address)
+        now = time.time()
+        for nonce in sorted(self._in_flight):
+            pending = self._in_flight[nonce]
+            if nonce < mined_nonce:
+                receipt, mined = self._find_mined(pending)
+                del self._in_flight[nonce]
+                latency = now - pending.submitted_at
+                if mined is None:
+                    finished.append(
+                        FinishedTx(pending.key, nonce, None, False, latency=latency)
+                    )
+                    continue
+                gas_price = mined.get("effectiveGasPrice") or receipt.gas_price or 0
+                finished.append(
+                    FinishedTx(
+                        pending.key,
+                        nonce,
+                        receipt,
+                        mined["status"] == 1,
+                        mined["gasUsed"],
+                        mined["gasUsed"] * gas_price,
+                        latency,
+                    )
+                )
+
+            elif now - pending.sent_at >= self.replace_after:
+                self._replace(pending)
+
+        return finished
+
+    def wait_for_capacity(
+        self, poll_interval=DEFAULT_POLL_INTERVAL
+    ) -> List[FinishedTx]:
+        """
+        Block until another transaction can be submitted.
+        """
+        finished = self.poll()
+        while not self.has_capacity:
+            time.sleep(poll_interval)
+            finished.extend(self.poll())
+        return finished
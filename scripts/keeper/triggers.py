@@ -0,0 +1,88 @@
+"""
+Off-chain copy of `BaseStrategy.harvestTrigger`
+
+Evaluates the default trigger logic against a `StrategySnapshot`, so the
+keeper can rule out most Strategies without estimating gas or calling
+`harvestTrigger` on-chain.
+"""
+from typing import Optional
+
+from scripts.keeper.snapshot import WEI_PER_ETH, StrategySnapshot
+
+
+def eth_to_want(snapshot: StrategySnapshot, amount_in_wei: int) -> Optional[int]:
+    """
+    Convert `amount_in_wei` to `want` using the `ethToWant(1 ether)` rate read
+    in the snapshot.
+
+    NOTE: This assumes `ethToWant` is linear, which holds for price-based
+          conversions up to rounding. A zero amount is always exact.
+    """
+    if amount_in_wei == 0:
+        return 0
+    if snapshot.eth_to_want is None:
+        return None
+    return amount_in_wei * snapshot.eth_to_want // WEI_PER_ETH
+
+
+def want_to_eth(snapshot: StrategySnapshot, amount: int) -> Optional[int]:
+    """
+    Inverse of `eth_to_want`, rounding down. `None` if the rate is unknown or zero.
+    """
+    if amount == 0:
+        return 0
+    if not snapshot.eth_to_want:
+        return None
+    return amount * WEI_PER_ETH // snapshot.eth_to_want
+
+
+def harvest_trigger(
+    snapshot: StrategySnapshot, call_cost_in_wei: int, timestamp: int
+) -> Optional[bool]:
+    """
+    Mirror of `BaseStrategy.harvestTrigger(callCostInWei)` at `timestamp`.
+
+    Returns `None` if the outcome depends on a Strategy read that reverted.
+    Strategies that override `harvestTrigger` are not covered by this.
+    """
+    params = snapshot.params
+
+    # Should not trigger if Strategy is not activated
+    if params.activation == 0:
+        return False
+
+    # Should not trigger if we haven't waited long enough since previous harvest
+    if timestamp - params.lastReport < snapshot.min_report_delay:
+        return False
+
+    # Should trigger if hasn't been called in a while
+    if timestamp - params.lastReport >= snapshot.max_report_delay:
+        return True
+
+    # If some amount is owed, pay it back
+    if snapshot.debt_outstanding > snapshot.debt_threshold:
+        return True
+
+    # Check for profits and losses
+    total = snapshot.estimated_total_assets
+    if total is None:
+        return None
+    # Trigger if we have a loss to report
+    if total + snapshot.debt_threshold < params.totalDebt:
+        return True
+
+    profit = max(total - params.totalDebt, 0)
+
+    # Otherwise, only trigger if it "makes sense" economically
+    call_cost = eth_to_want(snapshot, call_cost_in_wei)
+    if call_cost is None:
+        return None
+    return snapshot.profit_factor * call_cost < snapshot.credit_available + profit
+
+
+def can_harvest_trigger(snapshot: StrategySnapshot, timestamp: int) -> bool:
+    """
+    False only if `harvestTrigger` can't return true for *any* call cost, which
+    is the case when it doesn't even trigger for a free call.
+    """
+    return harvest_trigger(snapshot, 0, timestamp) is not False
@@ -0,0 +1,3 @@
+"""
+Exact-integer models of the Vault accounting, for off-chain analysis
+"""
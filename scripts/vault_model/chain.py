@@ -0,0 +1,137 @@
+"""
+Compare a `VaultModel` against a deployed Vault
+
+Both sides are read into the same flat dict of values, so a mismatch shows up
+as the name of the value that differs, rather than a wrong share price three
+operations later.
+"""
+from dataclasses import asdict
+from typing import Dict, Iterable, Sequence, Tuple
+
+from scripts.keeper.snapshot import CallBatch
+from scripts.vault_model.strategy import TestStrategyModel
+from scripts.vault_model.vault import StrategyParams, VaultModel
+
+
+def read_strategies(
+    vault, strategies: Sequence[str], multicall=None
+) -> Dict[str, StrategyParams]:
+    """
+    The params of each of `strategies` in `vault`, batched into one `eth_call`
+    through `multicall` if given.
+    """
+    if multicall is None or not strategies:
+        results = [vault.strategies(address) for address in strategies]
+    else:
+        batch = CallBatch()
+        for address in strategies:
+            batch.add(vault.strategies, address)
+        _, _, results = batch.execute(multicall)
+        if None in results:
+            raise ValueError(f"Reading the Strategies of {vault.address} failed")
+    return {
+        address: StrategyParams(*result) for address, result in zip(strategies, results)
+    }
+
+
+def model_state(model: VaultModel, holders: Iterable[str]) -> Dict[str, object]:
+    state = {
+        "totalSupply": model.total_supply,
+        "totalAssets": model.total_assets(),
+        "totalDebt": model.total_debt,
+        "debtRatio": model.debt_ratio,
+        "lockedProfit": model.locked_profit,
+        "lastReport": model.last_report,
+        "balance": model.balance,
+        "withdrawalQueue": list(model.withdrawal_queue),
+    }
+    for address, params in model.strategies.items():
+        state[f"strategies({address})"] = asdict(params)
+        state[f"balance({address})"] = model.contracts[address].balance
+    for holder in holders:
+        state[f"balanceOf({holder})"] = model.balance_of.get(holder, 0)
+    return state
+
+
+def contract_state(
+    vault, token, strategies: Iterable[str], holders: Iterable[str]
+) -> Dict[str, object]:
+    # NOTE: Everything but the Strategies and holders in one call
+    vault_state = vault.vaultState().dict()
+    state = {
+        "totalSupply": vault_state["totalSupply"],
+        "totalAssets": vault_state["totalAssets"],
+        "totalDebt": vault_state["totalDebt"],
+        "debtRatio": vault_state["debtRatio"],
+        "lockedProfit": vault_state["lockedProfit"],
+        "lastReport": vault_state["lastReport"],
+        "balance": token.balanceOf(vault),
+        "withdrawalQueue": list(
+            vault_state["withdrawalQueue"][: vault_state["numStrategies"]]
+        ),
+    }
+    for address in strategies:
+        state[f"strategies({address})"] = vault.strategies(address).dict()
+        state[f"balance({address})"] = token.balanceOf(address)
+    for holder in holders:
+        state[f"balanceOf({holder})"] = vault.balanceOf(holder)
+    return state
+
+
+def mismatches(
+    model: VaultModel, vault, token, holders: Iterable[str] = ()
+) -> Dict[str, Tuple[object, object]]:
+    """
+    Every value that differs between `model` and `vault`, as `(model, vault)`.
+    """
+    holders = list(holders)
+    expected = model_state(model, holders)
+    # NOTE: Strategies missing from the model still show up in the totals
+    actual = contract_state(vault, token, model.strategies, holders)
+    return {
+        key: (expected.get(key), actual.get(key))
+        for key in expected.keys() | actual.keys()
+        if expected.get(key) != actual.get(key)
+    }
+
+
+def model_from_vault(
+    vault, multicall=None, strategy_model=TestStrategyModel
+) -> VaultModel:
+    """
+    A `VaultModel` of `vault` as it is now, for planning ahead from its totals
+    and the Strategies in its withdrawal queue.
+
+    `vaultState` doesn't return the params of each Strategy, so they are read
+    in one more call through `multicall` if given. Share balances aren't read.
+    Each Strategy is modelled by `strategy_model`, holding exactly its
+    `totalDebt`, so it has no gain or loss to report yet.
+    """
+    state = vault.vaultState().dict()
+    model = VaultModel(
+        state["lastReport"],
+        decimals=vault.decimals(),
+        address=vault.address,
+        rewards=vault.rewards(),
+        deposit_limit=vault.depositLimit(),
+    )
+    model.activation = vault.activation()
+    model.balance = state["totalAssets"] - state["totalDebt"]
+    model.total_supply = state["totalSupply"]
+    model.total_debt = state["totalDebt"]
+    model.debt_ratio = state["debtRatio"]
+    model.locked_profit = state["lockedProfit"]
+    model.locked_profit_degradation = state["lockedProfitDegradation"]
+    model.performance_fee = vault.performanceFee()
+    model.management_fee = vault.managementFee()
+    model.withdrawal_fee = vault.withdrawalFee()
+    model.emergency_shutdown = vault.emergencyShutdown()
+
+    queue = state["withdrawalQueue"][: state["numStrategies"]]
+    for address, params in read_strategies(vault, queue, multicall).items():
+        contract = strategy_model(address, model)
+        model.strategies[address] = params
+        model.contracts[address] = contract
+        model.withdrawal_queue.append(address)
+        contract.balance = params.totalDebt
+    return model
@@ -0,0 +1,169 @@
+"""
+Fee revenue projection for a fleet of Vaults
+
+`project_fees` starts from the current state of every Vault, for instance
+from `chain.model_from_vault`, and runs their Strategies' harvests forward
+over a schedule. Every harvest goes through the same accounting as
+`Vault._assessFees`:
+
+- a management fee on `totalDebt - delegatedAssets` for the time since the
+  Strategy's last report
+- the strategist's and the Vault's performance fees on the gain
+- the total capped at the gain
+- shares issued at the `freeFunds` of the moment, with the strategist's
+  cut sent to the Strategy and the rest, dust included, sent to `rewards`
+
+Each Vault is one row of `simulate.VaultArrays`, and each Strategy is a
+column. Every Strategy is harvested across all the Vaults at once, so a
+whole fleet takes milliseconds in `float64` and not much more exactly.
+"""
+from dataclasses import dataclass
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+from scripts.vault_model.simulate import (
+    DEFAULT_HARVEST_INTERVAL,
+    VaultArrays,
+    as_array,
+    run_schedule,
+)
+from scripts.vault_model.vault import MAX_BPS, MAX_UINT256, SECS_PER_YEAR, VaultModel
+
+
+def historical_apr(model: VaultModel, strategy: str) -> int:
+    """
+    The yearly return, in basis points of its current debt, that `strategy`
+    has reported on average since it was added.
+    """
+    params = model.strategies[strategy]
+    elapsed = params.lastReport - params.activation
+    if elapsed == 0 or params.totalDebt == 0:
+        return 0
+    return params.totalGain * SECS_PER_YEAR * MAX_BPS // (elapsed * params.totalDebt)
+
+
+@dataclass(frozen=True)
+class FeeProjection:
+    """
+    `v` Vaults with up to `k` Strategies each, over `t` timestamps. Fees are in
+    `want` when they were charged, shares are valued at the last timestamp.
+    """
+
+    vaults: Tuple[str, ...]  # (v,)
+    rewards: Tuple[str, ...]  # (v,)
+    strategies: Tuple[Tuple[str, ...], ...]  # (v, at most k)
+    timestamps: np.ndarray  # (t,)
+    price_per_share: np.ndarray  # (v, t)
+    fees: np.ndarray  # (v, k), `totalFee` of every `_assessFees`
+    rewards_shares: np.ndarray  # (v,)
+    rewards_value: np.ndarray  # (v,)
+    strategist_shares: np.ndarray  # (v, k)
+    strategist_value: np.ndarray  # (v, k)
+
+    def by_recipient(self) -> Dict[Tuple[str, str], Tuple[object, object]]:
+        """
+        `(shares, value)` issued to each recipient, by `(vault, recipient)`.
+        """
+        recipients = {}
+        for row, vault in enumerate(self.vaults):
+            recipients[vault, self.rewards[row]] = (
+                self.rewards_shares[row],
+                self.rewards_value[row],
+            )
+            for column, strategy in enumerate(self.strategies[row]):
+                recipients[vault, strategy] = (
+                    self.strategist_shares[row, column],
+                    self.strategist_value[row, column],
+                )
+        return recipients
+
+
+def project_fees(
+    models: Sequence[VaultModel],
+    timestamp: int,
+    duration: int,
+    step: int,
+    apr=None,
+    harvest_interval=DEFAULT_HARVEST_INTERVAL,
+    exact: bool = True,
+) -> FeeProjection:
+    """
+    Project the fees of `models` for `duration` seconds after `timestamp`, in
+    increments of `step`. `models` aren't changed.
+
+    A Strategy is harvested once `harvest_interval` has passed since its last
+    report, and earns `apr` basis points a year on what it holds in between.
+    `apr` defaults to `historical_apr`. Both broadcast to `(v, k)`, where a
+    Strategy's column is its position in `model.strategies`. Settings and the
+    Strategies' `delegatedAssets` stay as they are, and emergency shutdowns
+    and exits aren't modelled.
+    """
+    models = list(models)
+    strategies = [list(model.strategies) for model in models]
+    v, k = len(models), max(map(len, strategies), default=0)
+    if apr is None:
+        apr = [
+            [historical_apr(m, s) for s in row] + [0] * (k - len(row))
+            for m, row in zip(models, strategies)
+        ]
+
+    def column(value):
+        return [
+            [value(m, m.strategies[s], m.contracts[s]) for s in row]
+            + [0] * (k - len(row))
+            for m, row in zip(models, strategies)
+        ]
+
+    # NOTE: Timestamps are relative to `timestamp`, so they fit in `float64`
+    state = {
+        "balance": [m.balance for m in models],
+        "total_supply": [m.total_supply for m in models],
+        "total_debt": [m.total_debt for m in models],
+        "locked_profit": [m.locked_profit for m in models],
+        "last_report": [m.last_report - timestamp for m in models],
+        "locked_profit_degradation": [m.locked_profit_degradation for m in models],
+        "performance_fee": [m.performance_fee for m in models],
+        "management_fee": [m.management_fee for m in models],
+    }
+    state = {name: as_array(value, (v,), exact) for name, value in state.items()}
+    strategy_state = {
+        "debt_ratio": column(lambda m, p, c: p.debtRatio),
+        "strategist_fee": column(lambda m, p, c: p.performanceFee),
+        "strategy_balance": column(lambda m, p, c: c.balance),
+        "strategy_debt": column(lambda m, p, c: p.totalDebt),
+        "strategy_last_report": column(lambda m, p, c: p.lastReport - timestamp),
+        "delegated_assets": column(lambda m, p, c: c.delegated_assets()),
+        "apr": apr,
+        "harvest_interval": harvest_interval,
+    }
+    state.update(
+        (name, as_array(value, (v, k), exact)) for name, value in strategy_state.items()
+    )
+
+    # NOTE: Rows with fewer Strategies are padded with ones that never report
+    padding = np.array([[j >= len(row) for j in range(k)] for row in strategies])
+    state["harvest_interval"][padding.reshape(v, k)] = MAX_UINT256
+    state["harvested"] = np.ones((v, k), dtype=bool)
+    vaults = VaultArrays(state)
+
+    relative = np.arange(1, duration // step + 1) * step
+    unit = as_array([10 ** m.decimals for m in models], (v,), exact)
+    price_per_share = run_schedule(vaults, relative, step, unit)
+
+    everything = np.arange(v)
+    last = relative[-1].item() if len(relative) else 0
+    return FeeProjection(
+        vaults=tuple(m.address for m in models),
+        rewards=tuple(m.rewards for m in models),
+        strategies=tuple(tuple(row) for row in strategies),
+        timestamps=relative + timestamp,
+        price_per_share=price_per_share,
+        fees=vaults.fees,
+        rewards_shares=vaults.rewards_shares,
+        rewards_value=vaults.share_value(everything, vaults.rewards_shares, last),
+        strategist_shares=vaults.strategist_shares,
+        strategist_value=vaults.share_value(
+            everything[:, None], vaults.strategist_shares, last
+        ),
+    )
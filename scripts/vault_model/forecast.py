@@ -0,0 +1,156 @@
+"""
+Forecast `pricePerShare` and `freeFunds` as locked profit is released
+
+Between reports, the only input to `pricePerShare` that changes over time is
+`_calculateLockedProfit`, which releases `lockedProfit` linearly at
+`lockedProfitDegradation` per second after `lastReport`. So a single read of
+the Vault gives its exact share price at every later timestamp, until the
+next report, deposit or withdrawal changes its state.
+
+A forecast is a Vault with no Strategies, as one row of `simulate.VaultArrays`,
+evaluated at every timestamp at once.
+
+    forecast = Forecast.from_vault(vault)
+    forecast.price_per_share(chain.time() + 3600)
+    forecast.price_per_share_curve(range(now, now + 6 * 3600, 60))
+"""
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import numpy as np
+
+from scripts.vault_model.simulate import VaultArrays, as_array
+from scripts.vault_model.vault import DEGRADATION_COEFFICIENT, VaultModel
+
+
+# NOTE: `VaultArrays` state that is `(n, k)`, empty here
+_STRATEGY_STATE = (
+    "debt_ratio",
+    "strategist_fee",
+    "strategy_balance",
+    "strategy_debt",
+    "strategy_last_report",
+    "delegated_assets",
+    "apr",
+    "harvest_interval",
+)
+
+
+@dataclass(frozen=True)
+class Forecast:
+    total_assets: int
+    total_supply: int
+    locked_profit: int
+    locked_profit_degradation: int
+    last_report: int
+    decimals: int
+
+    @classmethod
+    def from_vault(cls, vault, block_identifier=None) -> "Forecast":
+        # NOTE: `decimals` is fixed at initialization, everything else is read in
+        #       one call, so the values are all from the same block
+        state = vault.vaultState(block_identifier=block_identifier).dict()
+        return cls(
+            total_assets=state["totalAssets"],
+            total_supply=state["totalSupply"],
+            locked_profit=state["lockedProfit"],
+            locked_profit_degradation=state["lockedProfitDegradation"],
+            last_report=state["lastReport"],
+            decimals=vault.decimals(),
+        )
+
+    @classmethod
+    def from_model(cls, model: VaultModel) -> "Forecast":
+        return cls(
+            total_assets=model.total_assets(),
+            total_supply=model.total_supply,
+            locked_profit=model.locked_profit,
+            locked_profit_degradation=model.locked_profit_degradation,
+            last_report=model.last_report,
+            decimals=model.decimals,
+        )
+
+    def locked_profit_at(self, timestamp: int) -> int:
+        """
+        `_calculateLockedProfit` at `timestamp`.
+        """
+        return int(self.locked_profit_curve([timestamp])[0])
+
+    def free_funds(self, timestamp: int) -> int:
+        return int(self.free_funds_curve([timestamp])[0])
+
+    def share_value(self, shares: int, timestamp: int) -> int:
+        vaults, vault, timestamps = self._evaluate([timestamp], exact=True)
+        shares = as_array(shares, (1,), exact=True)
+        return int(vaults.share_value(vault, shares, timestamps)[0])
+
+    def price_per_share(self, timestamp: int) -> int:
+        return self.share_value(10 ** self.decimals, timestamp)
+
+    def unlocked_at(self) -> Optional[int]:
+        """
+        The first timestamp at which all the locked profit has been released,
+        and `pricePerShare` stops rising. `None` if it never is.
+        """
+        if self.locked_profit == 0:
+            return self.last_report
+        if self.locked_profit_degradation == 0:
+            return None
+        # NOTE: Ceiling division, for the first second with a ratio of 1 or more
+        return self.last_report + -(
+            -DEGRADATION_COEFFICIENT // self.locked_profit_degradation
+        )
+
+    # Vectorized
+
+    def _arrays(self, exact: bool) -> VaultArrays:
+        # NOTE: All of `totalAssets` as idle balance, only the sum is ever read
+        state = dict(
+            balance=self.total_assets,
+            total_supply=self.total_supply,
+            total_debt=0,
+            locked_profit=self.locked_profit,
+            last_report=self.last_report,
+            locked_profit_degradation=self.locked_profit_degradation,
+            performance_fee=0,
+            management_fee=0,
+        )
+        state = {name: as_array(value, (1,), exact) for name, value in state.items()}
+        state.update((name, as_array(0, (1, 0), exact)) for name in _STRATEGY_STATE)
+        state["harvested"] = np.ones((1, 0), dtype=bool)
+        return VaultArrays(state)
+
+    def _timestamps(self, timestamps: Iterable[int], exact: bool) -> np.ndarray:
+        timestamps = np.asarray(list(timestamps), dtype=object)
+        if len(timestamps) > 0 and timestamps.min() < self.last_report:
+            # NOTE: The Vault reverts on an underflow here, there's no past to forecast
+            raise ValueError(f"Timestamps before `lastReport` {self.last_report}")
+        return as_array(timestamps, timestamps.shape, exact)
+
+    def _evaluate(self, timestamps: Iterable[int], exact: bool):
+        # NOTE: The same Vault, row 0, at each of `timestamps`
+        timestamps = self._timestamps(timestamps, exact)
+        return self._arrays(exact), np.zeros(len(timestamps), dtype=int), timestamps
+
+    def locked_profit_curve(
+        self, timestamps: Iterable[int], exact: bool = True
+    ) -> np.ndarray:
+        """
+        `locked_profit_at` for every one of `timestamps`, as Python integers
+        (`dtype=object`), or as `float64` if not `exact`.
+        """
+        vaults, vault, timestamps = self._evaluate(timestamps, exact)
+        return vaults.calculate_locked_profit(vault, timestamps)
+
+    def free_funds_curve(
+        self, timestamps: Iterable[int], exact: bool = True
+    ) -> np.ndarray:
+        vaults, vault, timestamps = self._evaluate(timestamps, exact)
+        return vaults.free_funds(vault, timestamps)
+
+    def price_per_share_curve(
+        self, timestamps: Iterable[int], exact: bool = True
+    ) -> np.ndarray:
+        vaults, vault, timestamps = self._evaluate(timestamps, exact)
+        unit = as_array(10 ** self.decimals, (), exact)
+        return vaults.share_value(vault, unit, timestamps)
@@ -0,0 +1,222 @@
+"""
+Monte Carlo of depositor outcomes under Strategy losses
+
+How a loss is shared between depositors depends on when they leave:
+
+- A loss that hasn't been reported yet is taken in full by whoever withdraws
+  through that Strategy first, through `liquidatePosition`. That happens
+  unless their `maxLoss` makes the withdrawal revert, and then they wait.
+- Once a harvest reports it, `_reportLoss` spreads it over every share.
+- Profit unlocks linearly after each report, which favours whoever is still
+  in the Vault when it has.
+
+`monte_carlo` runs many random paths of deposits, withdrawals, gains and
+losses through `VaultModel` and collects each depositor's return. Paths are
+independent, so they are split into chunks across a process pool. Each path
+draws from its own child of a single `numpy.random.SeedSequence`, so results
+are the same whatever the number of processes.
+"""
+import heapq
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from scripts.vault_model.strategy import TestStrategyModel
+from scripts.vault_model.vault import (
+    DEFAULT_LOCKED_PROFIT_DEGRADATION,
+    MAX_BPS,
+    MAX_UINT256,
+    SECS_PER_YEAR,
+    VaultModel,
+    VaultRevert,
+)
+
+
+DAY = 24 * 60 * 60
+
+# NOTE: More chunks than processes, so a slow chunk doesn't hold up the rest
+CHUNKS_PER_PROCESS = 4
+
+# Events at the same timestamp happen in this order
+DEPOSIT, LOSS, HARVEST, WITHDRAW = range(4)
+
+
+@dataclass(frozen=True)
+class LossScenario:
+    depositors: int = 10
+    # NOTE: In whole tokens, drawn uniformly
+    min_deposit: int = 1_000
+    max_deposit: int = 100_000
+    debt_ratios: Tuple[int, ...] = (4_000, 5_000)
+    duration: int = 180 * DAY
+    harvest_interval: int = 7 * DAY
+    apr: int = 1_000  # earned by every Strategy on what it holds [BPS]
+    # Every harvest interval, each Strategy may lose up to `max_loss_size` of
+    # what it holds, at a random time before its next harvest
+    loss_probability: float = 0.05
+    max_loss_size: int = 2_000  # [BPS]
+    max_loss: int = 1  # what depositors pass to `withdraw` [BPS]
+    locked_profit_degradation: int = DEFAULT_LOCKED_PROFIT_DEGRADATION
+    decimals: int = 18
+
+
+@dataclass(frozen=True)
+class MonteCarloResult:
+    """
+    Outcomes of `paths` paths for each of their depositors. Amounts are Python
+    integers in the smallest unit of `want`.
+    """
+
+    seed: int
+    deposited: np.ndarray  # (paths, depositors)
+    received: np.ndarray  # (paths, depositors)
+    deposited_at: np.ndarray  # (paths, depositors)
+    withdrawn_at: np.ndarray  # (paths, depositors)
+    # NOTE: How many times `maxLoss` made a withdrawal wait for a later block
+    blocked: np.ndarray  # (paths, depositors)
+
+    @property
+    def returns(self) -> np.ndarray:
+        return self.received.astype(float) / self.deposited.astype(float) - 1
+
+    def returns_by_exit_order(self) -> np.ndarray:
+        """
+        `returns` with each path sorted by withdrawal time, so column 0 is
+        the first depositor out and the last column the last one.
+        """
+        order = np.argsort(self.withdrawn_at, axis=1, kind="stable")
+        return np.take_along_axis(self.returns, order, axis=1)
+
+    def quantiles(self, q: Sequence[float] = (0.01, 0.05, 0.5, 0.95, 0.99)):
+        return np.quantile(self.returns, q)
+
+
+def run_path(scenario: LossScenario, seed: np.random.SeedSequence) -> Tuple[List, ...]:
+    """
+    One random path through `VaultModel`. Returns, for each depositor, what
+    they deposited and received, when, and how often `maxLoss` blocked them.
+    """
+    rng = np.random.default_rng(seed)
+    unit = 10 ** scenario.decimals
+    start = 1
+    end = start + scenario.duration
+
+    model = VaultModel(start, decimals=scenario.decimals)
+    model.set_locked_profit_degradation(scenario.locked_profit_degradation)
+    strategies = []
+    for index, debt_ratio in enumerate(scenario.debt_ratios):
+        strategy = TestStrategyModel(f"strategy{index}", model)
+        model.add_strategy(strategy, debt_ratio, 0, MAX_UINT256, 1_000, start)
+        strategies.append(strategy)
+
+    events = []
+    deposited, received, deposited_at, withdrawn_at, blocked = (
+        [0] * scenario.depositors for _ in range(5)
+    )
+    for user in range(scenario.depositors):
+        amount = int(rng.integers(scenario.min_deposit, scenario.max_deposit + 1))
+        deposit_time = int(rng.integers(start, start + scenario.duration // 2))
+        withdraw_time = int(rng.integers(deposit_time + 1, end + 1))
+        events.append((deposit_time, DEPOSIT, user, amount * unit))
+        events.append((withdraw_time, WITHDRAW, user, None))
+    for harvest_time in range(
+        start + scenario.harvest_interval, end + 1, scenario.harvest_interval
+    ):
+        for index, strategy in enumerate(strategies):
+            events.append((harvest_time, HARVEST, index, None))
+            if rng.random() < scenario.loss_probability:
+                loss_time = int(
+                    rng.integers(harvest_time - scenario.harvest_interval, harvest_time)
+                )
+                size = int(rng.integers(0, scenario.max_loss_size + 1))
+                events.append((loss_time, LOSS, index, size))
+    heapq.heapify(events)
+
+    last_accrual = [start] * len(strategies)
+    while events:
+        timestamp, kind, index, value = heapq.heappop(events)
+        if kind == DEPOSIT:
+            model.deposit(f"user{index}", value, timestamp)
+            deposited[index] = value
+            deposited_at[index] = timestamp
+
+        elif kind == LOSS:
+            strategy = strategies[index]
+            strategy.take_funds(strategy.balance * value // MAX_BPS)
+
+        elif kind == HARVEST:
+            strategy = strategies[index]
+            strategy.balance += (
+                strategy.balance
+                * scenario.apr
+                * (timestamp - last_accrual[index])
+                // (MAX_BPS * SECS_PER_YEAR)
+            )
+            last_accrual[index] = timestamp
+            strategy.harvest(timestamp)
+
+        else:
+            # NOTE: At the end, everyone left takes whatever loss they must
+            max_loss = MAX_BPS if timestamp >= end else scenario.max_loss
+            try:
+                withdrawal = model.withdraw(
+                    f"user{index}", timestamp, max_loss=max_loss
+                )
+            except VaultRevert:
+                if timestamp >= end:
+                    raise
+                # Try again after the next harvest, once the loss is reported
+                blocked[index] += 1
+                retry = timestamp + scenario.harvest_interval
+                retry -= (retry - start) % scenario.harvest_interval
+                heapq.heappush(events, (min(retry, end), WITHDRAW, index, None))
+                continue
+            received[index] = withdrawal.value - withdrawal.fee
+            withdrawn_at[index] = timestamp
+
+    return deposited, received, deposited_at, withdrawn_at, blocked
+
+
+def _run_paths(scenario: LossScenario, seeds: Sequence[np.random.SeedSequence]):
+    return [run_path(scenario, seed) for seed in seeds]
+
+
+def monte_carlo(
+    scenario: LossScenario,
+    paths: int,
+    seed: int = 0,
+    processes: Optional[int] = None,
+) -> MonteCarloResult:
+    """
+    Run `paths` random paths of `scenario` over `processes` processes, one per
+    core by default. The same `seed` always gives the same result.
+    """
+    seeds = np.random.SeedSequence(seed).spawn(paths)
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        outcomes = _run_paths(scenario, seeds)
+    else:
+        chunks = [
+            [seeds[i] for i in chunk]
+            for chunk in np.array_split(
+                np.arange(paths), processes * CHUNKS_PER_PROCESS
+            )
+            if len(chunk) > 0
+        ]
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = executor.map(_run_paths, itertools.repeat(scenario), chunks)
+            outcomes = list(itertools.chain.from_iterable(results))
+
+    deposited, received, deposited_at, withdrawn_at, blocked = zip(*outcomes)
+    return MonteCarloResult(
+        seed=seed,
+        deposited=np.array(deposited, dtype=object).reshape(paths, -1),
+        received=np.array(received, dtype=object).reshape(paths, -1),
+        deposited_at=np.array(deposited_at).reshape(paths, -1),
+        withdrawn_at=np.array(withdrawn_at).reshape(paths, -1),
+        blocked=np.array(blocked).reshape(paths, -1),
+    )
@@ -0,0 +1,128 @@
+"""
+Debt ratio rebalancing planner
+
+Changing a Strategy's `debtRatio` doesn't move any capital by itself. The
+Strategy's next harvest repays what `_debtOutstanding` says it owes, or draws
+what `_creditAvailable` lets it. That credit is capped by
+`maxDebtPerHarvest`, it is zero below `minDebtPerHarvest`, and it can't
+exceed what the Vault holds. So reaching a new allocation takes a sequence of
+harvests, in the right order.
+
+`plan_rebalance` finds that sequence by running it on a copy of a
+`VaultModel`. It makes the debt ratio updates, with decreases first so
+the Vault's `debtRatio` never goes over `MAX_BPS`. Then it runs rounds of
+harvests: Strategies that owe capital are harvested first, so their
+repayments are idle in the Vault by the time the Strategies waiting for
+credit are harvested. Every harvest that moves capital counts as a step.
+Harvests that wouldn't, e.g. of a Strategy that owes but has nothing free to
+repay with, are left out. The plan ends when no harvest would move any more.
+"""
+import copy
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from scripts.vault_model.vault import VaultModel
+
+
+DEFAULT_MAX_HARVESTS = 100
+
+UPDATE_DEBT_RATIO = "updateStrategyDebtRatio"
+HARVEST = "harvest"
+
+
+@dataclass(frozen=True)
+class RebalanceStep:
+    action: str  # `UPDATE_DEBT_RATIO` or `HARVEST`
+    strategy: str
+    debt_ratio: Optional[int]  # the new one, for `UPDATE_DEBT_RATIO`
+    timestamp: int
+    moved: int  # change in the Strategy's `totalDebt`, negative if repaid
+    # NOTE: The capital in flight after this step, i.e. what hasn't reached
+    #       its target yet
+    idle: int  # held by the Vault
+    outstanding: int  # still to be repaid by Strategies
+    credit: int  # could be drawn by Strategies on their next harvest
+
+
+@dataclass(frozen=True)
+class RebalancePlan:
+    steps: List[RebalanceStep]
+    model: VaultModel  # as it is at the end of the plan
+    complete: bool  # `False` if `max_harvests` ran out first
+
+    @property
+    def harvests(self) -> List[RebalanceStep]:
+        return [step for step in self.steps if step.action == HARVEST]
+
+
+def _step(model, action, strategy, debt_ratio, timestamp, moved) -> RebalanceStep:
+    return RebalanceStep(
+        action=action,
+        strategy=strategy,
+        debt_ratio=debt_ratio,
+        timestamp=timestamp,
+        moved=moved,
+        idle=model.balance,
+        outstanding=sum(model.debt_outstanding(s) for s in model.strategies),
+        credit=sum(model.credit_available(s) for s in model.strategies),
+    )
+
+
+def plan_rebalance(
+    model: VaultModel,
+    targets: Dict[str, int],
+    timestamp: int,
+    max_harvests: int = DEFAULT_MAX_HARVESTS,
+) -> RebalancePlan:
+    """
+    The debt ratio updates and harvests that take `model` to the debt ratios
+    in `targets`, from the next second after `timestamp`. Strategies missing
+    from `targets` keep their debt ratio, but may still be harvested. `model`
+    itself is left as it is.
+    """
+    model = copy.deepcopy(model)
+    steps = []
+
+    changes = [
+        (target - model.params(strategy).debtRatio, strategy, target)
+        for strategy, target in targets.items()
+        if target != model.params(strategy).debtRatio
+    ]
+    for _, strategy, target in sorted(changes, key=lambda change: change[0]):
+        model.update_strategy_debt_ratio(strategy, target)
+        steps.append(_step(model, UPDATE_DEBT_RATIO, strategy, target, timestamp, 0))
+
+    harvests = 0
+    while harvests < max_harvests:
+        timestamp += 1
+        # NOTE: Whoever owes goes first, then whoever has credit once that's in
+        owing = [s for s in model.strategies if model.debt_outstanding(s) > 0]
+        moved_any = False
+        for strategy in owing + [s for s in model.strategies if s not in owing]:
+            if harvests == max_harvests:
+                break
+            if strategy not in owing and model.credit_available(strategy) == 0:
+                continue
+
+            # NOTE: Tried on a copy, so a harvest that moves nothing leaves no trace
+            trial = copy.deepcopy(model)
+            params = trial.strategies[strategy]
+            total_debt = params.totalDebt
+            trial.contracts[strategy].harvest(timestamp)
+            moved = params.totalDebt - total_debt
+            if moved == 0:
+                continue
+
+            model = trial
+            steps.append(_step(model, HARVEST, strategy, None, timestamp, moved))
+            harvests += 1
+            moved_any = True
+
+        if not moved_any:
+            break
+
+    complete = not any(
+        model.debt_outstanding(s) > 0 or model.credit_available(s) > 0
+        for s in model.strategies
+    )
+    return RebalancePlan(steps=steps, model=model, complete=complete)
@@ -0,0 +1,358 @@
+"""
+Vectorized scenario simulator for Vault parameter sweeps
+
+`simulate` evolves many Vault configurations at once, each as one row of
+NumPy arrays, over a grid of timestamps. Every configuration starts with a
+single deposit and `k` Strategies that behave like
+`contracts/test/TestStrategy.sol`. Each Strategy earns its `apr` on what it
+holds and is harvested every `harvest_interval` seconds. Harvests run through
+the same accounting as `VaultModel.report`: losses, `_assessFees`, credit,
+debt repayment and locked profit.
+
+With `exact=True` the arrays hold Python integers (`dtype=object`) and every
+step floors like the contract, so each row matches `VaultModel` bit-for-bit.
+`exact=False` runs on `float64` instead. It is far faster, but only
+approximate. Reverts aren't modelled, and neither are `minDebtPerHarvest`
+and `maxDebtPerHarvest`.
+
+    result = simulate(
+        365 * DAY,
+        DAY,
+        **grid(management_fee=[0, 100, 200], debt_ratio=[(4_000, 5_000)]),
+        apr=(500, 800),
+    )
+    result.depositor_return  # one per configuration
+"""
+import itertools
+from dataclasses import dataclass
+from typing import Dict, Iterable
+
+import numpy as np
+
+from scripts.vault_model.vault import (
+    DEFAULT_LOCKED_PROFIT_DEGRADATION,
+    DEFAULT_MANAGEMENT_FEE,
+    DEFAULT_PERFORMANCE_FEE,
+    DEGRADATION_COEFFICIENT,
+    MAX_BPS,
+    SECS_PER_YEAR,
+)
+
+
+DAY = 24 * 60 * 60
+
+DEFAULT_STRATEGIST_FEE = 1_000  # 10% of yield
+DEFAULT_HARVEST_INTERVAL = 7 * DAY
+DEFAULT_DEPOSIT = 1_000_000  # whole tokens
+
+
+def grid(**axes: Iterable) -> Dict[str, np.ndarray]:
+    """
+    Every combination of the values in `axes`, as keyword arguments for
+    `simulate`. Values of Strategy parameters are tuples, one entry per
+    Strategy.
+    """
+    names = list(axes)
+    values = [np.asarray(list(axes[name]), dtype=object) for name in names]
+    index = np.array(list(itertools.product(*(range(len(v)) for v in values))))
+    return {name: v[index[:, j]] for j, (name, v) in enumerate(zip(names, values))}
+
+
+@dataclass(frozen=True)
+class Simulation:
+    """
+    `n` configurations over `t` timestamps. Amounts are in `want`, and values
+    of shares are taken at the last timestamp.
+    """
+
+    timestamps: np.ndarray  # (t,), seconds since the deposit
+    price_per_share: np.ndarray  # (n, t)
+    deposit: np.ndarray  # (n,)
+    depositor_value: np.ndarray  # (n,)
+    fees: np.ndarray  # (n,), `totalFee` of every `_assessFees`
+    rewards_shares: np.ndarray  # (n,)
+    rewards_value: np.ndarray  # (n,)
+    strategist_shares: np.ndarray  # (n,), all Strategies together
+    strategist_value: np.ndarray  # (n,)
+
+    @property
+    def depositor_return(self) -> np.ndarray:
+        return self.depositor_value.astype(float) / self.deposit.astype(float) - 1
+
+
+def _nonzero(values):
+    # NOTE: Only to keep masked-out rows from dividing by zero
+    return np.where(values == 0, 1, values)
+
+
+class VaultArrays:
+    """
+    The state of `n` Vaults with `k` Strategies each, mirroring the names in
+    `VaultModel`. Methods take the configurations `i` to act on.
+    """
+
+    def __init__(self, state: Dict[str, np.ndarray]):
+        # NOTE: Vault settings and totals are `(n,)`, Strategy ones `(n, k)`
+        self.balance = state["balance"]
+        self.total_supply = state["total_supply"]
+        self.total_debt = state["total_debt"]
+        self.locked_profit = state["locked_profit"]
+        self.last_report = state["last_report"]
+        self.locked_profit_degradation = state["locked_profit_degradation"]
+        self.performance_fee = state["performance_fee"]
+        self.management_fee = state["management_fee"]
+        self.debt_ratio = state["debt_ratio"]
+        self.vault_debt_ratio = state["debt_ratio"].sum(axis=1)
+        self.strategist_fee = state["strategist_fee"]
+        self.strategy_balance = state["strategy_balance"]
+        self.strategy_debt = state["strategy_debt"]
+        self.strategy_last_report = state["strategy_last_report"]
+        # NOTE: Held at what it is to begin with
+        self.delegated_assets = state["delegated_assets"]
+        self.apr = state["apr"]
+        self.harvest_interval = state["harvest_interval"]
+        self.harvested = state["harvested"]
+
+        # What `_assessFees` charged, and who the shares went to
+        self.fees = self.strategy_debt * 0
+        self.strategist_shares = self.strategy_debt * 0
+        self.rewards_shares = self.total_supply * 0
+
+    def total_assets(self, i):
+        return self.balance[i] + self.total_debt[i]
+
+    def calculate_locked_profit(self, i, timestamp: int):
+        locked_funds_ratio = (timestamp - self.last_report[i]) * (
+            self.locked_profit_degradation[i]
+        )
+        locked_profit = self.locked_profit[i]
+        return np.where(
+            locked_funds_ratio < DEGRADATION_COEFFICIENT,
+            locked_profit
+            - locked_funds_ratio * locked_profit // DEGRADATION_COEFFICIENT,
+            0,
+        )
+
+    def free_funds(self, i, timestamp: int):
+        return self.total_assets(i) - self.calculate_locked_profit(i, timestamp)
+
+    def share_value(self, i, shares, timestamp: int):
+        total_supply = self.total_supply[i]
+        return np.where(
+            total_supply == 0,
+            shares,
+            shares * self.free_funds(i, timestamp) // _nonzero(total_supply),
+        )
+
+    def debt_outstanding(self, i, k: int):
+        strategy_total_debt = self.strategy_debt[i, k]
+        strategy_debt_limit = self.debt_ratio[i, k] * self.total_assets(i) // MAX_BPS
+        return np.where(
+            self.vault_debt_ratio[i] == 0,
+            strategy_total_debt,
+            np.maximum(strategy_total_debt - strategy_debt_limit, 0),
+        )
+
+    def credit_available(self, i, k: int):
+        vault_total_assets = self.total_assets(i)
+        vault_debt_limit = self.vault_debt_ratio[i] * vault_total_assets // MAX_BPS
+        strategy_debt_limit = self.debt_ratio[i, k] * vault_total_assets // MAX_BPS
+        available = np.minimum(
+            strategy_debt_limit - self.strategy_debt[i, k],
+            vault_debt_limit - self.total_debt[i],
+        )
+        return np.maximum(np.minimum(available, self.balance[i]), 0)
+
+    def accrue(self, seconds: int):
+        self.strategy_balance += (
+            self.strategy_balance * self.apr * seconds // (MAX_BPS * SECS_PER_YEAR)
+        )
+
+    def harvest(self, i, k: int, timestamp: int):
+        # `TestStrategy.prepareReturn`
+        strategy_balance = self.strategy_balance[i, k]
+        debt_payment = np.minimum(strategy_balance, self.debt_outstanding(i, k))
+        remaining = strategy_balance - debt_payment
+        total_debt = self.strategy_debt[i, k] - debt_payment
+        gain = np.maximum(remaining - total_debt, 0)
+        loss = np.maximum(total_debt - remaining, 0)
+
+        # `_reportLoss`
+        ratio_change = np.minimum(
+            loss * self.vault_debt_ratio[i] // _nonzero(self.total_debt[i]),
+            self.debt_ratio[i, k],
+        )
+        self.debt_ratio[i, k] -= ratio_change
+        self.vault_debt_ratio[i] -= ratio_change
+        self.strategy_debt[i, k] -= loss
+        self.total_debt[i] -= loss
+
+        # `_assessFees`
+        duration = timestamp - self.strategy_last_report[i, k]
+        management_fee = (
+            (self.strategy_debt[i, k] - self.delegated_assets[i, k])
+            * duration
+            * self.management_fee[i]
+            // MAX_BPS
+            // SECS_PER_YEAR
+        )
+        strategist_fee = gain * self.strategist_fee[i, k] // MAX_BPS
+        performance_fee = gain * self.performance_fee[i] // MAX_BPS
+        total_fee = np.minimum(management_fee + strategist_fee + performance_fee, gain)
+        total_supply = self.total_supply[i]
+        reward = np.where(
+            total_supply > 0,
+            total_fee * total_supply // _nonzero(self.free_funds(i, timestamp)),
+            total_fee,
+        )
+        strategist_reward = strategist_fee * reward // _nonzero(total_fee)
+        self.total_supply[i] += reward
+        self.strategist_shares[i, k] += strategist_reward
+        self.rewards_shares[i] += reward - strategist_reward
+        self.fees[i, k] += total_fee
+
+        # The rest of `report`
+        credit = self.credit_available(i, k)
+        debt_payment = np.minimum(debt_payment, self.debt_outstanding(i, k))
+        self.strategy_debt[i, k] += credit - debt_payment
+        self.total_debt[i] += credit - debt_payment
+        total_avail = gain + debt_payment
+        self.strategy_balance[i, k] += credit - total_avail
+        self.balance[i] += total_avail - credit
+
+        locked_profit_before_loss = (
+            self.calculate_locked_profit(i, timestamp) + gain - total_fee
+        )
+        self.locked_profit[i] = np.maximum(locked_profit_before_loss - loss, 0)
+        self.strategy_last_report[i, k] = timestamp
+        self.last_report[i] = timestamp
+        self.harvested[i, k] = True
+
+
+def as_array(value, shape, exact: bool) -> np.ndarray:
+    """
+    Broadcast `value` to `shape`, as Python integers if `exact`, or `float64`.
+    """
+    value = np.broadcast_to(np.asarray(value, dtype=object), shape)
+    if exact:
+        # NOTE: Python integers, which can't overflow
+        return np.frompyfunc(int, 1, 1)(value)
+    return value.astype(np.float64)
+
+
+def run_schedule(
+    vaults: VaultArrays, timestamps: np.ndarray, step: int, unit
+) -> np.ndarray:
+    """
+    Accrue yield and harvest every Strategy that is due, at each of
+    `timestamps`. Returns the value of `unit` shares, i.e. `pricePerShare`
+    for `10 ** decimals`, at each of them.
+    """
+    n, k = vaults.strategy_debt.shape
+    price_per_share = np.empty((n, len(timestamps)), dtype=vaults.balance.dtype)
+    everything = np.arange(n)
+    for t, timestamp in enumerate(timestamps.tolist()):
+        vaults.accrue(step)
+        for strategy in range(k):
+            elapsed = timestamp - vaults.strategy_last_report[:, strategy]
+            due = (elapsed >= vaults.harvest_interval[:, strategy]) | (
+                ~vaults.harvested[:, strategy]
+            )
+            # NOTE: Only the rows being harvested, which is most of the saving
+            #       in exact mode when harvests are sparser than `step`
+            i = np.flatnonzero(due)
+            if len(i) > 0:
+                vaults.harvest(i, strategy, timestamp)
+        price_per_share[:, t] = vaults.share_value(everything, unit, timestamp)
+    return price_per_share
+
+
+def simulate(
+    duration: int,
+    step: int,
+    debt_ratio,
+    apr,
+    harvest_interval=DEFAULT_HARVEST_INTERVAL,
+    strategist_fee=DEFAULT_STRATEGIST_FEE,
+    deposit=None,
+    performance_fee=DEFAULT_PERFORMANCE_FEE,
+    management_fee=DEFAULT_MANAGEMENT_FEE,
+    locked_profit_degradation=DEFAULT_LOCKED_PROFIT_DEGRADATION,
+    decimals: int = 18,
+    exact: bool = True,
+) -> Simulation:
+    """
+    Simulate `duration` seconds in increments of `step`.
+
+    Vault parameters broadcast to `(n,)` and Strategy parameters to `(n, k)`,
+    so a single value applies to every configuration. `debt_ratio`, `apr`,
+    fees and `strategist_fee` are in basis points (`apr` is yearly, and not
+    compounded within a harvest), and `deposit` is in the smallest unit of
+    `want`. Every Strategy is first harvested at `step`.
+    """
+    if deposit is None:
+        deposit = DEFAULT_DEPOSIT * 10 ** decimals
+    vault_parameters = dict(
+        deposit=deposit,
+        performance_fee=performance_fee,
+        management_fee=management_fee,
+        locked_profit_degradation=locked_profit_degradation,
+    )
+    strategy_parameters = dict(
+        debt_ratio=np.atleast_1d(np.asarray(debt_ratio, dtype=object)),
+        apr=apr,
+        harvest_interval=harvest_interval,
+        strategist_fee=strategist_fee,
+    )
+    strategy_shape = np.broadcast_shapes(*map(np.shape, strategy_parameters.values()))
+    shape = np.broadcast_shapes(
+        *map(np.shape, vault_parameters.values()), strategy_shape[:-1], (1,)
+    )
+    if len(shape) != 1:
+        raise ValueError(f"Parameters don't broadcast to one row each: {shape}")
+    (n,), k = shape, strategy_shape[-1]
+
+    parameters = {
+        name: as_array(value, (n,), exact) for name, value in vault_parameters.items()
+    }
+    parameters.update(
+        (name, as_array(value, (n, k), exact))
+        for name, value in strategy_parameters.items()
+    )
+    zeros = parameters["deposit"] * 0
+    strategy_zeros = parameters["debt_ratio"] * 0
+    vaults = VaultArrays(
+        dict(
+            parameters,
+            balance=parameters["deposit"].copy(),
+            total_supply=parameters["deposit"].copy(),
+            total_debt=zeros.copy(),
+            locked_profit=zeros.copy(),
+            last_report=zeros.copy(),
+            strategy_balance=strategy_zeros.copy(),
+            strategy_debt=strategy_zeros.copy(),
+            strategy_last_report=strategy_zeros.copy(),
+            delegated_assets=strategy_zeros.copy(),
+            harvested=np.zeros((n, k), dtype=bool),
+        )
+    )
+
+    timestamps = np.arange(1, duration // step + 1) * step
+    price_per_share = run_schedule(vaults, timestamps, step, 10 ** decimals)
+
+    everything = np.arange(n)
+    timestamp = timestamps[-1].item() if len(timestamps) else 0
+    strategist_shares = vaults.strategist_shares.sum(axis=1)
+    return Simulation(
+        timestamps=timestamps,
+        price_per_share=price_per_share,
+        deposit=parameters["deposit"],
+        depositor_value=vaults.share_value(
+            everything, parameters["deposit"], timestamp
+        ),
+        fees=vaults.fees.sum(axis=1),
+        rewards_shares=vaults.rewards_shares,
+        rewards_value=vaults.share_value(everything, vaults.rewards_shares, timestamp),
+        strategist_shares=strategist_shares,
+        strategist_value=vaults.share_value(everything, strategist_shares, timestamp),
+    )
@@ -0,0 +1,150 @@
+"""
+Strategy side of the Vault accounting model
+
+`StrategyModel` mirrors `BaseStrategy.harvest` and `BaseStrategy.withdraw`, the
+two places a Strategy moves `want` to and from its Vault. Subclasses fill in
+`prepare_return`, `liquidate_position` and `liquidate_all_positions` the way the
+Strategy being modelled implements them, e.g. `TestStrategyModel` for
+`contracts/test/TestStrategy.sol`.
+
+Health checks aren't modelled, a harvest that would fail one goes through.
+"""
+from abc import ABC, abstractmethod
+from typing import Tuple
+
+from scripts.vault_model.vault import VaultModel, _atomic, _sub
+
+
+class StrategyModel(ABC):
+    def __init__(self, address: str, vault: VaultModel):
+        self.address = address
+        self.vault = vault
+        self.balance = 0  # `want.balanceOf(strategy)`
+        self.emergency_exit = False
+
+    def estimated_total_assets(self) -> int:
+        return self.balance
+
+    def delegated_assets(self) -> int:
+        return 0
+
+    def is_active(self) -> bool:
+        return (
+            self.vault.params(self.address).debtRatio > 0
+            or self.estimated_total_assets() > 0
+        )
+
+    @abstractmethod
+    def prepare_return(self, debt_outstanding: int) -> Tuple[int, int, int]:
+        """
+        Returns `(profit, loss, debt_payment)`.
+        """
+
+    def adjust_position(self, debt_outstanding: int):
+        pass
+
+    @abstractmethod
+    def liquidate_position(self, amount_needed: int) -> Tuple[int, int]:
+        """
+        Returns `(liquidated_amount, loss)`.
+        """
+
+    @abstractmethod
+    def liquidate_all_positions(self) -> int:
+        """
+        Returns the amount freed.
+        """
+
+    def withdraw(self, amount_needed: int) -> int:
+        # NOTE: Only called by the Vault, from inside `VaultModel.withdraw`
+        amount_freed, loss = self.liquidate_position(amount_needed)
+        self.balance = _sub(self.balance, amount_freed)
+        self.vault.balance += amount_freed
+        return loss
+
+    @_atomic
+    def harvest(self, timestamp: int) -> int:
+        vault = self.vault
+        profit = 0
+        loss = 0
+        debt_outstanding = vault.debt_outstanding(self.address)
+        debt_payment = 0
+        if self.emergency_exit:
+            # Free up as much capital as possible
+            amount_freed = self.liquidate_all_positions()
+            if amount_freed < debt_outstanding:
+                loss = debt_outstanding - amount_freed
+            elif amount_freed > debt_outstanding:
+                profit = amount_freed - debt_outstanding
+            debt_payment = _sub(debt_outstanding, loss)
+        else:
+            profit, loss, debt_payment = self.prepare_return(debt_outstanding)
+
+        debt_outstanding = vault.report(
+            self.address, profit, loss, debt_payment, timestamp
+        )
+        self.adjust_position(debt_outstanding)
+        return profit
+
+    @_atomic
+    def set_emergency_exit(self):
+        self.emergency_exit = True
+        self.vault.revoke_strategy(self.address)
+
+
+class TestStrategyModel(StrategyModel):
+    """
+    `contracts/test/TestStrategy.sol`, which treats everything it holds as
+    invested.
+    """
+
+    __test__ = False  # NOTE: Not a test class, despite the name
+
+    def __init__(self, address: str, vault: VaultModel):
+        super().__init__(address, vault)
+        self.delegate_everything = False
+
+    def delegated_assets(self) -> int:
+        if self.delegate_everything:
+            return self.vault.params(self.address).totalDebt
+        else:
+            return 0
+
+    def prepare_return(self, debt_outstanding: int) -> Tuple[int, int, int]:
+        profit = 0
+        loss = 0
+        total_assets = self.balance
+        total_debt = self.vault.params(self.address).totalDebt
+        if total_assets > debt_outstanding:
+            debt_payment = debt_outstanding
+            total_assets -= debt_outstanding
+        else:
+            debt_payment = total_assets
+            total_assets = 0
+        total_debt = _sub(total_debt, debt_payment)
+
+        if total_assets > total_debt:
+            profit = total_assets - total_debt
+        else:
+            loss = total_debt - total_assets
+        return profit, loss, debt_payment
+
+    def liquidate_position(self, amount_needed: int) -> Tuple[int, int]:
+        loss = 0
+        total_debt = self.vault.params(self.address).totalDebt
+        total_assets = self.balance
+        if amount_needed > total_assets:
+            return total_assets, amount_needed - total_assets
+        # NOTE: Just in case something was stolen from this contract
+        if total_debt > total_assets:
+            loss = min(total_debt - total_assets, amount_needed)
+        return amount_needed, loss
+
+    def liquidate_all_positions(self) -> int:
+        return self.balance
+
+    def take_funds(self, amount: int):
+        """
+        `_takeFunds`, to simulate a loss.
+        """
+        self.balance = _sub(self.balance, amount)
@@ -0,0 +1,614 @@
+"""
+Exact-integer model of the accounting in `contracts/Vault.vy`
+
+Every method mirrors the Vyper function of the same name statement by
+statement, on Python integers with the same floor division, so the model
+matches the contract bit-for-bit. A failed `assert`, an underflow, an overflowing
+product or a division by zero raises `VaultRevert`, and the model (including
+its Strategies) is left exactly as it was, like a reverted transaction.
+
+Only the accounting is modelled: access control, pausing, guest lists, permits
+and events are not. `block.timestamp` is passed in to everything that reads it.
+"""
+import functools
+from dataclasses import dataclass, replace
+from typing import Dict, List, Sequence
+
+
+MAX_UINT256 = 2 ** 256 - 1
+MAX_BPS = 10_000
+SECS_PER_YEAR = 31_556_952  # 365.2425 days
+MAXIMUM_STRATEGIES = 20
+DEGRADATION_COEFFICIENT = 10 ** 18
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+# NOTE: The values `Vault.initialize` sets
+DEFAULT_PERFORMANCE_FEE = 1_000  # 10% of yield
+DEFAULT_MANAGEMENT_FEE = 200  # 2% per year
+DEFAULT_LOCKED_PROFIT_DEGRADATION = DEGRADATION_COEFFICIENT * 46 // 10 ** 6
+
+VAULT = "vault"
+REWARDS = "rewards"
+
+
+class VaultRevert(Exception):
+    pass
+
+
+def _require(condition: bool, reason: str = "assert"):
+    if not condition:
+        raise VaultRevert(reason)
+
+
+def _sub(a: int, b: int) -> int:
+    if b > a:
+        raise VaultRevert("underflow")
+    return a - b
+
+
+def _uint(value: int) -> int:
+    if value > MAX_UINT256:
+        raise VaultRevert("overflow")
+    return value
+
+
+def _div(a: int, b: int) -> int:
+    if b == 0:
+        raise VaultRevert("division by zero")
+    return a // b
+
+
+def _atomic(method):
+    """
+    Roll the Vault and all of its Strategies back if `method` reverts.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        vault = getattr(self, "vault", self)
+        saved = vault._save()
+        try:
+            return method(self, *args, **kwargs)
+        except VaultRevert:
+            vault._restore(saved)
+            raise
+
+    return wrapper
+
+
+@dataclass
+class StrategyParams:
+    performanceFee: int
+    activation: int
+    debtRatio: int
+    minDebtPerHarvest: int
+    maxDebtPerHarvest: int
+    lastReport: int
+    totalDebt: int = 0
+    totalGain: int = 0
+    totalLoss: int = 0
+
+
+# NOTE: What reading `strategies` returns for an address that was never added
+EMPTY_PARAMS = StrategyParams(0, 0, 0, 0, 0, 0)
+
+
+@dataclass(frozen=True)
+class Withdrawal:
+    shares: int  # burnt
+    value: int  # what `withdraw` returns, including `fee`
+    fee: int  # sent to `rewards`
+    loss: int  # realized by Strategies in the withdrawal queue
+
+
+class VaultModel:
+    def __init__(
+        self,
+        timestamp: int,
+        decimals: int = 18,
+        address: str = VAULT,
+        rewards: str = REWARDS,
+        # NOTE: Starts at 0 in the contract, but every deployment raises it
+        deposit_limit: int = MAX_UINT256,
+    ):
+        self.address = address
+        self.decimals = decimals
+        self.rewards = rewards
+        self.balance = 0  # `token.balanceOf(vault)`
+        self.total_supply = 0
+        self.balance_of: Dict[str, int] = {}
+        self.strategies: Dict[str, StrategyParams] = {}
+        # NOTE: The Strategy models, for the calls the Vault makes into them
+        self.contracts: Dict[str, object] = {}
+        self.withdrawal_queue: List[str] = []
+        self.emergency_shutdown = False
+        self.deposit_limit = deposit_limit
+        self.debt_ratio = 0
+        self.total_debt = 0
+        self.last_report = timestamp
+        self.activation = timestamp
+        self.locked_profit = 0
+        self.locked_profit_degradation = DEFAULT_LOCKED_PROFIT_DEGRADATION
+        self.performance_fee = DEFAULT_PERFORMANCE_FEE
+        self.management_fee = DEFAULT_MANAGEMENT_FEE
+        self.withdrawal_fee = 0
+
+    def _save(self):
+        return (
+            dict(self.__dict__),
+            dict(self.balance_of),
+            {address: replace(params) for address, params in self.strategies.items()},
+            dict(self.contracts),
+            list(self.withdrawal_queue),
+            {address: dict(c.__dict__) for address, c in self.contracts.items()},
+        )
+
+    def _restore(self, saved):
+        state, balance_of, strategies, contracts, queue, contract_states = saved
+        self.__dict__.update(state)
+        self.balance_of = balance_of
+        self.strategies = strategies
+        self.contracts = contracts
+        self.withdrawal_queue = queue
+        for address, contract_state in contract_states.items():
+            contracts[address].__dict__.update(contract_state)
+
+    def params(self, strategy: str) -> StrategyParams:
+        return self.strategies.get(strategy, EMPTY_PARAMS)
+
+    # Views
+
+    def total_assets(self) -> int:
+        return self.balance + self.total_debt
+
+    def calculate_locked_profit(self, timestamp: int) -> int:
+        locked_funds_ratio = _uint(
+            _sub(timestamp, self.last_report) * self.locked_profit_degradation
+        )
+        if locked_funds_ratio < DEGRADATION_COEFFICIENT:
+            locked_profit = self.locked_profit
+            return locked_profit - (
+                _uint(locked_funds_ratio * locked_profit) // DEGRADATION_COEFFICIENT
+            )
+        else:
+            return 0
+
+    def free_funds(self, timestamp: int) -> int:
+        return _sub(self.total_assets(), self.calculate_locked_profit(timestamp))
+
+    def share_value(self, shares: int, timestamp: int) -> int:
+        if self.total_supply == 0:
+            return shares
+        return _uint(shares * self.free_funds(timestamp)) // self.total_supply
+
+    def shares_for_amount(self, amount: int, timestamp: int) -> int:
+        free_funds = self.free_funds(timestamp)
+        if free_funds > 0:
+            return _uint(amount * self.total_supply) // free_funds
+        else:
+            return 0
+
+    def price_per_share(self, timestamp: int) -> int:
+        return self.share_value(10 ** self.decimals, timestamp)
+
+    def max_available_shares(self, timestamp: int) -> int:
+        shares = self.shares_for_amount(self.balance, timestamp)
+        for strategy in self.withdrawal_queue:
+            shares += self.shares_for_amount(
+                self.strategies[strategy].totalDebt, timestamp
+            )
+        return shares
+
+    def debt_outstanding(self, strategy: str) -> int:
+        params = self.params(strategy)
+        if self.debt_ratio == 0:
+            return params.totalDebt
+
+        strategy_debt_limit = _uint(params.debtRatio * self.total_assets()) // MAX_BPS
+        strategy_total_debt = params.totalDebt
+
+        if self.emergency_shutdown:
+            return strategy_total_debt
+        elif strategy_total_debt <= strategy_debt_limit:
+            return 0
+        else:
+            return strategy_total_debt - strategy_debt_limit
+
+    def credit_available(self, strategy: str) -> int:
+        if self.emergency_shutdown:
+            return 0
+        params = self.params(strategy)
+        vault_total_assets = self.total_assets()
+        vault_debt_limit = _uint(self.debt_ratio * vault_total_assets) // MAX_BPS
+        vault_total_debt = self.total_debt
+        strategy_debt_limit = _uint(params.debtRatio * vault_total_assets) // MAX_BPS
+        strategy_total_debt = params.totalDebt
+
+        # Exhausted credit line
+        if (
+            strategy_debt_limit <= strategy_total_debt
+            or vault_debt_limit <= vault_total_debt
+        ):
+            return 0
+
+        # Start with debt limit left for the Strategy
+        available = strategy_debt_limit - strategy_total_debt
+        # Adjust by the global debt limit left
+        available = min(available, vault_debt_limit - vault_total_debt)
+        # Can only borrow up to what the contract has in reserve
+        available = min(available, self.balance)
+
+        # Adjust by min and max borrow limits (per harvest)
+        if available < params.minDebtPerHarvest:
+            return 0
+        else:
+            return min(available, params.maxDebtPerHarvest)
+
+    def expected_return(self, strategy: str, timestamp: int) -> int:
+        params = self.params(strategy)
+        time_since_last_harvest = _sub(timestamp, params.lastReport)
+        total_harvest_time = _sub(params.lastReport, params.activation)
+
+        if (
+            time_since_last_harvest > 0
+            and total_harvest_time > 0
+            and self.contracts[strategy].is_active()
+        ):
+            return (
+                _uint(params.totalGain * time_since_last_harvest) // total_harvest_time
+            )
+        else:
+            return 0
+
+    # Internal
+
+    def _transfer(self, sender: str, receiver: str, amount: int):
+        _require(receiver not in (self.address, ZERO_ADDRESS))
+        self.balance_of[sender] = _sub(self.balance_of.get(sender, 0), amount)
+        self.balance_of[receiver] = self.balance_of.get(receiver, 0) + amount
+
+    def _issue_shares_for_amount(self, to: str, amount: int, timestamp: int) -> int:
+        total_supply = self.total_supply
+        if total_supply > 0:
+            shares = _div(_uint(amount * total_supply), self.free_funds(timestamp))
+        else:
+            shares = amount
+        _require(shares != 0, "division rounding resulted in zero")
+
+        self.total_supply = total_supply + shares
+        self.balance_of[to] = self.balance_of.get(to, 0) + shares
+        return shares
+
+    def _report_loss(self, strategy: str, loss: int):
+        params = self.strategies[strategy]
+        total_debt = params.totalDebt
+        _require(total_debt >= loss)
+
+        if self.debt_ratio != 0:
+            ratio_change = min(
+                _uint(loss * self.debt_ratio) // self.total_debt,
+                params.debtRatio,
+            )
+            params.debtRatio -= ratio_change
+            self.debt_ratio = _sub(self.debt_ratio, ratio_change)
+        params.totalLoss += loss
+        params.totalDebt = total_debt - loss
+        self.total_debt = _sub(self.total_debt, loss)
+
+    def _assess_fees(self, strategy: str, gain: int, timestamp: int) -> int:
+        params = self.strategies[strategy]
+        duration = _sub(timestamp, params.lastReport)
+        _require(duration != 0, "can't assessFees twice within the same block")
+
+        if gain == 0:
+            return 0
+
+        management_fee = (
+            _uint(
+                _sub(params.totalDebt, self.contracts[strategy].delegated_assets())
+                * duration
+                * self.management_fee
+            )
+            // MAX_BPS
+            // SECS_PER_YEAR
+        )
+        strategist_fee = _uint(gain * params.performanceFee) // MAX_BPS
+        performance_fee = _uint(gain * self.performance_fee) // MAX_BPS
+
+        total_fee = performance_fee + strategist_fee + management_fee
+        if total_fee > gain:
+            total_fee = gain
+        if total_fee > 0:
+            reward = self._issue_shares_for_amount(self.address, total_fee, timestamp)
+
+            if strategist_fee > 0:
+                strategist_reward = _uint(strategist_fee * reward) // total_fee
+                self._transfer(self.address, strategy, strategist_reward)
+            # NOTE: Governance earns any dust leftover from flooring math above
+            if self.balance_of[self.address] > 0:
+                self._transfer(
+                    self.address, self.rewards, self.balance_of[self.address]
+                )
+        return total_fee
+
+    # User functions
+
+    @_atomic
+    def deposit(self, recipient: str, amount: int, timestamp: int) -> int:
+        """
+        Deposit `amount` for `recipient`. Unlike the contract, `amount` can't
+        default to the depositor's balance, which the model doesn't know.
+        """
+        _require(not self.emergency_shutdown, "emergency shutdown")
+        _require(recipient not in (self.address, ZERO_ADDRESS))
+        _require(self.total_assets() + amount <= self.deposit_limit, "deposit limit")
+        _require(amount > 0)
+
+        shares = self._issue_shares_for_amount(recipient, amount, timestamp)
+        self.balance += amount
+        return shares
+
+    @_atomic
+    def withdraw(
+        self,
+        owner: str,
+        timestamp: int,
+        max_shares: int = MAX_UINT256,
+        max_loss: int = 1,  # 0.01% [BPS]
+    ) -> Withdrawal:
+        shares = max_shares
+        _require(max_loss <= MAX_BPS)
+        if shares == MAX_UINT256:
+            shares = self.balance_of.get(owner, 0)
+        _require(shares <= self.balance_of.get(owner, 0))
+        _require(shares > 0)
+
+        value = self.share_value(shares, timestamp)
+        total_loss = 0
+        if value > self.balance:
+            for strategy in list(self.withdrawal_queue):
+                vault_balance = self.balance
+                if value <= vault_balance:
+                    break  # We're done withdrawing
+
+                amount_needed = value - vault_balance
+                amount_needed = min(amount_needed, self.strategies[strategy].totalDebt)
+                if amount_needed == 0:
+                    continue
+
+                loss = self.contracts[strategy].withdraw(amount_needed)
+                withdrawn = _sub(self.balance, vault_balance)
+
+                if loss > 0:
+                    value = _sub(value, loss)
+                    total_loss += loss
+                    self._report_loss(strategy, loss)
+
+                params = self.strategies[strategy]
+                params.totalDebt = _sub(params.totalDebt, withdrawn)
+                self.total_debt = _sub(self.total_debt, withdrawn)
+
+            vault_balance = self.balance
+            if value > vault_balance:
+                value = vault_balance
+                shares = self.shares_for_amount(value + total_loss, timestamp)
+
+            _require(
+                total_loss <= _uint(max_loss * (value + total_loss)) // MAX_BPS,
+                "max loss",
+            )
+
+        self.total_supply = _sub(self.total_supply, shares)
+        self.balance_of[owner] = _sub(self.balance_of[owner], shares)
+
+        fee = _uint(value * self.withdrawal_fee) // MAX_BPS
+        self.balance = _sub(self.balance, value)
+        return Withdrawal(shares, value, fee, total_loss)
+
+    @_atomic
+    def transfer(self, sender: str, receiver: str, amount: int):
+        self._transfer(sender, receiver, amount)
+
+    # Strategy functions
+
+    @_atomic
+    def report(
+        self, strategy: str, gain: int, loss: int, debt_payment: int, timestamp: int
+    ) -> int:
+        """
+        `report` as called by `strategy`. Returns the debt it should pay back.
+        """
+        params = self.params(strategy)
+        _require(params.activation > 0, "!strategy")
+        contract = self.contracts[strategy]
+        _require(contract.balance >= gain + debt_payment, "!balance")
+
+        if loss > 0:
+            self._report_loss(strategy, loss)
+
+        total_fees = self._assess_fees(strategy, gain, timestamp)
+        params.totalGain += gain
+
+        credit = self.credit_available(strategy)
+        debt = self.debt_outstanding(strategy)
+        debt_payment = min(debt_payment, debt)
+
+        if debt_payment > 0:
+            params.totalDebt -= debt_payment
+            self.total_debt -= debt_payment
+            debt -= debt_payment
+
+        if credit > 0:
+            params.totalDebt += credit
+            self.total_debt += credit
+
+        total_avail = gain + debt_payment
+        if total_avail < credit:  # credit surplus, give to Strategy
+            self.balance = _sub(self.balance, credit - total_avail)
+            contract.balance += credit - total_avail
+        elif total_avail > credit:  # credit deficit, take from Strategy
+            contract.balance = _sub(contract.balance, total_avail - credit)
+            self.balance += total_avail - credit
+
+        locked_profit_before_loss = (
+            self.calculate_locked_profit(timestamp) + gain - total_fees
+        )
+        if locked_profit_before_loss > loss:
+            self.locked_profit = locked_profit_before_loss - loss
+        else:
+            self.locked_profit = 0
+
+        params.lastReport = timestamp
+        self.last_report = timestamp
+
+        if params.debtRatio == 0 or self.emergency_shutdown:
+            return contract.estimated_total_assets()
+        else:
+            return debt
+
+    # Governance functions
+
+    @_atomic
+    def add_strategy(
+        self,
+        strategy,
+        debt_ratio: int,
+        min_debt_per_harvest: int,
+        max_debt_per_harvest: int,
+        performance_fee: int,
+        timestamp: int,
+    ):
+        """
+        Add the Strategy model `strategy`, as `addStrategy` does.
+        """
+        _require(len(self.withdrawal_queue) < MAXIMUM_STRATEGIES, "queue full")
+        _require(not self.emergency_shutdown, "emergency shutdown")
+        _require(strategy.address != ZERO_ADDRESS)
+        _require(self.params(strategy.address).activation == 0)
+        _require(strategy.vault is self)
+
+        _require(self.debt_ratio + debt_ratio <= MAX_BPS)
+        _require(min_debt_per_harvest <= max_debt_per_harvest)
+        _require(performance_fee <= MAX_BPS // 2)
+
+        self.strategies[strategy.address] = StrategyParams(
+            performanceFee=performance_fee,
+            activation=timestamp,
+            debtRatio=debt_ratio,
+            minDebtPerHarvest=min_debt_per_harvest,
+            maxDebtPerHarvest=max_debt_per_harvest,
+            lastReport=timestamp,
+        )
+        self.contracts[strategy.address] = strategy
+        self.debt_ratio += debt_ratio
+        self.withdrawal_queue.append(strategy.address)
+
+    @_atomic
+    def update_strategy_debt_ratio(self, strategy: str, debt_ratio: int):
+        params = self.params(strategy)
+        _require(params.activation > 0)
+        self.debt_ratio = _sub(self.debt_ratio, params.debtRatio)
+        params.debtRatio = debt_ratio
+        self.debt_ratio += debt_ratio
+        _require(self.debt_ratio <= MAX_BPS)
+
+    @_atomic
+    def update_strategy_min_debt_per_harvest(
+        self, strategy: str, min_debt_per_harvest: int
+    ):
+        params = self.params(strategy)
+        _require(params.activation > 0)
+        _require(params.maxDebtPerHarvest >= min_debt_per_harvest)
+        params.minDebtPerHarvest = min_debt_per_harvest
+
+    @_atomic
+    def update_strategy_max_debt_per_harvest(
+        self, strategy: str, max_debt_per_harvest: int
+    ):
+        params = self.params(strategy)
+        _require(params.activation > 0)
+        _require(params.minDebtPerHarvest <= max_debt_per_harvest)
+        params.maxDebtPerHarvest = max_debt_per_harvest
+
+    @_atomic
+    def update_strategy_performance_fee(self, strategy: str, performance_fee: int):
+        params = self.params(strategy)
+        _require(performance_fee <= MAX_BPS // 2)
+        _require(params.activation > 0)
+        params.performanceFee = performance_fee
+
+    @_atomic
+    def revoke_strategy(self, strategy: str):
+        params = self.params(strategy)
+        _require(params.debtRatio != 0, "already zero")
+        self.debt_ratio = _sub(self.debt_ratio, params.debtRatio)
+        params.debtRatio = 0
+
+    @_atomic
+    def set_withdrawal_queue(self, queue: Sequence[str]):
+        # NOTE: A literal copy, including which new entries it lets through
+        _require(len(queue) <= MAXIMUM_STRATEGIES)
+        padding = [ZERO_ADDRESS] * MAXIMUM_STRATEGIES
+        queue = (list(queue) + padding)[:MAXIMUM_STRATEGIES]
+        current = (self.withdrawal_queue + padding)[:MAXIMUM_STRATEGIES]
+        old_queue = list(padding)
+        for i in range(MAXIMUM_STRATEGIES):
+            old_queue[i] = current[i]
+            if queue[i] == ZERO_ADDRESS:
+                _require(old_queue[i] == ZERO_ADDRESS)
+                break
+            _require(old_queue[i] != ZERO_ADDRESS)
+            _require(self.params(queue[i]).activation > 0)
+
+            exists_in_old_queue = False
+            for j in range(MAXIMUM_STRATEGIES):
+                if queue[j] == ZERO_ADDRESS:
+                    exists_in_old_queue = True
+                    break
+                if queue[i] == old_queue[j]:
+                    exists_in_old_queue = True
+                if j <= i:
+                    continue
+                _require(queue[i] != queue[j], "do not add duplicate strategies")
+            _require(exists_in_old_queue, "do not add new strategies")
+
+            current[i] = queue[i]
+        self.withdrawal_queue = [s for s in current if s != ZERO_ADDRESS]
+
+    @_atomic
+    def add_strategy_to_queue(self, strategy: str):
+        _require(self.params(strategy).activation > 0)
+        _require(strategy not in self.withdrawal_queue)
+        _require(len(self.withdrawal_queue) < MAXIMUM_STRATEGIES)
+        self.withdrawal_queue.append(strategy)
+
+    @_atomic
+    def remove_strategy_from_queue(self, strategy: str):
+        _require(strategy in self.withdrawal_queue)
+        self.withdrawal_queue.remove(strategy)
+
+    @_atomic
+    def set_performance_fee(self, fee: int):
+        _require(fee <= MAX_BPS // 2)
+        self.performance_fee = fee
+
+    @_atomic
+    def set_management_fee(self, fee: int):
+        _require(fee <= MAX_BPS)
+        self.management_fee = fee
+
+    @_atomic
+    def set_withdrawal_fee(self, fee: int):
+        _require(fee <= 50)  # 50 Basis Points = 0.5%
+        self.withdrawal_fee = fee
+
+    @_atomic
+    def set_locked_profit_degradation(self, degradation: int):
+        _require(degradation <= DEGRADATION_COEFFICIENT)
+        self.locked_profit_degradation = degradation
+
+    def set_deposit_limit(self, limit: int):
+        self.deposit_limit = limit
+
+    def set_emergency_shutdown(self, active: bool):
+        self.emergency_shutdown = active
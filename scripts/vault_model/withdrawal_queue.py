@@ -0,0 +1,242 @@
+"""
+Withdrawal queue ordering optimizer
+
+`Vault.withdraw` pays out of its idle balance first, then walks
+`withdrawalQueue` in order. From each Strategy it asks for what is still
+needed, capped at that Strategy's `totalDebt`, until the withdrawal is
+covered. A loss a Strategy reports lowers what the withdrawer receives by
+the same amount, so the Vault asks for at most its `totalDebt` each time,
+whatever losses the earlier Strategies took.
+
+That makes the cost of a Strategy's place in the queue depend only on how
+much debt is ahead of it, not on their order. `optimize_queue` uses this to
+search the orderings exactly, by dynamic programming over which Strategies
+come first. It finds the one with the lowest expected loss plus gas over a
+distribution of withdrawal sizes. Past `exact_limit` Strategies it falls back
+to a greedy ordering refined by local search.
+
+Profiles come from `measure_profile` on a local fork, or can be filled in by
+hand.
+"""
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from eth_utils import function_signature_to_4byte_selector
+
+from scripts.vault_model.vault import MAX_BPS, MAXIMUM_STRATEGIES, ZERO_ADDRESS
+
+
+# NOTE: The dynamic program visits `2 ** n` sets of Strategies
+DEFAULT_EXACT_LIMIT = 12
+
+
+@dataclass(frozen=True)
+class StrategyProfile:
+    strategy: str  # address
+    debt: int  # `totalDebt`, the most the Vault takes from it
+    gas: int  # of `Strategy.withdraw`, paid whenever it's called
+    loss_bps: int = 0  # expected loss on anything taken beyond `free`
+    free: int = 0  # can be taken without a loss, e.g. the `want` it holds
+
+    def cost(self, amounts: np.ndarray, want_per_gas: float) -> np.ndarray:
+        """
+        The cost in `want` of taking each of `amounts` from this Strategy.
+        """
+        loss = np.maximum(amounts - min(self.free, self.debt), 0) * (
+            self.loss_bps / MAX_BPS
+        )
+        return np.where(amounts > 0, loss + self.gas * want_per_gas, 0.0)
+
+
+@dataclass(frozen=True)
+class QueuePlan:
+    queue: Tuple[str, ...]
+    expected_cost: float  # in `want`, per withdrawal
+    exact: bool  # whether `queue` is known to be the best ordering
+
+    @property
+    def calldata(self) -> str:
+        return set_withdrawal_queue_calldata(self.queue)
+
+
+def measure_profile(
+    vault, token, strategy, amount: Optional[int] = None
+) -> StrategyProfile:
+    """
+    Profile `strategy` by simulating the Vault withdrawing `amount` from it,
+    all of its `totalDebt` by default. Meant for a local fork, where calls can
+    be sent as the Vault.
+    """
+    debt = vault.strategies(strategy).dict()["totalDebt"]
+    if amount is None:
+        amount = debt
+    free = min(token.balanceOf(strategy), debt)
+    params = {"from": vault.address}
+    gas = strategy.withdraw.estimate_gas(amount, params)
+    loss = strategy.withdraw.call(amount, params)
+    # NOTE: Rounded up, so a small loss isn't measured as none
+    loss_bps = -(-loss * MAX_BPS // max(amount - free, 1))
+    return StrategyProfile(strategy.address, debt, gas, min(loss_bps, MAX_BPS), free)
+
+
+def _withdrawals(withdrawals: Sequence[int], weights: Optional[Sequence[float]]):
+    amounts = np.asarray(withdrawals, dtype=np.float64)
+    if weights is None:
+        weights = np.ones_like(amounts)
+    weights = np.asarray(weights, dtype=np.float64)
+    if amounts.shape != weights.shape or weights.sum() <= 0:
+        raise ValueError("Need one positive weight per withdrawal size")
+    return amounts, weights / weights.sum()
+
+
+def _taken(needed: np.ndarray, debt_ahead: int, debt: int) -> np.ndarray:
+    # What the Vault asks `Strategy.withdraw` for, with `debt_ahead` before it
+    return np.clip(needed - debt_ahead, 0, debt)
+
+
+def expected_cost(
+    queue: Sequence[StrategyProfile],
+    withdrawals: Sequence[int],
+    weights: Optional[Sequence[float]] = None,
+    idle: int = 0,
+    want_per_gas: float = 0.0,
+) -> float:
+    """
+    Expected loss plus gas, in `want`, of one of `withdrawals` (each with its
+    weight in `weights`, equally likely by default) against `queue`. `idle` is
+    what the Vault holds, and `want_per_gas` the price of gas in `want`.
+    """
+    amounts, weights = _withdrawals(withdrawals, weights)
+    needed = np.maximum(amounts - idle, 0)
+    cost = np.zeros_like(needed)
+    debt_ahead = 0
+    for profile in queue:
+        cost += profile.cost(_taken(needed, debt_ahead, profile.debt), want_per_gas)
+        debt_ahead += profile.debt
+    return float(cost @ weights)
+
+
+def _exact(profiles, needed, weights, want_per_gas) -> List[int]:
+    n = len(profiles)
+    debts = [p.debt for p in profiles]
+    # NOTE: As columns, to cost taking from every Strategy at once
+    debt = np.array(debts, dtype=np.float64)[:, None]
+    free = np.array([min(p.free, p.debt) for p in profiles], dtype=np.float64)[:, None]
+    loss_rate = np.array([p.loss_bps / MAX_BPS for p in profiles])[:, None]
+    gas = np.array([p.gas * want_per_gas for p in profiles])[:, None]
+
+    # NOTE: `best[s]` is the lowest cost of putting the set `s` first, in any
+    #       order, and `last[s]` the member of `s` that goes at its end
+    best = [0.0] + [np.inf] * ((1 << n) - 1)
+    last = [-1] * (1 << n)
+    debt_ahead = [0] * (1 << n)
+    for s in range(1 << n):
+        if s > 0:
+            lowest = s & -s
+            debt_ahead[s] = debt_ahead[s ^ lowest] + debts[lowest.bit_length() - 1]
+        taken = np.clip(needed - debt_ahead[s], 0, debt)
+        costs = (
+            np.where(taken > 0, np.maximum(taken - free, 0) * loss_rate + gas, 0)
+            @ weights
+        )
+        for j in range(n):
+            if s & (1 << j):
+                continue
+            cost = best[s] + costs[j]
+            if cost < best[s | (1 << j)]:
+                best[s | (1 << j)] = cost
+                last[s | (1 << j)] = j
+
+    order = []
+    s = (1 << n) - 1
+    while s:
+        order.append(last[s])
+        s ^= 1 << last[s]
+    return order[::-1]
+
+
+def _local_search(profiles, needed, weights, want_per_gas) -> List[int]:
+    def cost(order):
+        return expected_cost(
+            [profiles[j] for j in order], needed, weights, 0, want_per_gas
+        )
+
+    # Greedy: next is whichever Strategy costs the least per unit of debt
+    order = []
+    remaining = list(range(len(profiles)))
+    debt_ahead = 0
+    while remaining:
+        j = min(
+            remaining,
+            key=lambda j: (
+                profiles[j].cost(
+                    _taken(needed, debt_ahead, profiles[j].debt), want_per_gas
+                )
+                @ weights
+            )
+            / max(profiles[j].debt, 1),
+        )
+        order.append(j)
+        remaining.remove(j)
+        debt_ahead += profiles[j].debt
+
+    # Then move single Strategies elsewhere in the queue while that helps
+    best = cost(order)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(len(order)):
+            for k in range(len(order)):
+                if i == k:
+                    continue
+                candidate = order[:i] + order[i + 1 :]
+                candidate.insert(k, order[i])
+                candidate_cost = cost(candidate)
+                if candidate_cost < best:
+                    order, best, improved = candidate, candidate_cost, True
+    return order
+
+
+def optimize_queue(
+    profiles: Sequence[StrategyProfile],
+    withdrawals: Sequence[int],
+    weights: Optional[Sequence[float]] = None,
+    idle: int = 0,
+    want_per_gas: float = 0.0,
+    exact_limit: int = DEFAULT_EXACT_LIMIT,
+) -> QueuePlan:
+    """
+    The ordering of `profiles` with the lowest `expected_cost`. Strategies no
+    withdrawal reaches can end up anywhere after the ones that matter.
+    """
+    if len(profiles) > MAXIMUM_STRATEGIES:
+        raise ValueError(f"At most {MAXIMUM_STRATEGIES} Strategies fit in the queue")
+    amounts, weights = _withdrawals(withdrawals, weights)
+    needed = np.maximum(amounts - idle, 0)
+
+    exact = len(profiles) <= exact_limit
+    search = _exact if exact else _local_search
+    order = search(list(profiles), needed, weights, want_per_gas)
+    queue = [profiles[j] for j in order]
+    return QueuePlan(
+        queue=tuple(p.strategy for p in queue),
+        expected_cost=expected_cost(queue, needed, weights, 0, want_per_gas),
+        exact=exact,
+    )
+
+
+def set_withdrawal_queue_calldata(queue: Sequence[str]) -> str:
+    """
+    Calldata for `Vault.setWithdrawalQueue(queue)`, padded to
+    `MAXIMUM_STRATEGIES` with the zero address.
+    """
+    if len(queue) > MAXIMUM_STRATEGIES:
+        raise ValueError(f"At most {MAXIMUM_STRATEGIES} Strategies fit in the queue")
+    selector = function_signature_to_4byte_selector(
+        f"setWithdrawalQueue(address[{MAXIMUM_STRATEGIES}])"
+    )
+    padded = list(queue) + [ZERO_ADDRESS] * (MAXIMUM_STRATEGIES - len(queue))
+    # NOTE: A fixed-size array is encoded in place, one word per address
+    words = "".join(address[2:].lower().rjust(64, "0") for address in padded)
+    return "0x" + selector.hex() + words
@@ -64,6 +64,7 @@ def vault(gov, management, token, create_vault):
     vault.deposit(token.balanceOf(gov) // 2, {"from": gov})
     yield vault
 
+
 @pytest.fixture
 def deposit_contract(gov, token, vault):
     contract = gov.deploy(TestDeposit, token, vault)
@@ -71,7 +72,6 @@ def deposit_contract(gov, token, vault):
     return contract
 
 
-
 @pytest.fixture
 def flashloan_contract(gov, token, vault):
     contract = gov.deploy(TestFlashLoan, token, vault)
@@ -105,17 +105,25 @@ def strategy(gov, strategist, keeper, rewards, vault, TestStrategy, request):
     )
     yield strategy
 
+
 @pytest.fixture
 def just_strategy(vault, strategist, TestStrategy):
     strategy = strategist.deploy(TestStrategy)
     strategy.initialize(vault, strategist, strategist, strategist, {"from": strategist})
-    
+
     yield strategy
 
+
 @pytest.fixture
 def rando(accounts):
     yield accounts[9]
 
+
 @pytest.fixture
 def badgerRegistry(gov, BadgerRegistry):
     yield gov.deploy(BadgerRegistry, gov)
+
+
+@pytest.fixture
+def multicall(gov, Multicall):
+    yield gov.deploy(Multicall)
@@ -0,0 +1 @@
+# Just here to disambiguate the test files (can't use same name without a module)
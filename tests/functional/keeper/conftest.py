@@ -0,0 +1,42 @@
+import pytest
+
+from scripts.keeper.snapshot import StrategyParams, StrategySnapshot
+
+
+MAX_UINT256 = 2 ** 256 - 1
+
+
+@pytest.fixture
+def make_snapshot():
+    def make_snapshot(**overrides):
+        params = StrategyParams(
+            performanceFee=1000,
+            activation=1,
+            debtRatio=5_000,
+            minDebtPerHarvest=0,
+            maxDebtPerHarvest=MAX_UINT256,
+            lastReport=1_000,
+            totalDebt=10_000,
+            totalGain=0,
+            totalLoss=0,
+        )
+        fields = dict(
+            address="0x0000000000000000000000000000000000000001",
+            vault="0x0000000000000000000000000000000000000002",
+            params=params,
+            credit_available=0,
+            debt_outstanding=0,
+            expected_return=0,
+            min_report_delay=100,
+            max_report_delay=1_000,
+            profit_factor=100,
+            debt_threshold=0,
+            emergency_exit=False,
+            code_hash=b"",
+            estimated_total_assets=10_000,
+            eth_to_want=2 * 10 ** 18,
+        )
+        fields.update(overrides)
+        return StrategySnapshot(**fields)
+
+    yield make_snapshot
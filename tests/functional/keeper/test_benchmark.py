@@ -0,0 +1,57 @@
+import pytest
+
+from scripts.keeper.benchmark import (
+    BenchmarkReport,
+    RpcCounter,
+    deploy_fleet,
+    run_benchmark,
+)
+
+
+def test_deploy_fleet(gov, keeper):
+    fleet = deploy_fleet(gov, keeper, num_vaults=2, strategies_per_vault=3)
+    assert len(fleet.vaults) == 2
+    assert len(fleet.strategies) == 6
+    for item in fleet.vaults:
+        assert item.vault.token() == item.token
+        assert item.vault.withdrawalQueue(2) == item.strategies[-1]
+        assert item.vault.debtRatio() == 9_999
+    assert all(strategy.keeper() == keeper for strategy in fleet.strategies)
+
+    with pytest.raises(ValueError):
+        deploy_fleet(gov, keeper, num_vaults=1, strategies_per_vault=21)
+
+
+def test_rpc_counter(web3):
+    counter = RpcCounter(web3)
+    with counter.counting():
+        web3.eth.block_number
+        web3.eth.block_number
+    assert counter.requests["eth_blockNumber"] == 2
+
+    # Nothing is counted outside of `counting`
+    web3.eth.block_number
+    assert counter.total == 2
+
+
+def test_run_benchmark(web3, gov, keeper):
+    fleet = deploy_fleet(gov, keeper, num_vaults=2, strategies_per_vault=2)
+    report = run_benchmark(web3, fleet, keeper, gov, num_blocks=3)
+
+    assert report.num_strategies == 4
+    assert len(report.loop_latencies) == len(report.rpc_calls) == 3
+    assert all(calls > 0 for calls in report.rpc_calls)
+    assert sum(report.rpc_calls) == sum(report.rpc_methods.values())
+
+    # Every strategy at least takes its initial credit
+    assert report.harvests >= 4
+    assert report.gas_per_call("harvest") > 0
+    assert report.reverted == 0
+    assert "Gas per harvest" in report.summary()
+
+
+def test_empty_report():
+    report = BenchmarkReport(0, 0)
+    assert report.harvests == 0
+    assert report.gas_per_call("harvest") == 0
+    assert "Blocks: 0" in report.summary()
@@ -0,0 +1,95 @@
+from scripts.keeper.discovery import StrategyDiscovery
+from scripts.keeper.snapshot import take_snapshot
+
+
+def add_strategy(vault, strategist, keeper, gov, TestStrategy):
+    strategy = strategist.deploy(TestStrategy)
+    strategy.initialize(vault, strategist, strategist, keeper)
+    vault.addStrategy(strategy, 1_000, 0, 2 ** 256 - 1, 1000, {"from": gov})
+    return strategy
+
+
+def test_discover_from_registry(web3, badgerRegistry, vault, strategy, keeper, rando):
+    badgerRegistry.add(vault, {"from": rando})
+
+    discovery = StrategyDiscovery(web3, badgerRegistry, rando, keeper=keeper.address)
+    update = discovery.discover()
+    assert update.added == [strategy.address]
+    assert strategy.address in discovery
+    assert discovery.vault_of[strategy.address] == vault.address
+    assert discovery.by_vault() == {vault.address: [strategy]}
+
+
+def test_discover_ignores_other_keepers(
+    web3, badgerRegistry, vault, strategy, keeper, strategist, rando, gov, TestStrategy
+):
+    other = add_strategy(vault, strategist, strategist, gov, TestStrategy)
+    badgerRegistry.add(vault, {"from": rando})
+
+    discovery = StrategyDiscovery(web3, badgerRegistry, rando, keeper=keeper.address)
+    update = discovery.discover()
+    assert update.added == [strategy.address]
+    assert update.ignored == [other.address]
+    assert len(discovery) == 1
+
+
+def test_incremental_updates(
+    web3,
+    chain,
+    gov,
+    badgerRegistry,
+    create_vault,
+    multicall,
+    vault,
+    strategy,
+    strategist,
+    keeper,
+    rando,
+    TestStrategy,
+):
+    badgerRegistry.add(vault, {"from": rando})
+    discovery = StrategyDiscovery(web3, badgerRegistry, rando, keeper=keeper.address)
+    discovery.discover()
+
+    chain.mine()
+    assert not discovery.update()
+
+    # New strategy in a Vault we already know about
+    added = add_strategy(vault, strategist, keeper, gov, TestStrategy)
+    update = discovery.update()
+    assert update.added == [added.address]
+
+    # Vaults from other authors are not picked up
+    badgerRegistry.add(create_vault(), {"from": gov})
+    assert not discovery.update()
+
+    # New Vault with a strategy already in its queue
+    other_vault = create_vault()
+    other_strategy = add_strategy(other_vault, strategist, keeper, gov, TestStrategy)
+    badgerRegistry.add(other_vault, {"from": rando})
+    update = discovery.update()
+    assert update.added == [other_strategy.address]
+    assert discovery.vault_of[other_strategy.address] == other_vault.address
+
+    # Migration swaps the old version for the new one
+    new_version = strategist.deploy(TestStrategy)
+    new_version.initialize(vault, strategist, strategist, keeper)
+    vault.migrateStrategy(strategy, new_version, {"from": gov})
+    update = discovery.update()
+    assert update.removed == [strategy.address]
+    assert update.added == [new_version.address]
+
+    # Revoked strategies stay until they have no debt left
+    vault.revokeStrategy(added, {"from": gov})
+    assert not discovery.update()
+    assert added.address in discovery.retiring
+    snapshot = take_snapshot(multicall, [(vault, [added])])
+    assert discovery.drop_retired(snapshot) == [added.address]
+    assert added.address not in discovery
+
+    # Removing a Vault removes all of its strategies
+    badgerRegistry.remove(other_vault, {"from": rando})
+    update = discovery.update()
+    assert update.removed == [other_strategy.address]
+    assert list(discovery.vaults) == [vault.address]
+    assert list(discovery.strategies) == [new_version.address]
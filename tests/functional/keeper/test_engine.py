@@ -0,0 +1,104 @@
+from brownie import Contract
+
+from scripts.keeper.engine import KeeperEngine
+
+
+def test_engine_matches_direct_reads(multicall, vault, strategy, keeper, chain):
+    engine = KeeperEngine(multicall, keeper)
+    snapshot, [reads] = engine.run_pass([strategy], 0)
+    assert snapshot.strategies[strategy.address] == reads.snapshot
+
+    assert reads.strategy == strategy
+    assert not reads.ruled_out
+    assert reads.credit == vault.creditAvailable(strategy) > 0
+    assert reads.debt == vault.debtOutstanding(strategy) == 0
+    assert reads.harvest_gas_estimate > 0
+    assert reads.tend_gas_estimate > 0
+    assert reads.gas_estimate == reads.harvest_gas_estimate + reads.tend_gas_estimate
+
+    # Same decision the strategy itself makes
+    assert reads.harvest_triggered == strategy.harvestTrigger(0)
+    assert reads.harvest_triggered
+    assert not reads.tend_triggered
+
+    chain.sleep(1)
+    strategy.harvest({"from": keeper})
+
+    # Nothing left to gain, so the harvest is ruled out without estimating it
+    _, [reads] = engine.run_pass([strategy], 0)
+    assert reads.credit == 0
+    assert reads.ruled_out
+    assert reads.harvest_gas_estimate is None
+    assert reads.harvest_trigger is None
+    assert reads.tend_gas_estimate > 0
+    assert not reads.harvest_triggered
+    assert not reads.tend_triggered
+
+
+def test_engine_fans_out_across_strategies(
+    gov, multicall, vault, strategist, keeper, TestStrategy
+):
+    strategies = []
+    for _ in range(5):
+        strategy = strategist.deploy(TestStrategy)
+        strategy.initialize(vault, strategist, strategist, keeper)
+        vault.addStrategy(strategy, 1_000, 0, 2 ** 256 - 1, 1000, {"from": gov})
+        strategies.append(strategy)
+
+    # NOTE: Bound below the number of strategies so reads have to queue up
+    engine = KeeperEngine(multicall, keeper, concurrency=2)
+    _, results = engine.run_pass(strategies, 0)
+
+    # Results come back in the same order the strategies were given
+    assert [reads.strategy for reads in results] == strategies
+    for reads in results:
+        assert reads.credit == vault.creditAvailable(reads.strategy)
+        assert reads.harvest_triggered == reads.strategy.harvestTrigger(0)
+
+
+def test_engine_onchain_triggers_are_never_ruled_out(
+    multicall, vault, strategy, keeper, chain
+):
+    chain.sleep(1)
+    strategy.harvest({"from": keeper})
+
+    engine = KeeperEngine(multicall, keeper, onchain_triggers=[strategy.address])
+    _, [reads] = engine.run_pass([strategy], 0)
+    assert not reads.ruled_out
+    assert reads.harvest_gas_estimate > 0
+    assert reads.harvest_trigger == strategy.harvestTrigger(0) == False
+
+
+def test_engine_serves_many_vaults(
+    gov, multicall, vault, strategy, strategist, keeper, create_vault, TestStrategy
+):
+    other_vault = create_vault()
+    other_strategy = strategist.deploy(TestStrategy)
+    other_strategy.initialize(other_vault, strategist, strategist, keeper)
+    other_vault.addStrategy(other_strategy, 1_000, 0, 2 ** 256 - 1, 1000, {"from": gov})
+
+    engine = KeeperEngine(multicall, keeper)
+    snapshot, results = engine.run_pass([strategy, other_strategy], 0)
+    assert [reads.strategy for reads in results] == [strategy, other_strategy]
+    assert set(snapshot.vaults) == {vault.address, other_vault.address}
+    assert engine.vault_of(other_strategy.address) == other_vault.address
+    assert set(engine.vault_info) == {vault.address, other_vault.address}
+
+    # Static vault details are only read the first time a vault is seen
+    engine.run_pass([strategy, other_strategy], 0)
+    assert engine.metrics.rpc_read.count(call="strategy_vaults") == 1
+    assert engine.metrics.rpc_read.count(call="vault_info") == 1
+    assert engine.metrics.rpc_read.count(call="snapshot") == 2
+
+
+def test_engine_skips_unreadable_strategies(
+    multicall, vault, token, strategy, keeper, TestStrategy
+):
+    # NOTE: Not a Strategy, so it has no Vault to read
+    broken = Contract.from_abi("BrokenStrategy", token.address, TestStrategy.abi)
+
+    engine = KeeperEngine(multicall, keeper)
+    snapshot, results = engine.run_pass([broken, strategy], 0)
+    assert [reads.strategy for reads in results] == [strategy]
+    assert snapshot.unreadable == {broken.address: "vault"}
+    assert set(snapshot.strategies) == {strategy.address}
@@ -0,0 +1,97 @@
+from scripts.keeper.fees import DEFAULT_PRIORITY_FEE, FeeEstimator
+
+
+class FeeHistoryNode:
+    """
+    Serves `eth_feeHistory` the way a node does, for blocks with a base fee
+    of `1000 + number` and a reward of `10 * number`, counting requests.
+    """
+
+    def __init__(self, block_number, empty_blocks=()):
+        self.block_number = block_number
+        self.empty_blocks = set(empty_blocks)
+        self.requests = []
+        self.manager = self
+        self.eth = self
+
+    def get_block(self, block_number):
+        return {"number": block_number, "baseFeePerGas": 1000 + block_number}
+
+    def request_blocking(self, method, params):
+        assert method == "eth_feeHistory"
+        block_count, newest, _ = params
+        block_count, newest = int(block_count, 16), int(newest, 16)
+        self.requests.append((block_count, newest))
+        oldest = newest - block_count + 1
+        blocks = range(oldest, newest + 1)
+        return {
+            "oldestBlock": hex(oldest),
+            "baseFeePerGas": [hex(1000 + n) for n in range(oldest, newest + 2)],
+            "gasUsedRatio": [0.0 if n in self.empty_blocks else 0.5 for n in blocks],
+            "reward": [[hex(0 if n in self.empty_blocks else 10 * n)] for n in blocks],
+        }
+
+
+def test_window_is_fetched_incrementally():
+    node = FeeHistoryNode(100)
+    fees = FeeEstimator(node, window=10)
+
+    fees.estimate(100)
+    assert node.requests == [(10, 100)]
+    assert [block.number for block in fees.blocks] == list(range(91, 101))
+
+    # Only new blocks are fetched, the oldest ones drop out of the window
+    fees.estimate(103)
+    assert node.requests[-1] == (3, 103)
+    assert [block.number for block in fees.blocks] == list(range(94, 104))
+
+    # Gaps longer than the window only fetch the window
+    fees.estimate(200)
+    assert node.requests[-1] == (10, 200)
+    assert len(fees.blocks) == 10
+
+
+def test_one_estimate_per_block():
+    node = FeeHistoryNode(100)
+    fees = FeeEstimator(node, window=10)
+    estimate = fees.estimate(100)
+    assert fees.estimate(100) is estimate
+    assert len(node.requests) == 1
+
+    # Median reward over blocks 91-100, and the base fee of block 101
+    assert estimate.priority_fee == 960
+    assert estimate.base_fee == 1101
+    assert estimate.max_fee == 2 * 1101 + 960
+    assert estimate.gas_price == 1101 + 960
+    assert estimate.max_gas_price == estimate.max_fee
+    assert estimate.tx_params() == {"max_fee": 3162, "priority_fee": 960}
+
+
+def test_priority_fee_percentiles():
+    node = FeeHistoryNode(100, empty_blocks=range(91, 96))
+    fees = FeeEstimator(node, window=10, window_percentile=90)
+    # NOTE: Empty blocks pay no reward, but that says nothing about fees
+    assert fees.estimate(100).priority_fee == 1000
+
+    node = FeeHistoryNode(100, empty_blocks=range(91, 101))
+    fees = FeeEstimator(node, window=10)
+    assert fees.estimate(100).priority_fee == DEFAULT_PRIORITY_FEE
+
+
+def test_estimate_against_node(web3, chain):
+    fees = FeeEstimator(web3)
+    estimate = fees.estimate()
+    assert estimate.block_number == web3.eth.block_number
+    assert fees.estimate(estimate.block_number) is estimate
+
+    if estimate.is_legacy:
+        assert not fees.supports_eip1559
+        assert estimate.gas_price == web3.eth.gas_price
+        assert estimate.tx_params() == {"gas_price": estimate.gas_price}
+    else:
+        latest = web3.eth.get_block(estimate.block_number)
+        assert fees.blocks[-1].base_fee == latest.baseFeePerGas
+        assert estimate.max_fee >= estimate.gas_price >= estimate.base_fee
+
+    chain.mine()
+    assert fees.estimate().block_number == estimate.block_number + 1
@@ -0,0 +1,81 @@
+from scripts.keeper.engine import KeeperEngine
+from scripts.keeper.gas_cache import GasEstimateCache, GasFingerprint
+
+
+STRATEGY = "0x0000000000000000000000000000000000000001"
+
+
+def make_fingerprint(**overrides):
+    fields = dict(
+        total_debt=10_000,
+        vault_balance=5_000,
+        debt_outstanding=0,
+        emergency_exit=False,
+        code_hash=b"\x01" * 32,
+    )
+    fields.update(overrides)
+    return GasFingerprint(**fields)
+
+
+def test_cache_hits_and_misses():
+    cache = GasEstimateCache(max_age=10)
+    fingerprint = make_fingerprint()
+    assert cache.get(STRATEGY, "harvest", fingerprint, 100) is None
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    cache.put(STRATEGY, "harvest", fingerprint, 100, 250_000)
+    assert cache.get(STRATEGY, "harvest", fingerprint, 110) == 250_000
+    # NOTE: Cached separately per method
+    assert cache.get(STRATEGY, "tend", fingerprint, 110) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert cache.hit_rate == 1 / 3
+
+
+def test_cache_expires_by_block_age():
+    cache = GasEstimateCache(max_age=10)
+    fingerprint = make_fingerprint()
+    cache.put(STRATEGY, "harvest", fingerprint, 100, 250_000)
+    assert cache.get(STRATEGY, "harvest", fingerprint, 111) is None
+    assert len(cache) == 0
+
+
+def test_cache_invalidated_by_fingerprint():
+    cache = GasEstimateCache()
+    fingerprint = make_fingerprint()
+    for change in (
+        dict(total_debt=10_001),
+        dict(vault_balance=0),
+        dict(debt_outstanding=1),
+        dict(emergency_exit=True),
+        dict(code_hash=b"\x02" * 32),
+    ):
+        cache.put(STRATEGY, "harvest", fingerprint, 100, 250_000)
+        assert cache.get(STRATEGY, "harvest", make_fingerprint(**change), 100) is None
+        assert len(cache) == 0
+
+    cache.put(STRATEGY, "harvest", fingerprint, 100, 250_000)
+    cache.put(STRATEGY, "tend", fingerprint, 100, 50_000)
+    cache.invalidate(STRATEGY)
+    assert len(cache) == 0
+
+
+def test_engine_reuses_estimates(multicall, vault, strategy, keeper, chain):
+    engine = KeeperEngine(multicall, keeper)
+    _, [first] = engine.run_pass([strategy], 0)
+    assert engine.gas_cache.misses == 2
+
+    # Nothing that affects gas has changed
+    chain.mine()
+    _, [second] = engine.run_pass([strategy], 0)
+    assert engine.gas_cache.hits == 2
+    assert second.harvest_gas_estimate == first.harvest_gas_estimate
+    assert second.tend_gas_estimate == first.tend_gas_estimate
+
+    # Harvesting moves debt into the strategy, so the estimates are redone
+    chain.sleep(1)
+    strategy.harvest({"from": keeper})
+    _, [third] = engine.run_pass([strategy], 0)
+    assert engine.gas_cache.hits == 2
+    # NOTE: `harvest` is ruled out off-chain now, so only `tend` is looked up
+    assert engine.gas_cache.misses == 3
+    assert third.harvest_gas_estimate is None
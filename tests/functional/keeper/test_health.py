@@ -0,0 +1,121 @@
+import pytest
+
+from scripts.keeper.engine import KeeperEngine
+from scripts.keeper.health import (
+    UNCHECKED,
+    HealthCheckLimits,
+    execute_default_check,
+    read_health_checks,
+)
+
+
+@pytest.fixture
+def common_health_check(gov, CommonHealthCheck):
+    yield gov.deploy(CommonHealthCheck)
+
+
+@pytest.mark.parametrize("profit", [0, 299, 300, 301, 5_000])
+@pytest.mark.parametrize("loss", [0, 99, 100, 101])
+def test_default_check_matches_contract(gov, common_health_check, rando, profit, loss):
+    total_debt = 10_000
+    # NOTE: The default check looks up the limits of `msg.sender`
+    assert common_health_check.check(
+        profit, loss, 0, 0, total_debt, {"from": rando}
+    ) == execute_default_check(profit, loss, total_debt, HealthCheckLimits(300, 100))
+
+    common_health_check.setStrategyLimits(rando, 5_000, 0, {"from": gov})
+    assert common_health_check.check(
+        profit, loss, 0, 0, total_debt, {"from": rando}
+    ) == execute_default_check(profit, loss, total_debt, HealthCheckLimits(5_000, 0))
+
+
+def test_read_health_checks(
+    gov, multicall, strategy, keeper, common_health_check, chain
+):
+    assert read_health_checks(multicall, [strategy]) == {strategy.address: UNCHECKED}
+
+    # The first harvest enables the check for every harvest after it
+    chain.sleep(1)
+    strategy.harvest({"from": keeper})
+    strategy.setHealthCheck(common_health_check, {"from": gov})
+    [config] = read_health_checks(multicall, [strategy]).values()
+    assert config.health_check == common_health_check.address
+    assert config.limits == HealthCheckLimits(300, 100)
+
+    common_health_check.setStrategyLimits(strategy, 5_000, 0, {"from": gov})
+    [config] = read_health_checks(multicall, [strategy]).values()
+    assert config.limits == HealthCheckLimits(5_000, 0)
+
+    # Custom checks can only be caught by the simulation
+    common_health_check.setCheck(strategy, gov, {"from": gov})
+    [config] = read_health_checks(multicall, [strategy]).values()
+    assert config.health_check == common_health_check.address
+    assert config.limits is None
+
+    strategy.setDoHealthCheck(False, {"from": gov})
+    assert read_health_checks(multicall, [strategy]) == {strategy.address: UNCHECKED}
+
+
+def test_preflight_skips_failing_harvests(
+    gov, multicall, vault, token, strategy, keeper, common_health_check, chain
+):
+    chain.sleep(1)
+    strategy.harvest({"from": keeper})
+    strategy.setHealthCheck(common_health_check, {"from": gov})
+    chain.sleep(15)
+    chain.mine()
+    engine = KeeperEngine(multicall, keeper)
+
+    chain.snapshot()
+    # Small gain passes the health check
+    token.transfer(strategy, strategy.estimatedTotalAssets() * 0.02, {"from": gov})
+    snapshot, _ = engine.run_pass([strategy], 0)
+    [simulation] = engine.preflight(snapshot, [strategy]).values()
+    assert not simulation.would_revert
+    assert simulation.healthy
+    assert simulation.profit == strategy.harvest.call({"from": keeper}) > 0
+    assert simulation.reason is None
+    chain.revert()
+
+    # Gain is too big
+    token.transfer(strategy, strategy.estimatedTotalAssets() * 0.05, {"from": gov})
+    snapshot, _ = engine.run_pass([strategy], 0)
+    [simulation] = engine.preflight(snapshot, [strategy]).values()
+    assert simulation.would_revert
+    assert simulation.profit is None
+    assert simulation.healthy is False
+    # NOTE: The reason says by how much, in bps of `totalDebt`
+    total_debt = vault.strategies(strategy).dict()["totalDebt"]
+    profit = strategy.estimatedTotalAssets() - total_debt
+    assert simulation.reason.startswith(
+        f"!healthcheck (profit {profit * 10_000 // total_debt} bps, limit 300 bps;"
+    )
+    chain.revert()
+
+    # Loss is too big
+    strategy._takeFunds(strategy.estimatedTotalAssets() * 0.03)
+    snapshot, _ = engine.run_pass([strategy], 0)
+    [simulation] = engine.preflight(snapshot, [strategy]).values()
+    assert simulation.would_revert
+    assert simulation.healthy is False
+    loss = total_debt - strategy.estimatedTotalAssets()
+    assert simulation.reason.startswith("!healthcheck")
+    assert simulation.reason.endswith(
+        f"est. loss {loss * 10_000 // total_debt} bps, limit 100 bps)"
+    )
+    chain.revert()
+
+    # Per-strategy limits are whatever the contract says they are
+    common_health_check.setStrategyLimits(strategy, 1_000, 0, {"from": gov})
+    token.transfer(strategy, strategy.estimatedTotalAssets() * 0.05, {"from": gov})
+    snapshot, _ = engine.run_pass([strategy], 0)
+    [simulation] = engine.preflight(snapshot, [strategy]).values()
+    assert not simulation.would_revert
+
+    # Nothing is checked once the check is disabled
+    strategy.setDoHealthCheck(False, {"from": gov})
+    token.transfer(strategy, strategy.estimatedTotalAssets() * 0.5, {"from": gov})
+    snapshot, _ = engine.run_pass([strategy], 0)
+    [simulation] = engine.preflight(snapshot, [strategy]).values()
+    assert not simulation.would_revert
+    assert simulation.healthy is None
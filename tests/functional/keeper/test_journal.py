@@ -0,0 +1,162 @@
+from types import SimpleNamespace
+
+import pytest
+
+from scripts.keeper.discovery import StrategyDiscovery
+from scripts.keeper.engine import KeeperEngine
+from scripts.keeper.fees import FeeEstimator
+from scripts.keeper.journal import KeeperJournal
+from scripts.keeper.scheduler import HarvestScheduler
+from scripts.keeper.transactions import PendingTx, TxPipeline
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    yield str(tmp_path / "keeper-journal.db")
+
+
+@pytest.fixture
+def make_keeper(web3, badgerRegistry, multicall, keeper, rando):
+    def make_keeper():
+        return (
+            StrategyDiscovery(web3, badgerRegistry, rando, keeper=keeper.address),
+            HarvestScheduler(),
+            KeeperEngine(multicall, keeper),
+            FeeEstimator(web3),
+            TxPipeline(keeper, web3),
+        )
+
+    yield make_keeper
+
+
+def test_fresh_journal(journal_path, make_keeper):
+    journal = KeeperJournal(journal_path)
+    assert not journal.restore(*make_keeper())
+
+    journal.set_config("registry", "0x1")
+    journal.close()
+    assert KeeperJournal(journal_path).get_config("registry") == "0x1"
+
+
+def test_warm_restart(
+    journal_path, make_keeper, badgerRegistry, vault, strategy, rando, chain
+):
+    badgerRegistry.add(vault, {"from": rando})
+    discovery, scheduler, engine, fees, pipeline = components = make_keeper()
+    discovery.discover()
+    scheduler.add(strategy.address)
+    snapshot, _ = engine.run_pass([strategy], 0)
+    scheduler.schedule_from_snapshot(snapshot.strategies[strategy.address])
+    fee = fees.estimate()
+
+    journal = KeeperJournal(journal_path)
+    pending = pipeline.submit(strategy.harvest, key=strategy.address)
+    journal.record_tx(pending)
+    journal.checkpoint(*components)
+    journal.close()
+
+    # Nothing is read again, and the harvest isn't sent a second time
+    restored = make_keeper()
+    assert KeeperJournal(journal_path).restore(*restored)
+    discovery, scheduler, engine, fees, pipeline = restored
+    assert discovery.last_block == components[0].last_block
+    assert discovery.by_vault() == {vault.address: [strategy]}
+    assert {s: (e.eligible_at, e.deadline) for s, e in scheduler.entries().items()} == {
+        s: (e.eligible_at, e.deadline) for s, e in components[1].entries().items()
+    }
+    assert engine.vault_of(strategy.address) == vault.address
+    assert engine.vault_info == components[2].vault_info
+    assert engine.gas_cache.entries() == components[2].gas_cache.entries()
+    assert list(fees.blocks) == list(components[3].blocks)
+    assert fees.estimate(fee.block_number) == fee
+    assert pipeline.is_pending(strategy.address)
+
+    # The restored transaction is picked up once it is mined
+    chain.mine()
+    [finished] = pipeline.poll()
+    assert finished.nonce == pending.nonce
+    assert finished.receipt.txid == pending.latest.txid
+    assert finished.success
+
+
+def test_warm_restart_after_replaced_and_dropped_transactions(
+    journal_path, make_keeper, badgerRegistry, vault, strategy, rando, chain
+):
+    badgerRegistry.add(vault, {"from": rando})
+    discovery, scheduler, engine, fees, pipeline = components = make_keeper()
+    discovery.discover()
+
+    # NOTE: The node knows neither of these, like a broadcast replaced by a fee
+    #       bump, and one dropped from the mempool while the bot was down
+    replaced, dropped = (SimpleNamespace(txid="0x" + byte * 32) for byte in "ab")
+    journal = KeeperJournal(journal_path)
+    pending = pipeline.submit(strategy.harvest, key=strategy.address)
+    pending.receipts.insert(0, replaced)
+    journal.record_tx(pending)
+    journal.checkpoint(*components)
+    journal.record_tx(PendingTx("dropped", pending.nonce + 1, [dropped]))
+    journal.close()
+
+    # Restoring doesn't trip over either of them
+    restored = make_keeper()
+    assert KeeperJournal(journal_path).restore(*restored)
+    pipeline = restored[4]
+    [resumed] = pipeline.pending()
+    assert resumed.nonce == pending.nonce
+    assert [receipt.txid for receipt in resumed.receipts] == [pending.latest.txid]
+
+    # The dropped one is handed back instead of being waited on forever
+    chain.mine()
+    finished = {tx.key: tx for tx in pipeline.poll()}
+    assert finished["dropped"].nonce == pending.nonce + 1
+    assert finished["dropped"].receipt is None
+    assert not finished["dropped"].success
+    assert finished[strategy.address].receipt.txid == pending.latest.txid
+    assert finished[strategy.address].success
+    assert len(pipeline) == 0
+
+
+def test_interrupted_checkpoint_keeps_the_last_one(
+    journal_path, make_keeper, badgerRegistry, vault, strategy, rando
+):
+    badgerRegistry.add(vault, {"from": rando})
+    discovery, scheduler, engine, fees, pipeline = components = make_keeper()
+    discovery.discover()
+    journal = KeeperJournal(journal_path)
+    journal.checkpoint(*components)
+
+    class Crashes:
+        def entries(self):
+            raise RuntimeError("crashed")
+
+    with pytest.raises(RuntimeError):
+        journal.checkpoint(discovery, Crashes(), engine, fees, pipeline)
+
+    restored = make_keeper()
+    assert journal.restore(*restored)
+    assert restored[0].by_vault() == {vault.address: [strategy]}
+
+
+def test_checkpoint_only_writes_what_changed(
+    journal_path, make_keeper, badgerRegistry, vault, strategy, rando
+):
+    badgerRegistry.add(vault, {"from": rando})
+    discovery, scheduler, engine, fees, pipeline = components = make_keeper()
+    discovery.discover()
+    scheduler.add(strategy.address)
+    journal = KeeperJournal(journal_path)
+    journal.checkpoint(*components)
+
+    # NOTE: `last_block` and the fee settings are always written
+    changes = journal._db.total_changes
+    journal.checkpoint(*components)
+    assert journal._db.total_changes - changes == 2
+
+    changes = journal._db.total_changes
+    scheduler.schedule(strategy.address, 1_000, 100, 86_400)
+    journal.checkpoint(*components)
+    assert journal._db.total_changes - changes == 3
+
+    restored = make_keeper()
+    assert KeeperJournal(journal_path).restore(*restored)
+    assert restored[1].deadline(strategy.address) == 87_400
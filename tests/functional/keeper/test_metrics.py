@@ -0,0 +1,104 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+from scripts.keeper.engine import KeeperEngine
+from scripts.keeper.metrics import Counter, Histogram, KeeperMetrics, serve_metrics
+from scripts.keeper.transactions import FinishedTx
+
+
+def test_counter():
+    counter = Counter("keeper_calls_total", "Calls")
+    counter.inc(strategy="0x1", method="harvest")
+    counter.inc(2, strategy="0x1", method="harvest")
+    counter.inc(method="tend", strategy="0x2")
+    assert counter.value(method="harvest", strategy="0x1") == 3
+
+    with pytest.raises(ValueError):
+        counter.inc(-1)
+
+    assert counter.render() == [
+        "# HELP keeper_calls_total Calls",
+        "# TYPE keeper_calls_total counter",
+        'keeper_calls_total{method="harvest",strategy="0x1"} 3',
+        'keeper_calls_total{method="tend",strategy="0x2"} 1',
+    ]
+
+
+def test_histogram():
+    histogram = Histogram("keeper_loop_seconds", "Loop", buckets=(0.1, 1))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(0.1)
+    histogram.observe(5)
+    assert histogram.count() == 4
+
+    assert histogram.render() == [
+        "# HELP keeper_loop_seconds Loop",
+        "# TYPE keeper_loop_seconds histogram",
+        'keeper_loop_seconds_bucket{le="0.1"} 2',
+        'keeper_loop_seconds_bucket{le="1"} 3',
+        'keeper_loop_seconds_bucket{le="+Inf"} 4',
+        "keeper_loop_seconds_sum 5.65",
+        "keeper_loop_seconds_count 4",
+    ]
+
+
+def test_histogram_timing():
+    histogram = Histogram("keeper_rpc_read_seconds", "Reads")
+    with histogram.time(call="snapshot"):
+        pass
+    assert histogram.timed(lambda x: x + 1, call="snapshot")(1) == 2
+    assert histogram.count(call="snapshot") == 2
+    assert histogram.count(call="triggers") == 0
+
+
+def test_record_finished():
+    metrics = KeeperMetrics()
+    metrics.record_finished(
+        FinishedTx("0x1", 0, object(), True, 100_000, 10 ** 15, 12.0)
+    )
+    metrics.record_finished(
+        FinishedTx("0x1", 1, object(), False, 50_000, 10 ** 14, 3.0)
+    )
+    # NOTE: Dropped transactions didn't use any gas
+    metrics.record_finished(FinishedTx("0x1", 2, None, False))
+
+    assert metrics.tx_confirmation.count() == 2
+    assert metrics.reverts.value(strategy="0x1") == 1
+    assert metrics.gas_used.value(strategy="0x1") == 150_000
+    assert metrics.fees_paid.value(strategy="0x1") == 11 * 10 ** 14
+
+
+def test_serve_metrics():
+    metrics = KeeperMetrics()
+    metrics.calls.inc(strategy="0x1", method="harvest")
+    server = serve_metrics(metrics, port=0)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{url}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            body = response.read().decode()
+        assert body == metrics.render()
+        assert 'keeper_calls_total{method="harvest",strategy="0x1"} 1' in body
+
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{url}/")
+    finally:
+        server.shutdown()
+
+
+def test_engine_is_instrumented(multicall, vault, strategy, keeper):
+    engine = KeeperEngine(multicall, keeper)
+    snapshot, _ = engine.run_pass([strategy], 0)
+    engine.preflight(snapshot, [strategy])
+
+    metrics = engine.metrics
+    assert metrics.rpc_read.count(call="snapshot") == 1
+    assert metrics.gas_estimate.count(method="harvest") == 1
+    assert metrics.gas_estimate.count(method="tend") == 1
+    assert metrics.trigger_evaluation.count(where="offchain") == 1
+    assert metrics.trigger_evaluation.count(where="onchain") == 1
+    assert metrics.rpc_read.count(call="health_checks") == 1
+    assert metrics.rpc_read.count(call="simulate_harvest") == 1
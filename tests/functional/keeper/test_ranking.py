@@ -0,0 +1,104 @@
+from scripts.keeper.ranking import (
+    HarvestCandidate,
+    HarvestRanker,
+    harvest_value,
+    select_harvests,
+)
+from scripts.keeper.triggers import want_to_eth
+
+
+def test_harvest_value(make_snapshot):
+    # Same `credit + profit` that `harvestTrigger` compares against the call cost
+    snapshot = make_snapshot(credit_available=500, estimated_total_assets=10_200)
+    assert harvest_value(snapshot) == 700
+    # Losses don't count as negative profit
+    snapshot = make_snapshot(credit_available=500, estimated_total_assets=9_000)
+    assert harvest_value(snapshot) == 500
+    assert harvest_value(make_snapshot(estimated_total_assets=None)) is None
+
+    # NOTE: 2 want per ether
+    assert want_to_eth(snapshot, 700) == 350
+    assert want_to_eth(make_snapshot(eth_to_want=0), 700) is None
+
+
+def test_select_by_value_per_gas():
+    candidates = [
+        HarvestCandidate("a", 100_000, 10),
+        HarvestCandidate("b", 60_000, 7),
+        HarvestCandidate("c", 50_000, 6),
+    ]
+    # A greedy pick by score takes "c" and "b", which is also optimal here
+    plan = select_harvests(candidates, 110_000)
+    assert [c.strategy for c in plan.selected] == ["c", "b"]
+    assert [c.strategy for c in plan.deferred] == ["a"]
+    assert plan.gas == 110_000
+
+    # Where greedy would take "c" then have no room for "a", the knapsack doesn't
+    plan = select_harvests(candidates, 150_000)
+    assert {c.strategy for c in plan.selected} == {"a", "c"}
+    assert plan.gas <= 150_000
+
+
+def test_forced_harvests_go_first():
+    candidates = [
+        HarvestCandidate("a", 100_000, 10),
+        HarvestCandidate("b", 100_000, 0, forced=True),
+    ]
+    plan = select_harvests(candidates, 150_000)
+    assert [c.strategy for c in plan.selected] == ["b"]
+
+    # Forced harvests still have to fit
+    plan = select_harvests(candidates, 50_000)
+    assert plan.selected == []
+    assert len(plan.deferred) == 2
+
+
+def test_unvalued_harvests_fill_leftover_budget():
+    candidates = [HarvestCandidate("a", 100_000, 10), HarvestCandidate("b", 50_000, 0)]
+    plan = select_harvests(candidates, 150_000)
+    assert [c.strategy for c in plan.selected] == ["a", "b"]
+
+
+def test_budget_is_capped_by_balance():
+    ranker = HarvestRanker(gas_budget=1_000_000)
+    assert ranker.gas_limit(0, 0) == 1_000_000
+    assert ranker.gas_limit(10 ** 9, 10 ** 18) == 1_000_000
+    assert ranker.gas_limit(10 ** 9, 10 ** 14) == 100_000
+
+
+def test_deferred_harvests_carry_their_value(make_snapshot):
+    ranker = HarvestRanker(gas_budget=150_000)
+    a = make_snapshot(address="0xa", credit_available=1_000)
+    b = make_snapshot(address="0xb", credit_available=1_200)
+
+    selected = []
+    for timestamp in (1_100, 1_101, 1_102, 1_103):
+        plan = ranker.plan(
+            [
+                ranker.candidate(a, 100_000, timestamp),
+                ranker.candidate(b, 100_000, timestamp),
+            ],
+            gas_price=1,
+            balance=10 ** 18,
+        )
+        selected.append(plan.selected[0].strategy)
+        assert [c.strategy for c in plan.deferred] != selected[-1:]
+
+    # Neither one is starved by the other
+    assert selected == ["0xb", "0xa", "0xb", "0xa"]
+    assert ranker.carried == {"0xb": 600}
+
+    # Once past `maxReportDelay`, a harvest is forced
+    candidate = ranker.candidate(a, 100_000, 2_000)
+    assert candidate.forced
+    assert candidate.value == 500
+
+
+def test_carried_value_is_dropped_once_not_a_candidate(make_snapshot):
+    ranker = HarvestRanker(gas_budget=0)
+    snapshot = make_snapshot(credit_available=1_000)
+    ranker.plan([ranker.candidate(snapshot, 100_000, 1_100)], 1, 10 ** 18)
+    assert ranker.carried == {snapshot.address: 500}
+
+    ranker.plan([], 1, 10 ** 18)
+    assert ranker.carried == {}
@@ -0,0 +1,100 @@
+import brownie
+import pytest
+
+from scripts.keeper.router import batch_failures, revert_reason, submit_batch
+from scripts.keeper.transactions import TxPipeline
+
+
+@pytest.fixture
+def router(gov, keeper, KeeperRouter):
+    router = gov.deploy(KeeperRouter, gov)
+    router.setKeeper(keeper, True, {"from": gov})
+    yield router
+
+
+@pytest.fixture
+def strategies(gov, vault, strategist, router, TestStrategy, chain):
+    strategies = []
+    for _ in range(3):
+        strategy = strategist.deploy(TestStrategy)
+        strategy.initialize(vault, strategist, strategist, router)
+        vault.addStrategy(strategy, 1_000, 0, 2 ** 256 - 1, 1000, {"from": gov})
+        strategies.append(strategy)
+
+    # The first harvest enables the health check for every harvest after it
+    chain.sleep(1)
+    router.harvest(strategies, {"from": gov})
+    yield strategies
+
+
+@pytest.fixture
+def common_health_check(gov, CommonHealthCheck):
+    yield gov.deploy(CommonHealthCheck)
+
+
+def test_revert_reason():
+    data = bytes.fromhex(
+        "08c379a0"
+        "0000000000000000000000000000000000000000000000000000000000000020"
+        "000000000000000000000000000000000000000000000000000000000000000c"
+        "216865616c7468636865636b0000000000000000000000000000000000000000"
+    )
+    assert revert_reason(data) == "!healthcheck"
+    assert revert_reason(b"") == "0x"
+    assert revert_reason(bytes.fromhex("4e487b71")) == "0x4e487b71"
+
+
+def test_router_permissions(gov, keeper, rando, router, strategies):
+    for name in ("harvest", "tend"):
+        with brownie.reverts("!authorized"):
+            getattr(router, name)(strategies, {"from": rando})
+
+    with brownie.reverts("!governance"):
+        router.setKeeper(rando, True, {"from": keeper})
+
+    router.setKeeper(keeper, False, {"from": gov})
+    with brownie.reverts("!authorized"):
+        router.harvest(strategies, {"from": keeper})
+
+
+def test_partial_failure(
+    gov, vault, token, keeper, router, strategies, common_health_check, chain
+):
+    failing = strategies[1]
+    failing.setHealthCheck(common_health_check, {"from": gov})
+    chain.sleep(15)
+    chain.mine()
+
+    # Gain is too big for the health check
+    token.transfer(failing, failing.estimatedTotalAssets() * 0.05, {"from": gov})
+    assert router.harvest.call(strategies, {"from": keeper}) == [True, False, True]
+
+    before = {s: vault.strategies(s).dict()["lastReport"] for s in strategies}
+    tx = router.harvest(strategies, {"from": keeper})
+    assert batch_failures(tx) == {failing.address: "!healthcheck"}
+
+    # The others were harvested anyway
+    for strategy in strategies:
+        last_report = vault.strategies(strategy).dict()["lastReport"]
+        assert (last_report == before[strategy]) == (strategy == failing)
+
+    # Tends don't go through the health check
+    tx = router.tend(strategies, {"from": keeper})
+    assert batch_failures(tx) == {}
+    assert "TendFailed" not in tx.events
+
+
+def test_submit_batch(web3, keeper, router, strategies, chain):
+    pipeline = TxPipeline(keeper, web3)
+    pending = submit_batch(pipeline, router, "tend", strategies, {})
+    assert pending.key == tuple(s.address for s in strategies)
+
+    # Every member of the batch counts as pending
+    for strategy in strategies:
+        assert pipeline.is_pending(strategy.address)
+
+    chain.mine()
+    [finished] = pipeline.poll()
+    assert finished.success
+    assert batch_failures(finished.receipt) == {}
+    assert not any(pipeline.is_pending(s.address) for s in strategies)
@@ -0,0 +1,100 @@
+from scripts.keeper.scheduler import HarvestScheduler
+from scripts.keeper.snapshot import take_snapshot
+
+
+def test_new_strategies_are_due_immediately():
+    scheduler = HarvestScheduler(["a", "b"])
+    assert len(scheduler) == 2
+    assert sorted(scheduler.pop_due(0)) == ["a", "b"]
+    # Nothing is due again until it is rescheduled
+    assert scheduler.pop_due(2 ** 64) == []
+
+    # Adding a strategy that is already scheduled leaves it alone
+    scheduler.schedule("a", 1_000, 100, 86_400)
+    scheduler.add("a")
+    scheduler.add("c")
+    assert scheduler.pop_due(0) == ["c"]
+
+
+def test_min_report_delay_window():
+    scheduler = HarvestScheduler()
+    scheduler.schedule("a", 1_000, 100, 86_400)
+    scheduler.schedule("b", 1_000, 0, 86_400)
+
+    # "a" is still inside of its `minReportDelay` window
+    assert scheduler.pop_due(1_050) == ["b"]
+    assert scheduler.next_wakeup(1_050) == 1_100
+    assert scheduler.deadline("a") == 87_400
+
+    assert scheduler.pop_due(1_100) == ["a"]
+    assert scheduler.next_wakeup(1_100) is None
+
+
+def test_reschedule_and_remove():
+    scheduler = HarvestScheduler()
+    scheduler.schedule("a", 1_000, 100, 86_400)
+    # A harvest happened in the meantime, so the old entry is stale
+    scheduler.schedule("a", 1_050, 100, 86_400)
+    assert scheduler.pop_due(1_100) == []
+    assert scheduler.pop_due(1_150) == ["a"]
+
+    scheduler.schedule("a", 1_150, 100, 86_400)
+    scheduler.remove("a")
+    assert "a" not in scheduler
+    assert scheduler.pop_due(2 ** 64) == []
+
+
+def test_retry_keeps_the_schedule():
+    scheduler = HarvestScheduler()
+    scheduler.schedule("a", 1_000, 100, 86_400)
+    assert scheduler.pop_due(1_100) == ["a"]
+
+    # "a" couldn't be read, so it is due again without a new schedule
+    scheduler.retry("a")
+    assert scheduler.pop_due(1_101) == ["a"]
+    assert scheduler.deadline("a") == 87_400
+
+
+def test_schedule_from_snapshot(gov, multicall, vault, strategy, keeper, chain):
+    strategy.setMinReportDelay(3_600, {"from": gov})
+    chain.sleep(1)
+    strategy.harvest({"from": keeper})
+
+    snapshot = take_snapshot(multicall, [(vault, [strategy])])
+    scheduler = HarvestScheduler()
+    scheduler.schedule_from_snapshot(snapshot.strategies[strategy.address])
+    last_report = vault.strategies(strategy).dict()["lastReport"]
+
+    assert scheduler.pop_due(snapshot.timestamp) == []
+    assert not strategy.harvestTrigger(0)
+    assert scheduler.next_wakeup(snapshot.timestamp) == last_report + 3_600
+    assert (
+        scheduler.deadline(strategy.address) == last_report + strategy.maxReportDelay()
+    )
+
+    chain.sleep(3_600)
+    chain.mine()
+    assert scheduler.pop_due(chain[-1].timestamp) == [strategy.address]
+
+
+def test_wait_returns_on_new_block(web3, chain):
+    scheduler = HarvestScheduler()
+    chain.mine()
+    block = chain[-1]
+    chain.mine()
+    assert scheduler.wait(web3, block.number, block.timestamp, poll_interval=0) == (
+        chain.height,
+        chain[-1].timestamp,
+    )
+
+
+def test_wait_returns_on_deadline(web3, chain):
+    block = chain[-1]
+    scheduler = HarvestScheduler()
+    scheduler.schedule("a", block.timestamp, 0, 0)  # Already eligible
+    scheduler.schedule("b", block.timestamp, 1, 1)
+    # No new block, but "b" becomes eligible a second later
+    assert scheduler.wait(web3, block.number, block.timestamp, poll_interval=0.1) == (
+        block.number,
+        block.timestamp + 1,
+    )
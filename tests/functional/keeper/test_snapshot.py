@@ -0,0 +1,158 @@
+import brownie
+from brownie import Contract
+
+from scripts.keeper.snapshot import (
+    CallBatch,
+    VaultInfo,
+    read_strategy_vaults,
+    read_triggers,
+    read_vault_info,
+    take_snapshot,
+)
+
+
+def test_multicall_aggregate(multicall, vault, token, chain):
+    calls = [
+        (vault.address, vault.totalAssets.encode_input()),
+        (token.address, token.balanceOf.encode_input(vault)),
+        # NOTE: Vault has no such method, so this call fails
+        (vault.address, "0xdeadbeef"),
+    ]
+    block_number, timestamp, results = multicall.aggregate(calls, False)
+    assert block_number == chain.height
+    assert timestamp == chain[-1].timestamp
+
+    assert [success for success, _ in results] == [True, True, False]
+    assert vault.totalAssets.decode_output(results[0][1]) == vault.totalAssets()
+    assert token.balanceOf.decode_output(results[1][1]) == token.balanceOf(vault)
+
+    with brownie.reverts("!call"):
+        multicall.aggregate(calls, True)
+
+
+def test_call_batch_decodes_in_order(multicall, vault, strategy):
+    batch = CallBatch()
+    batch.add(vault.strategies, strategy)
+    batch.add(vault.creditAvailable, strategy)
+    batch.add(strategy.harvestTrigger, 0)
+    assert len(batch) == 3
+
+    _, _, (params, credit, triggered) = batch.execute(multicall)
+    assert params == vault.strategies(strategy)
+    assert credit == vault.creditAvailable(strategy)
+    assert triggered == strategy.harvestTrigger(0)
+
+
+def test_snapshot_matches_direct_reads(
+    gov, multicall, vault, token, strategy, keeper, chain, web3
+):
+    chain.sleep(1)
+    strategy.harvest({"from": keeper})
+    # Simulate some yield so every field has something interesting in it
+    token.transfer(strategy, token.balanceOf(vault) // 100, {"from": gov})
+    chain.sleep(3600)
+    chain.mine()
+
+    snapshot = take_snapshot(multicall, [(vault, [strategy])])
+    assert snapshot.block_number == chain.height
+    assert snapshot.timestamp == chain[-1].timestamp
+    v = snapshot.vaults[vault.address]
+    assert v.address == vault.address
+    assert v.total_assets == vault.totalAssets()
+    assert v.total_debt == vault.totalDebt()
+    assert v.total_idle == token.balanceOf(vault)
+    assert v.locked_profit == vault.lockedProfit()
+
+    s = snapshot.strategies[strategy.address]
+    assert s.vault == vault.address
+    assert snapshot.vault_of(strategy.address) == v
+    assert s.params.lastReport == vault.strategies(strategy).dict()["lastReport"]
+    assert s.params.totalDebt == vault.strategies(strategy).dict()["totalDebt"]
+    assert s.credit_available == vault.creditAvailable(strategy)
+    assert s.debt_outstanding == vault.debtOutstanding(strategy)
+    assert s.expected_return == vault.expectedReturn(strategy)
+    assert s.min_report_delay == strategy.minReportDelay()
+    assert s.max_report_delay == strategy.maxReportDelay()
+    assert s.profit_factor == strategy.profitFactor()
+    assert s.debt_threshold == strategy.debtThreshold()
+    assert s.emergency_exit == strategy.emergencyExit()
+    assert s.code_hash == web3.keccak(web3.eth.get_code(strategy.address))
+    assert s.estimated_total_assets == strategy.estimatedTotalAssets()
+    assert s.eth_to_want == strategy.ethToWant(10 ** 18)
+
+
+def test_snapshot_across_vaults(
+    gov, multicall, vault, strategy, strategist, keeper, create_vault, TestStrategy
+):
+    other_vault = create_vault()
+    other_strategy = strategist.deploy(TestStrategy)
+    other_strategy.initialize(other_vault, strategist, strategist, keeper)
+    other_vault.addStrategy(other_strategy, 1_000, 0, 2 ** 256 - 1, 1000, {"from": gov})
+
+    snapshot = take_snapshot(
+        multicall, [(vault, [strategy]), (other_vault, [other_strategy])]
+    )
+    assert set(snapshot.vaults) == {vault.address, other_vault.address}
+    assert snapshot.vault_of(strategy.address).address == vault.address
+    assert snapshot.vault_of(other_strategy.address).address == other_vault.address
+    assert (
+        snapshot.vault_of(other_strategy.address).total_assets
+        == other_vault.totalAssets()
+    )
+
+    assert read_strategy_vaults(multicall, [strategy, other_strategy]) == {
+        strategy.address: vault.address,
+        other_strategy.address: other_vault.address,
+    }
+
+
+def test_snapshot_skips_unreadable_strategies(
+    multicall, vault, token, strategy, TestStrategy
+):
+    # NOTE: Not a Strategy, so its Strategy getters revert
+    broken = Contract.from_abi("BrokenStrategy", token.address, TestStrategy.abi)
+
+    snapshot = take_snapshot(multicall, [(vault, [broken, strategy])])
+    assert set(snapshot.strategies) == {strategy.address}
+    assert set(snapshot.unreadable) == {broken.address}
+    assert "min_report_delay" in snapshot.unreadable[broken.address]
+    assert snapshot.strategies[strategy.address].params.totalDebt == (
+        vault.strategies(strategy).dict()["totalDebt"]
+    )
+
+    assert read_strategy_vaults(multicall, [broken, strategy]) == {
+        strategy.address: vault.address
+    }
+
+
+def test_read_vault_info(multicall, vault, token):
+    assert read_vault_info(multicall, [vault]) == {
+        vault.address: VaultInfo(
+            vault.address,
+            token.address,
+            vault.decimals(),
+            vault.symbol(),
+            token.symbol(),
+        )
+    }
+    assert read_vault_info(multicall, []) == {}
+
+    # NOTE: Not a Vault, so it is left out
+    not_a_vault = Contract.from_abi("NotAVault", token.address, vault.abi)
+    assert set(read_vault_info(multicall, [vault, not_a_vault])) == {vault.address}
+
+
+def test_multicall_code_hash(multicall, strategy, rando, web3):
+    assert multicall.getCodeHash(strategy) == web3.keccak(
+        web3.eth.get_code(strategy.address)
+    )
+    # NOTE: Existing accounts without code hash the empty string
+    assert multicall.getCodeHash(rando) == web3.keccak(b"")
+
+
+def test_read_triggers(multicall, strategy):
+    triggers = read_triggers(multicall, [strategy], {strategy.address: (10 ** 9, None)})
+    # NOTE: No `tend` cost was given, so that trigger isn't read
+    assert triggers == {strategy.address: (strategy.harvestTrigger(10 ** 9), None)}
+
+    assert read_triggers(multicall, [strategy], {}) == {strategy.address: (None, None)}
@@ -0,0 +1,102 @@
+import brownie
+import pytest
+
+from scripts.keeper.transactions import NonceManager, TxPipeline
+
+
+@pytest.fixture
+def strategies(gov, vault, strategist, keeper, TestStrategy):
+    strategies = []
+    for _ in range(3):
+        strategy = strategist.deploy(TestStrategy)
+        strategy.initialize(vault, strategist, strategist, keeper)
+        vault.addStrategy(strategy, 1_000, 0, 2 ** 256 - 1, 1000, {"from": gov})
+        strategies.append(strategy)
+    yield strategies
+
+
+def test_nonce_manager_reconciles_with_node(web3, keeper, rando):
+    nonces = NonceManager(web3, keeper.address)
+    assert nonces.next_nonce == keeper.nonce
+
+    # Sent outside of the manager, e.g. by a previous run of the bot
+    keeper.transfer(rando, 0)
+    assert nonces.next_nonce == keeper.nonce - 1
+    assert nonces.reconcile() == keeper.nonce
+
+
+def test_nonce_manager_skips_failed_sends(web3, keeper):
+    nonces = NonceManager(web3, keeper.address)
+    start = nonces.next_nonce
+
+    def fails(nonce):
+        raise ValueError("reverted")
+
+    with pytest.raises(ValueError):
+        nonces.send(fails)
+    assert nonces.next_nonce == start
+
+    assert nonces.send(lambda nonce: nonce) == start
+    assert nonces.next_nonce == start + 1
+
+
+def test_pipeline_keeps_several_in_flight(web3, chain, keeper, strategies):
+    pipeline = TxPipeline(keeper, web3)
+    start = keeper.nonce
+    chain.sleep(1)
+
+    pending = [
+        pipeline.submit(
+            strategy.harvest, tx_params={"gas_price": 0}, key=strategy.address
+        )
+        for strategy in strategies
+    ]
+    assert [tx.nonce for tx in pending] == list(range(start, start + len(strategies)))
+    assert all(pipeline.is_pending(strategy.address) for strategy in strategies)
+
+    # NOTE: Nothing waited on the receipts above
+    chain.mine()
+    finished = pipeline.poll()
+    assert len(pipeline) == 0
+    assert [tx.key for tx in finished] == [s.address for s in strategies]
+    assert all(tx.success and tx.gas_used > 0 for tx in finished)
+    assert keeper.nonce == start + len(strategies)
+
+    for strategy in strategies:
+        assert strategy.estimatedTotalAssets() > 0
+
+
+def test_pipeline_respects_max_in_flight(web3, chain, keeper, strategies):
+    pipeline = TxPipeline(keeper, web3, max_in_flight=1)
+    chain.sleep(1)
+
+    pipeline.submit(strategies[0].harvest, tx_params={"gas_price": 0})
+    assert not pipeline.has_capacity
+    with pytest.raises(ValueError):
+        pipeline.submit(strategies[1].harvest, tx_params={"gas_price": 0})
+
+    [finished] = pipeline.wait_for_capacity(poll_interval=0)
+    assert finished.success
+    assert pipeline.has_capacity
+
+
+def test_pipeline_reports_reverts(web3, chain, keeper, rando, strategies):
+    pipeline = TxPipeline(keeper, web3)
+    start = pipeline.nonces.next_nonce
+
+    # Fails gas estimation, so never reaches the node or uses a nonce
+    with brownie.reverts():
+        pipeline.submit(strategies[0].setKeeper, rando, tx_params={"gas_price": 0})
+    assert pipeline.nonces.next_nonce == start
+    assert len(pipeline) == 0
+
+    # Reverts on-chain, which still uses up the nonce
+    pipeline.submit(
+        strategies[0].setKeeper,
+        rando,
+        tx_params={"gas_price": 0, "gas_limit": 100_000, "allow_revert": True},
+    )
+    chain.mine()
+    [finished] = pipeline.poll()
+    assert not finished.success
+    assert keeper.nonce == start + 1
@@ -0,0 +1,133 @@
+import pytest
+
+from scripts.keeper.snapshot import take_snapshot
+from scripts.keeper.triggers import can_harvest_trigger, eth_to_want, harvest_trigger
+
+
+MAX_UINT256 = 2 ** 256 - 1
+DAY = 86400
+
+
+def assert_trigger_matches(multicall, vault, strategy, call_costs):
+    snapshot = take_snapshot(multicall, [(vault, [strategy])])
+    strategy_snapshot = snapshot.strategies[strategy.address]
+    for call_cost in call_costs:
+        assert harvest_trigger(
+            strategy_snapshot, call_cost, snapshot.timestamp
+        ) == strategy.harvestTrigger(call_cost)
+
+
+@pytest.fixture
+def call_costs(token):
+    yield [0, 1, 10 ** token.decimals(), MAX_UINT256 // 1000]
+
+
+def test_trigger_before_activation(multicall, vault, just_strategy, call_costs):
+    assert_trigger_matches(multicall, vault, just_strategy, call_costs)
+    assert not can_harvest_trigger(
+        take_snapshot(multicall, [(vault, [just_strategy])]).strategies[
+            just_strategy.address
+        ],
+        0,
+    )
+
+
+def test_trigger_report_delays(
+    gov, multicall, vault, strategy, keeper, chain, call_costs
+):
+    strategy.setMinReportDelay(DAY // 2, {"from": gov})
+    chain.sleep(1)
+    strategy.harvest({"from": keeper})
+
+    # Inside of `minReportDelay`
+    assert_trigger_matches(multicall, vault, strategy, call_costs)
+    assert not strategy.harvestTrigger(0)
+
+    # Between `minReportDelay` and `maxReportDelay`
+    chain.sleep(DAY // 2 + 60)
+    chain.mine()
+    assert_trigger_matches(multicall, vault, strategy, call_costs)
+
+    # Past `maxReportDelay`
+    chain.sleep(DAY)
+    chain.mine()
+    assert_trigger_matches(multicall, vault, strategy, call_costs)
+    assert strategy.harvestTrigger(MAX_UINT256)
+
+
+def test_trigger_profit_and_credit(
+    gov, multicall, vault, token, strategy, keeper, chain, call_costs
+):
+    # Credit is available before the first harvest
+    assert_trigger_matches(multicall, vault, strategy, call_costs)
+
+    chain.sleep(1)
+    strategy.harvest({"from": keeper})
+    assert_trigger_matches(multicall, vault, strategy, call_costs)
+
+    profit = 10 ** token.decimals()
+    token.transfer(strategy, profit, {"from": gov})
+    chain.sleep(60)
+    chain.mine()
+    assert_trigger_matches(
+        multicall,
+        vault,
+        strategy,
+        call_costs
+        + [profit // strategy.profitFactor() - 1, profit // strategy.profitFactor()],
+    )
+
+
+def test_trigger_debt_outstanding_and_loss(
+    gov, multicall, vault, token, strategy, keeper, chain, call_costs
+):
+    chain.sleep(1)
+    strategy.harvest({"from": keeper})
+
+    # Loss to report
+    strategy._takeFunds(token.balanceOf(strategy) // 10, {"from": gov})
+    assert_trigger_matches(multicall, vault, strategy, call_costs)
+    assert strategy.harvestTrigger(MAX_UINT256)
+    chain.undo()
+
+    # A loss within `debtThreshold` doesn't trigger on its own
+    strategy.setDebtThreshold(token.balanceOf(strategy), {"from": gov})
+    strategy._takeFunds(token.balanceOf(strategy) // 10, {"from": gov})
+    assert_trigger_matches(multicall, vault, strategy, call_costs)
+    chain.undo(2)
+
+    # Debt to pay back
+    vault.revokeStrategy(strategy, {"from": gov})
+    assert vault.debtOutstanding(strategy) > 0
+    assert_trigger_matches(multicall, vault, strategy, call_costs)
+    assert strategy.harvestTrigger(MAX_UINT256)
+
+
+def test_trigger_boundaries(make_snapshot):
+    snapshot = make_snapshot()
+    assert harvest_trigger(snapshot, 0, 1_099) is False
+    assert harvest_trigger(snapshot, 0, 1_100) is False  # Nothing to gain
+    assert harvest_trigger(snapshot, 0, 2_000) is True
+
+    snapshot = make_snapshot(estimated_total_assets=10_200)
+    # 100 * (cost * 2) < 200 <=> cost < 1
+    assert harvest_trigger(snapshot, 0, 1_100) is True
+    assert harvest_trigger(snapshot, 1, 1_100) is False
+    assert can_harvest_trigger(snapshot, 1_100)
+    assert not can_harvest_trigger(snapshot, 1_099)
+
+
+def test_trigger_unknown_reads(make_snapshot):
+    # Time based decisions don't need any Strategy reads
+    snapshot = make_snapshot(estimated_total_assets=None, eth_to_want=None)
+    assert harvest_trigger(snapshot, 1, 1_099) is False
+    assert harvest_trigger(snapshot, 1, 2_000) is True
+    assert harvest_trigger(snapshot, 1, 1_100) is None
+    # Unknown is never ruled out
+    assert can_harvest_trigger(snapshot, 1_100)
+
+    snapshot = make_snapshot(eth_to_want=None)
+    assert eth_to_want(snapshot, 0) == 0
+    assert eth_to_want(snapshot, 1) is None
+    assert harvest_trigger(snapshot, 0, 1_100) is False
+    assert harvest_trigger(snapshot, 1, 1_100) is None
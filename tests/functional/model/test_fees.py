@@ -0,0 +1,90 @@
+import copy
+
+import numpy as np
+
+from scripts.vault_model.fees import historical_apr, project_fees
+from scripts.vault_model.strategy import TestStrategyModel
+from scripts.vault_model.vault import MAX_BPS, SECS_PER_YEAR, VaultModel
+
+DAY = 24 * 60 * 60
+UNIT = 10 ** 18
+
+
+def fleet():
+    models = []
+    for address, debt_ratios in (("yvA", (4_000, 5_000)), ("yvB", (9_000,))):
+        model = VaultModel(1, address=address, rewards=f"{address}-rewards")
+        for index, debt_ratio in enumerate(debt_ratios):
+            strategy = TestStrategyModel(f"{address}-{index}", model)
+            model.add_strategy(strategy, debt_ratio, 0, 2 ** 256 - 1, 1_000, 1)
+        model.deposit("user", 1_000_000 * UNIT, 1)
+        for strategy in model.contracts.values():
+            strategy.harvest(2)
+        for strategy in model.contracts.values():
+            strategy.balance += strategy.balance // 100
+            strategy.harvest(2 + 7 * DAY)
+        models.append(model)
+    return models
+
+
+def replay(models, timestamp, duration, step, apr, interval):
+    """
+    `project_fees`, one harvest at a time through `VaultModel`.
+    """
+    models = copy.deepcopy(models)
+    price_per_share = []
+    for t in range(timestamp + step, timestamp + duration + 1, step):
+        for model, row in zip(models, apr):
+            for strategy, rate in zip(model.contracts.values(), row):
+                strategy.balance += (
+                    strategy.balance * rate * step // (MAX_BPS * SECS_PER_YEAR)
+                )
+        for model in models:
+            for address, strategy in model.contracts.items():
+                if t - model.strategies[address].lastReport >= interval:
+                    strategy.harvest(t)
+        price_per_share.append([m.price_per_share(t) for m in models])
+    return models, np.array(price_per_share, dtype=object).T
+
+
+def test_projection_matches_the_model():
+    models = fleet()
+    before = copy.deepcopy(models)
+    timestamp = 10 * DAY
+    apr = [[700, 1_200], [300, 0]]
+
+    projection = project_fees(models, timestamp, 60 * DAY, DAY, apr, 3 * DAY)
+    expected, price_per_share = replay(models, timestamp, 60 * DAY, DAY, apr, 3 * DAY)
+    assert projection.fees.shape == (2, 2)
+    assert (projection.price_per_share == price_per_share).all()
+
+    recipients = projection.by_recipient()
+    assert len(recipients) == 5
+    last = timestamp + 60 * DAY
+    for old, new in zip(before, expected):
+        for recipient in [new.rewards] + list(new.contracts):
+            shares, value = recipients[new.address, recipient]
+            issued = new.balance_of.get(recipient, 0) - old.balance_of.get(recipient, 0)
+            assert shares == issued > 0
+            assert value == new.share_value(issued, last)
+
+    # The padding Strategy of the second Vault never earns anything
+    assert projection.fees[1, 1] == projection.strategist_shares[1, 1] == 0
+    # And the models projected from are left alone
+    assert [m.total_supply for m in models] == [m.total_supply for m in before]
+
+
+def test_historical_apr_and_float_mode():
+    models = fleet()
+    # NOTE: 1% over the week since the first harvest
+    assert historical_apr(models[0], "yvA-0") == (
+        MAX_BPS * SECS_PER_YEAR // (7 * DAY) // 100
+    )
+
+    exact = project_fees(models, 10 * DAY, 90 * DAY, DAY)
+    approximate = project_fees(models, 10 * DAY, 90 * DAY, DAY, exact=False)
+    assert exact.fees.sum() > 0
+    assert np.allclose(approximate.fees, exact.fees.astype(float), rtol=1e-9)
+    assert np.allclose(
+        approximate.rewards_value, exact.rewards_value.astype(float), rtol=1e-9
+    )
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from scripts.vault_model.forecast import Forecast
+from scripts.vault_model.strategy import TestStrategyModel
+from scripts.vault_model.vault import DEGRADATION_COEFFICIENT, VaultModel
+
+DAY = 24 * 60 * 60
+
+
+def test_forecast_matches_vault(chain, gov, keeper, vault, token, strategy):
+    chain.sleep(1)
+    strategy.harvest({"from": keeper})
+    token.transfer(strategy, 10 ** token.decimals(), {"from": gov})
+    chain.sleep(1)
+    tx = strategy.harvest({"from": keeper})
+    assert vault.lockedProfit() > 0
+
+    # NOTE: Views are evaluated at a given block, for its timestamp
+    forecast = Forecast.from_vault(vault, block_identifier=tx.block_number)
+    assert forecast.price_per_share(tx.timestamp) == vault.pricePerShare(
+        block_identifier=tx.block_number
+    )
+    for seconds in (1, 60, DAY // 2, DAY):
+        chain.sleep(seconds)
+        chain.mine()
+        block = chain[-1]
+        assert forecast.price_per_share(block.timestamp) == vault.pricePerShare(
+            block_identifier=block.number
+        )
+        # Only time has passed, the state the forecast read is the same
+        assert Forecast.from_vault(vault, block_identifier=block.number) == forecast
+
+
+def test_forecast_matches_model():
+    model = VaultModel(1)
+    strategy = TestStrategyModel("strategy", model)
+    model.add_strategy(strategy, 9_000, 0, 2 ** 256 - 1, 1_000, 1)
+    model.deposit("user", 10 ** 24, 1)
+    strategy.harvest(2)
+    strategy.balance += 10 ** 22
+    strategy.harvest(3)
+
+    forecast = Forecast.from_model(model)
+    unlocked_at = forecast.unlocked_at()
+    timestamps = list(range(3, unlocked_at + DAY, 997)) + [unlocked_at - 1, unlocked_at]
+    curve = forecast.price_per_share_curve(timestamps)
+    assert list(curve) == [model.price_per_share(t) for t in timestamps]
+    assert list(forecast.free_funds_curve(timestamps)) == [
+        model.free_funds(t) for t in timestamps
+    ]
+
+    assert forecast.locked_profit_at(unlocked_at - 1) > 0
+    assert forecast.locked_profit_at(unlocked_at) == 0
+    assert np.allclose(
+        forecast.price_per_share_curve(timestamps, exact=False),
+        curve.astype(float),
+        rtol=1e-12,
+    )
+
+
+def test_unlocked_at():
+    forecast = Forecast(10 ** 18, 10 ** 18, 10 ** 17, 0, 100, 18)
+    assert forecast.unlocked_at() is None
+    forecast = Forecast(10 ** 18, 10 ** 18, 10 ** 17, DEGRADATION_COEFFICIENT, 100, 18)
+    assert forecast.unlocked_at() == 101
+    forecast = Forecast(10 ** 18, 10 ** 18, 0, 1, 100, 18)
+    assert forecast.unlocked_at() == 100
+
+
+def test_no_forecast_before_last_report():
+    forecast = Forecast(10 ** 18, 10 ** 18, 10 ** 17, 10 ** 12, 100, 18)
+    with pytest.raises(ValueError):
+        forecast.price_per_share(99)
+    with pytest.raises(ValueError):
+        forecast.price_per_share_curve([100, 99])
+
+
+def test_forecast_is_exact_past_64_bits():
+    forecast = Forecast(10 ** 30, 9 * 10 ** 29, 10 ** 29, 10 ** 12, 100, 18)
+    locked_profit = 10 ** 29 - 50 * 10 ** 12 * 10 ** 29 // DEGRADATION_COEFFICIENT
+    assert forecast.locked_profit_at(150) == locked_profit
+    assert forecast.free_funds(150) == 10 ** 30 - locked_profit
+    assert forecast.price_per_share(150) == (
+        10 ** 18 * (10 ** 30 - locked_profit) // (9 * 10 ** 29)
+    )
+    assert list(forecast.price_per_share_curve([150])) == [
+        forecast.price_per_share(150)
+    ]
@@ -0,0 +1,39 @@
+import numpy as np
+
+from scripts.vault_model.monte_carlo import LossScenario, monte_carlo
+
+SCENARIO = LossScenario(depositors=6, duration=60 * 24 * 60 * 60)
+
+
+def test_results_depend_only_on_the_seed():
+    serial = monte_carlo(SCENARIO, 12, seed=7, processes=1)
+    parallel = monte_carlo(SCENARIO, 12, seed=7, processes=2)
+    assert serial.received.shape == (12, 6)
+    for field in ("deposited", "received", "deposited_at", "withdrawn_at", "blocked"):
+        assert (getattr(serial, field) == getattr(parallel, field)).all()
+
+    other = monte_carlo(SCENARIO, 12, seed=8, processes=1)
+    assert (other.received != serial.received).any()
+
+
+def test_without_losses_nobody_loses():
+    scenario = LossScenario(depositors=6, loss_probability=0)
+    result = monte_carlo(scenario, 20, processes=1)
+    # NOTE: Share math rounds down, by at most a few wei
+    assert (result.received - result.deposited >= -10).all()
+    assert result.blocked.sum() == 0
+    assert result.quantiles([0.5])[0] > 0
+
+
+def test_max_loss_makes_withdrawals_wait():
+    scenario = LossScenario(depositors=6, loss_probability=0.5, max_loss=0)
+    result = monte_carlo(scenario, 20, processes=1)
+    assert result.blocked.sum() > 0
+    # Everyone is out by the end, blocked or not
+    assert (result.withdrawn_at > result.deposited_at).all()
+    assert (result.withdrawn_at <= 1 + scenario.duration).all()
+    assert result.returns.min() < 0
+
+    by_exit = result.returns_by_exit_order()
+    assert sorted(by_exit[0]) == sorted(result.returns[0])
+    assert np.isfinite(by_exit).all()
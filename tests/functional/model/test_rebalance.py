@@ -0,0 +1,125 @@
+from scripts.vault_model.chain import mismatches, model_from_vault
+from scripts.vault_model.rebalance import HARVEST, UPDATE_DEBT_RATIO, plan_rebalance
+from scripts.vault_model.strategy import TestStrategyModel
+from scripts.vault_model.vault import VaultModel
+
+UNIT = 10 ** 18
+
+
+def test_plan_reaches_targets():
+    model = VaultModel(1)
+    for name, debt_ratio, max_debt in (("a", 5_000, 2 ** 256 - 1), ("b", 3_000, 0)):
+        strategy = TestStrategyModel(name, model)
+        model.add_strategy(strategy, debt_ratio, 0, max_debt, 1_000, 1)
+    c = TestStrategyModel("c", model)
+    model.add_strategy(c, 0, 0, 150 * UNIT, 1_000, 1)
+    model.deposit("user", 1_000 * UNIT, 1)
+    model.contracts["a"].harvest(2)
+    assert model.strategies["a"].totalDebt == 500 * UNIT
+
+    # NOTE: "c" can't go up before "a" comes down, or the total would be 130%
+    plan = plan_rebalance(model, {"a": 1_000, "b": 3_000, "c": 5_000}, 2)
+    assert [(s.action, s.strategy) for s in plan.steps[:2]] == [
+        (UPDATE_DEBT_RATIO, "a"),
+        (UPDATE_DEBT_RATIO, "c"),
+    ]
+    assert plan.steps[1].outstanding == 400 * UNIT
+
+    # "a" repays in one go, "c" is limited to 150 per harvest, "b" can't draw
+    assert [(s.strategy, s.moved // UNIT) for s in plan.harvests] == [
+        ("a", -400),
+        ("c", 150),
+        ("c", 150),
+        ("c", 150),
+        ("c", 50),
+    ]
+    assert [s.idle // UNIT for s in plan.harvests] == [900, 750, 600, 450, 400]
+    assert plan.complete
+    assert plan.harvests[-1].outstanding == plan.harvests[-1].credit == 0
+    assert {s: p.totalDebt // UNIT for s, p in plan.model.strategies.items()} == {
+        "a": 100,
+        "b": 0,
+        "c": 500,
+    }
+
+    # The model that was planned from is left alone
+    assert model.strategies["a"].debtRatio == 5_000
+    assert model.strategies["c"].totalDebt == 0
+
+
+def test_plan_stops_at_max_harvests():
+    model = VaultModel(1)
+    strategy = TestStrategyModel("strategy", model)
+    model.add_strategy(strategy, 0, 0, UNIT, 1_000, 1)
+    model.deposit("user", 1_000 * UNIT, 1)
+
+    plan = plan_rebalance(model, {"strategy": 10_000}, 1, max_harvests=3)
+    assert len(plan.harvests) == 3
+    assert not plan.complete
+
+
+class IlliquidStrategyModel(TestStrategyModel):
+    # NOTE: Never has anything free to repay with
+    def prepare_return(self, debt_outstanding):
+        return 0, 0, 0
+
+
+def test_plan_skips_harvests_that_move_nothing():
+    model = VaultModel(1)
+    for name, strategy_model in (
+        ("a", IlliquidStrategyModel),
+        ("b", TestStrategyModel),
+    ):
+        strategy = strategy_model(name, model)
+        model.add_strategy(strategy, 5_000, 0, 2 ** 256 - 1, 1_000, 1)
+    model.deposit("user", 1_000 * UNIT, 1)
+    for strategy in model.contracts.values():
+        strategy.harvest(2)
+
+    plan = plan_rebalance(model, {"a": 0, "b": 10_000}, 2, max_harvests=3)
+    # "a" owes all of its debt, but harvesting it would move nothing
+    assert [(s.action, s.strategy) for s in plan.steps] == [
+        (UPDATE_DEBT_RATIO, "a"),
+        (UPDATE_DEBT_RATIO, "b"),
+    ]
+    assert plan.steps[-1].outstanding == 500 * UNIT
+    assert not plan.complete
+    assert plan.model.strategies["a"].lastReport == 2
+
+
+def test_plan_matches_vault(
+    chain, gov, vault, token, strategy, keeper, strategist, multicall, TestStrategy
+):
+    other = strategist.deploy(TestStrategy)
+    other.initialize(vault, strategist, strategist, keeper)
+    max_debt = vault.totalAssets() // 10
+    vault.addStrategy(other, 1_000, 0, max_debt, 1_000, {"from": gov})
+    chain.sleep(1)
+    for s in (strategy, other):
+        s.harvest({"from": keeper})
+
+    model = model_from_vault(vault, multicall)
+    assert mismatches(model, vault, token) == {}
+
+    strategies = {strategy.address: strategy, other.address: other}
+    targets = {strategy.address: 1_000, other.address: 6_000}
+    plan = plan_rebalance(model, targets, chain.time())
+    assert plan.complete and len(plan.harvests) > 2
+    for step in plan.steps:
+        total_debt = vault.strategies(step.strategy).dict()["totalDebt"]
+        chain.sleep(1)
+        if step.action == UPDATE_DEBT_RATIO:
+            vault.updateStrategyDebtRatio(step.strategy, step.debt_ratio, {"from": gov})
+        else:
+            assert step.action == HARVEST
+            strategies[step.strategy].harvest({"from": keeper})
+        moved = vault.strategies(step.strategy).dict()["totalDebt"] - total_debt
+        assert moved == step.moved
+        assert token.balanceOf(vault) == step.idle
+
+    for address in strategies:
+        assert (
+            vault.strategies(address).dict()["totalDebt"]
+            == plan.model.strategies[address].totalDebt
+        )
+    assert token.balanceOf(vault) == plan.model.balance
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from scripts.vault_model.simulate import DAY, grid, simulate
+from scripts.vault_model.strategy import TestStrategyModel
+from scripts.vault_model.vault import MAX_BPS, SECS_PER_YEAR, VaultModel
+
+# NOTE: Negative yields make harvests report losses
+CONFIGURATIONS = grid(
+    performance_fee=[0, 1_000],
+    management_fee=[0, 200],
+    locked_profit_degradation=[10 ** 18 * 46 // 10 ** 6, 10 ** 18 // (3 * DAY)],
+    debt_ratio=[(4_000, 5_000), (9_500, 0)],
+    apr=[(1_000, -300), (20_000, 500)],
+    harvest_interval=[(DAY, 3 * DAY)],
+)
+START = 1  # NOTE: `VaultModel` needs a non-zero activation
+
+
+def replay(duration, step, deposit, **parameters):
+    """
+    The same run as `simulate`, one configuration at a time through `VaultModel`.
+    """
+    model = VaultModel(START)
+    model.set_performance_fee(parameters["performance_fee"])
+    model.set_management_fee(parameters["management_fee"])
+    model.set_locked_profit_degradation(parameters["locked_profit_degradation"])
+    strategies = []
+    for index, debt_ratio in enumerate(parameters["debt_ratio"]):
+        strategy = TestStrategyModel(f"strategy{index}", model)
+        model.add_strategy(strategy, debt_ratio, 0, 2 ** 256 - 1, 1_000, START)
+        strategies.append(strategy)
+    model.deposit("depositor", deposit, START)
+
+    price_per_share = []
+    for timestamp in range(START + step, START + duration + 1, step):
+        for strategy, apr in zip(strategies, parameters["apr"]):
+            strategy.balance += (
+                strategy.balance * apr * step // (MAX_BPS * SECS_PER_YEAR)
+            )
+        for strategy, interval in zip(strategies, parameters["harvest_interval"]):
+            last_report = model.strategies[strategy.address].lastReport
+            if timestamp - last_report >= interval or last_report == START:
+                strategy.harvest(timestamp)
+        price_per_share.append(model.price_per_share(timestamp))
+    return model, price_per_share
+
+
+def test_exact_mode_matches_the_model():
+    deposit = 10 ** 24
+    result = simulate(30 * DAY, DAY // 2, deposit=deposit, **CONFIGURATIONS)
+    assert result.price_per_share.shape == (len(CONFIGURATIONS["apr"]), 60)
+
+    for row in range(len(CONFIGURATIONS["apr"])):
+        parameters = {name: values[row] for name, values in CONFIGURATIONS.items()}
+        model, price_per_share = replay(30 * DAY, DAY // 2, deposit, **parameters)
+        timestamp = START + 30 * DAY
+
+        assert list(result.price_per_share[row]) == price_per_share
+        assert result.depositor_value[row] == model.share_value(
+            model.balance_of["depositor"], timestamp
+        )
+        assert result.rewards_shares[row] == model.balance_of.get(model.rewards, 0)
+        assert result.strategist_shares[row] == sum(
+            model.balance_of.get(s, 0) for s in model.strategies
+        )
+
+
+def test_float_mode_approximates_exact_mode():
+    exact = simulate(90 * DAY, DAY, **CONFIGURATIONS)
+    approximate = simulate(90 * DAY, DAY, **CONFIGURATIONS, exact=False)
+    assert approximate.price_per_share.dtype == np.float64
+
+    assert np.allclose(
+        approximate.price_per_share, exact.price_per_share.astype(float), rtol=1e-9
+    )
+    assert np.allclose(approximate.fees, exact.fees.astype(float), rtol=1e-9)
+    assert np.allclose(approximate.depositor_return, exact.depositor_return, rtol=1e-6)
+
+
+def test_fees_come_out_of_depositor_returns():
+    result = simulate(
+        365 * DAY,
+        DAY,
+        debt_ratio=(9_000,),
+        apr=1_000,
+        management_fee=[0, 200],
+        performance_fee=[0, 1_000],
+        strategist_fee=0,
+    )
+    no_fees, fees = result.depositor_return
+    assert no_fees > fees > 0
+    assert result.fees[0] == 0 and result.fees[1] > 0
+    # Shares minted for fees are worth at least what was charged
+    assert result.rewards_value[1] >= result.fees[1] * 99 // 100
+
+
+def test_parameters_must_broadcast_to_rows():
+    with pytest.raises(ValueError):
+        simulate(DAY, DAY, debt_ratio=[[[5_000]]], apr=0)
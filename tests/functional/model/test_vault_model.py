@@ -0,0 +1,101 @@
+from dataclasses import asdict
+
+import pytest
+
+from scripts.vault_model.chain import mismatches
+from scripts.vault_model.strategy import TestStrategyModel
+from scripts.vault_model.vault import VaultModel, VaultRevert
+
+
+@pytest.fixture
+def vault(create_vault, token):
+    yield create_vault(token)
+
+
+@pytest.fixture
+def model(vault, rewards):
+    yield VaultModel(
+        vault.activation(),
+        decimals=vault.decimals(),
+        address=vault.address,
+        rewards=rewards.address,
+    )
+
+
+def add_strategy(gov, vault, model, TestStrategy, debt_ratio):
+    strategy = gov.deploy(TestStrategy)
+    strategy.initialize(vault, gov, gov, gov)
+    tx = vault.addStrategy(strategy, debt_ratio, 0, 2 ** 256 - 1, 1000, {"from": gov})
+    strategy_model = TestStrategyModel(strategy.address, model)
+    model.add_strategy(strategy_model, debt_ratio, 0, 2 ** 256 - 1, 1000, tx.timestamp)
+    return strategy, strategy_model
+
+
+def harvest(gov, strategy, strategy_model, chain):
+    chain.sleep(1)
+    tx = strategy.harvest({"from": gov})
+    assert strategy_model.harvest(tx.timestamp) == tx.return_value
+
+
+def test_model_matches_vault(gov, rewards, vault, model, token, TestStrategy, chain):
+    holders = [gov.address, rewards.address]
+    unit = 10 ** token.decimals()
+    token.approve(vault, 2 ** 256 - 1, {"from": gov})
+    tx = vault.deposit(1_000 * unit, {"from": gov})
+    assert model.deposit(gov.address, 1_000 * unit, tx.timestamp) == tx.return_value
+
+    first, first_model = add_strategy(gov, vault, model, TestStrategy, 3_000)
+    second, second_model = add_strategy(gov, vault, model, TestStrategy, 4_000)
+    holders += [first.address, second.address]
+    for strategy, strategy_model in ((first, first_model), (second, second_model)):
+        harvest(gov, strategy, strategy_model, chain)
+    assert mismatches(model, vault, token, holders) == {}
+
+    # Gains are charged fees, and their profit is locked
+    token.transfer(first, 10 * unit, {"from": gov})
+    first_model.balance += 10 * unit
+    harvest(gov, first, first_model, chain)
+    assert model.locked_profit > 0
+    assert mismatches(model, vault, token, holders) == {}
+
+    # A loss lowers the debt ratio, and is taken by the next withdrawal
+    second._takeFunds(20 * unit, {"from": gov})
+    second_model.take_funds(20 * unit)
+    vault.updateStrategyDebtRatio(first, 1_000, {"from": gov})
+    model.update_strategy_debt_ratio(first.address, 1_000)
+    harvest(gov, first, first_model, chain)
+    chain.sleep(60)
+    tx = vault.withdraw(800 * unit, gov, 10_000, {"from": gov})
+    withdrawal = model.withdraw(gov.address, tx.timestamp, 800 * unit, 10_000)
+    assert withdrawal.value == tx.return_value
+    assert withdrawal.loss > 0
+    assert mismatches(model, vault, token, holders) == {}
+
+    # Emergency exit returns everything on the next harvest
+    first.setEmergencyExit({"from": gov})
+    first_model.set_emergency_exit()
+    harvest(gov, first, first_model, chain)
+    assert model.strategies[first.address].totalDebt == 0
+    assert mismatches(model, vault, token, holders) == {}
+
+
+def test_reverts_leave_the_model_untouched():
+    model = VaultModel(1)
+    strategy = TestStrategyModel("strategy", model)
+    model.add_strategy(strategy, 5_000, 0, 2 ** 256 - 1, 1_000, 1)
+    model.deposit("user", 1_000, 1)
+    strategy.harvest(2)
+    strategy.take_funds(100)
+
+    before = (model.balance, dict(model.balance_of), model.total_debt)
+    params = asdict(model.strategies["strategy"])
+    with pytest.raises(VaultRevert, match="max loss"):
+        model.withdraw("user", 3, max_loss=0)
+    assert (model.balance, dict(model.balance_of), model.total_debt) == before
+    assert asdict(model.strategies["strategy"]) == params
+    assert strategy.balance == 400
+
+    with pytest.raises(VaultRevert):
+        strategy.harvest(2)  # NOTE: Twice in the same block
+    with pytest.raises(VaultRevert):
+        model.deposit(model.address, 1, 3)
@@ -0,0 +1,94 @@
+import itertools
+import random
+
+import pytest
+from brownie import ZERO_ADDRESS
+
+from scripts.vault_model.withdrawal_queue import (
+    StrategyProfile,
+    expected_cost,
+    measure_profile,
+    optimize_queue,
+    set_withdrawal_queue_calldata,
+)
+
+UNIT = 10 ** 18
+
+
+def random_profiles(rng, n):
+    return [
+        StrategyProfile(
+            strategy=f"0x{i + 1:040x}",
+            debt=rng.randint(1, 100) * UNIT,
+            gas=rng.randint(50_000, 400_000),
+            loss_bps=rng.randint(0, 100),
+            free=rng.randint(0, 20) * UNIT,
+        )
+        for i in range(n)
+    ]
+
+
+def test_optimizer_finds_the_best_ordering():
+    rng = random.Random(0)
+    for _ in range(10):
+        profiles = random_profiles(rng, 5)
+        withdrawals = [rng.randint(1, 300) * UNIT for _ in range(20)]
+        weights = [rng.random() for _ in withdrawals]
+        costs = dict(weights=weights, idle=5 * UNIT, want_per_gas=10 ** 11)
+
+        plan = optimize_queue(profiles, withdrawals, **costs)
+        assert plan.exact
+        best = min(
+            expected_cost(queue, withdrawals, **costs)
+            for queue in itertools.permutations(profiles)
+        )
+        assert plan.expected_cost == pytest.approx(best, rel=1e-12)
+
+        # Without the exact search, the fallback is never worse than the input
+        plan = optimize_queue(profiles, withdrawals, exact_limit=0, **costs)
+        assert not plan.exact
+        assert plan.expected_cost <= expected_cost(profiles, withdrawals, **costs)
+
+
+def test_lossy_strategies_go_last():
+    lossy = StrategyProfile("0x" + "1" * 40, debt=100 * UNIT, gas=100_000, loss_bps=50)
+    liquid = StrategyProfile("0x" + "2" * 40, debt=100 * UNIT, gas=200_000)
+    plan = optimize_queue([lossy, liquid], [10 * UNIT, 50 * UNIT], want_per_gas=10 ** 9)
+    assert plan.queue == (liquid.strategy, lossy.strategy)
+
+    # Unless gas costs more than the loss saves
+    plan = optimize_queue(
+        [lossy, liquid], [10 * UNIT, 50 * UNIT], want_per_gas=10 ** 14
+    )
+    assert plan.queue == (lossy.strategy, liquid.strategy)
+
+
+def test_calldata(gov, vault, strategy, TestStrategy, strategist, keeper):
+    other = strategist.deploy(TestStrategy)
+    other.initialize(vault, strategist, strategist, keeper)
+    vault.addStrategy(other, 1_000, 0, 2 ** 256 - 1, 1_000, {"from": gov})
+
+    queue = [other.address, strategy.address]
+    padded = queue + [ZERO_ADDRESS] * 18
+    calldata = set_withdrawal_queue_calldata(queue)
+    assert calldata == vault.setWithdrawalQueue.encode_input(padded)
+
+    gov.transfer(vault, 0, data=calldata)
+    assert [vault.withdrawalQueue(i) for i in range(3)] == queue + [ZERO_ADDRESS]
+
+
+def test_measure_profile(gov, vault, token, strategy, keeper, chain):
+    chain.sleep(1)
+    strategy.harvest({"from": keeper})
+    debt = vault.strategies(strategy).dict()["totalDebt"]
+
+    profile = measure_profile(vault, token, strategy)
+    assert profile.debt == debt
+    assert profile.free == debt  # NOTE: `TestStrategy` just holds `want`
+    assert profile.loss_bps == 0
+    assert profile.gas > 0
+
+    strategy._takeFunds(debt // 10, {"from": gov})
+    profile = measure_profile(vault, token, strategy)
+    assert profile.free == debt - debt // 10
+    assert profile.loss_bps == 10_000  # Everything past what it holds is lost
@@ -0,0 +1,68 @@
+import pytest
+
+
+@pytest.fixture
+def lens(gov, StrategyLens):
+    yield gov.deploy(StrategyLens)
+
+
+@pytest.fixture
+def strategies(gov, vault, strategist, keeper, strategy, TestStrategy):
+    strategies = [strategy]
+    for _ in range(2):
+        strategy = strategist.deploy(TestStrategy)
+        strategy.initialize(vault, strategist, strategist, keeper)
+        vault.addStrategy(strategy, 1_000, 0, 2 ** 256 - 1, 1000, {"from": gov})
+        strategies.append(strategy)
+    yield strategies
+
+
+def direct_reads(vault, strategy):
+    return {
+        "strategy": strategy.address,
+        "vault": vault.address,
+        "keeper": strategy.keeper(),
+        "params": vault.strategies(strategy),
+        "debtOutstanding": vault.debtOutstanding(strategy),
+        "creditAvailable": vault.creditAvailable(strategy),
+        "estimatedTotalAssets": strategy.estimatedTotalAssets(),
+        "emergencyExit": strategy.emergencyExit(),
+        "minReportDelay": strategy.minReportDelay(),
+        "maxReportDelay": strategy.maxReportDelay(),
+        "profitFactor": strategy.profitFactor(),
+        "debtThreshold": strategy.debtThreshold(),
+    }
+
+
+def test_strategy_state(gov, vault, token, strategy, keeper, lens, chain):
+    assert lens.strategyState(strategy).dict() == direct_reads(vault, strategy)
+
+    chain.sleep(1)
+    strategy.harvest({"from": keeper})
+    token.transfer(strategy, 10 ** token.decimals(), {"from": gov})
+    vault.updateStrategyDebtRatio(strategy, 1_000, {"from": gov})
+    strategy.setEmergencyExit({"from": gov})
+    state = lens.strategyState(strategy).dict()
+    assert state == direct_reads(vault, strategy)
+    assert state["emergencyExit"]
+    assert state["debtOutstanding"] > 0
+
+
+def test_strategy_states(vault, lens, strategies):
+    states = lens.strategyStates(strategies)
+    assert [state.dict() for state in states] == [
+        direct_reads(vault, strategy) for strategy in strategies
+    ]
+    assert lens.strategyStates([]) == []
+
+
+def test_vault_strategy_states(gov, create_vault, token, vault, lens, strategies):
+    states = lens.vaultStrategyStates(vault)
+    assert [state["strategy"] for state in states] == strategies
+
+    # Only the withdrawal queue is read
+    vault.removeStrategyFromQueue(strategies[1], {"from": gov})
+    states = lens.vaultStrategyStates(vault)
+    assert [state["strategy"] for state in states] == [strategies[0], strategies[2]]
+
+    assert lens.vaultStrategyStates(create_vault(token)) == []
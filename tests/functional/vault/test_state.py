@@ -0,0 +1,61 @@
+import pytest
+from brownie import ZERO_ADDRESS
+
+MAXIMUM_STRATEGIES = 20
+
+
+@pytest.fixture
+def strategies(gov, vault, strategist, keeper, strategy, TestStrategy):
+    strategies = [strategy]
+    for _ in range(2):
+        strategy = strategist.deploy(TestStrategy)
+        strategy.initialize(vault, strategist, strategist, keeper)
+        vault.addStrategy(strategy, 1_000, 0, 2 ** 256 - 1, 1000, {"from": gov})
+        strategies.append(strategy)
+    yield strategies
+
+
+def check_state(vault):
+    state = vault.vaultState().dict()
+    assert state["totalAssets"] == vault.totalAssets()
+    assert state["totalDebt"] == vault.totalDebt()
+    assert state["debtRatio"] == vault.debtRatio()
+    assert state["lockedProfit"] == vault.lockedProfit()
+    assert state["lockedProfitDegradation"] == vault.lockedProfitDegradation()
+    assert state["lastReport"] == vault.lastReport()
+    assert state["totalSupply"] == vault.totalSupply()
+
+    queue = [vault.withdrawalQueue(i) for i in range(MAXIMUM_STRATEGIES)]
+    assert list(state["withdrawalQueue"]) == queue
+    num_strategies = state["numStrategies"]
+    assert ZERO_ADDRESS not in queue[:num_strategies]
+    assert set(queue[num_strategies:]) <= {ZERO_ADDRESS}
+    return state
+
+
+def test_vault_state(gov, vault, token, keeper, strategies, chain):
+    state = check_state(vault)
+    assert list(state["withdrawalQueue"][:3]) == strategies
+
+    # Reports move debt and lock up profit
+    chain.sleep(1)
+    for strategy in strategies:
+        strategy.harvest({"from": keeper})
+    token.transfer(strategies[0], 10 ** token.decimals(), {"from": gov})
+    chain.sleep(1)
+    strategies[0].harvest({"from": keeper})
+    state = check_state(vault)
+    assert state["totalDebt"] > 0
+    assert state["lockedProfit"] > 0
+
+    # Only the active withdrawal queue is returned
+    vault.removeStrategyFromQueue(strategies[1], {"from": gov})
+    state = check_state(vault)
+    assert state["numStrategies"] == 2
+    assert list(state["withdrawalQueue"][:2]) == [strategies[0], strategies[2]]
+
+
+def test_vault_state_without_strategies(create_vault, token):
+    state = check_state(create_vault(token))
+    assert state["numStrategies"] == 0
+    assert state["totalAssets"] == 0
@@ -0,0 +1,232 @@
+from brownie.exceptions import VirtualMachineError
+from brownie.test import strategy
+
+from scripts.vault_model.chain import mismatches
+from scripts.vault_model.strategy import TestStrategyModel
+from scripts.vault_model.vault import MAX_BPS, VaultModel, VaultRevert
+
+MAX_UINT256 = 2 ** 256 - 1
+
+
+class DifferentialOperation:
+    """
+    Drives the same random operations through the Vault and the Python model
+    of it, checking after each one that they still agree exactly.
+    """
+
+    st_user = strategy("uint256", max_value=2)
+    st_strategy = strategy("uint256", max_value=1)
+    st_bps = strategy("uint256", min_value=1, max_value=MAX_BPS)
+    st_max_loss = strategy("uint256", max_value=MAX_BPS)
+    st_sleep = strategy("uint256", min_value=1, max_value=7 * 24 * 60 * 60)
+    st_debt_ratio = strategy("uint256", max_value=MAX_BPS)
+    st_bool = strategy("bool")
+    # NOTE: Past the limits too, so both sides have to revert together
+    st_performance_fee = strategy("uint256", max_value=MAX_BPS // 2 + 100)
+    st_management_fee = strategy("uint256", max_value=MAX_BPS + 100)
+    st_withdrawal_fee = strategy("uint256", max_value=60)
+
+    def __init__(self, chain, token, vault, strategies, users, andre, gov, keeper):
+        self.chain = chain
+        self.token = token
+        self.vault = vault
+        self.strategies = strategies
+        self.users = users
+        self.andre = andre
+        self.gov = gov
+        self.keeper = keeper
+        self.rewards = vault.rewards()
+        self.holders = [u.address for u in users] + [s.address for s in strategies]
+        self.holders.append(self.rewards)
+
+    def setup(self):
+        # NOTE: The chain is reverted before each run, so start a fresh model
+        self.model = VaultModel(
+            self.vault.activation(),
+            decimals=self.vault.decimals(),
+            address=self.vault.address,
+            rewards=self.rewards,
+        )
+        self.strategy_models = []
+        for strategy in self.strategies:
+            params = self.vault.strategies(strategy).dict()
+            strategy_model = TestStrategyModel(strategy.address, self.model)
+            self.model.add_strategy(
+                strategy_model,
+                params["debtRatio"],
+                params["minDebtPerHarvest"],
+                params["maxDebtPerHarvest"],
+                params["performanceFee"],
+                params["activation"],
+            )
+            self.strategy_models.append(strategy_model)
+
+    def transact(self, send, model_call):
+        try:
+            tx = send()
+        except VirtualMachineError:
+            tx = None
+        timestamp = self.chain.time() if tx is None else tx.timestamp
+
+        try:
+            result = model_call(timestamp)
+        except VaultRevert as e:
+            assert tx is None, f"Only the model reverted: {e}"
+            return None, None
+        assert tx is not None, "Only the Vault reverted"
+        return tx, result
+
+    def rule_deposit(self, user="st_user", bps="st_bps"):
+        user = self.users[user]
+        amount = self.token.balanceOf(user) * bps // MAX_BPS
+        if amount == 0:
+            return
+        print(f"  Vault.deposit({amount})")
+
+        tx, shares = self.transact(
+            lambda: self.vault.deposit(amount, {"from": user}),
+            lambda timestamp: self.model.deposit(user.address, amount, timestamp),
+        )
+        if tx is not None:
+            assert tx.return_value == shares
+
+    def rule_withdraw(self, user="st_user", bps="st_bps", max_loss="st_max_loss"):
+        user = self.users[user]
+        shares = self.vault.balanceOf(user) * bps // MAX_BPS
+        if shares == 0:
+            return
+        print(f"  Vault.withdraw({shares}, maxLoss={max_loss})")
+
+        user_balance = self.token.balanceOf(user)
+        rewards_balance = self.token.balanceOf(self.rewards)
+        tx, withdrawal = self.transact(
+            lambda: self.vault.withdraw(shares, user, max_loss, {"from": user}),
+            lambda timestamp: self.model.withdraw(
+                user.address, timestamp, shares, max_loss
+            ),
+        )
+        if tx is not None:
+            assert tx.return_value == withdrawal.value
+            assert self.token.balanceOf(user) - user_balance == (
+                withdrawal.value - withdrawal.fee
+            )
+            assert (
+                self.token.balanceOf(self.rewards) - rewards_balance == withdrawal.fee
+            )
+
+    def rule_harvest(
+        self, index="st_strategy", gain="st_bool", bps="st_bps", sleep="st_sleep"
+    ):
+        strategy = self.strategies[index]
+        strategy_model = self.strategy_models[index]
+
+        # Make or lose up to 10% of what the Strategy holds
+        amount = self.token.balanceOf(strategy) * bps // MAX_BPS // 10
+        if gain:
+            print(f"  Strategy.harvest() with a gain of {amount}")
+            self.token.transfer(strategy, amount, {"from": self.andre})
+            strategy_model.balance += amount
+        else:
+            print(f"  Strategy.harvest() with a loss of {amount}")
+            strategy._takeFunds(amount, {"from": self.andre})
+            strategy_model.take_funds(amount)
+
+        self.chain.sleep(sleep)
+        tx, profit = self.transact(
+            lambda: strategy.harvest({"from": self.keeper}),
+            lambda timestamp: strategy_model.harvest(timestamp),
+        )
+        if tx is not None:
+            assert tx.return_value == profit
+
+    def rule_update_debt_ratio(self, index="st_strategy", debt_ratio="st_debt_ratio"):
+        strategy = self.strategies[index]
+        print(f"  Vault.updateStrategyDebtRatio({debt_ratio})")
+        self.transact(
+            lambda: self.vault.updateStrategyDebtRatio(
+                strategy, debt_ratio, {"from": self.gov}
+            ),
+            lambda _: self.model.update_strategy_debt_ratio(
+                strategy.address, debt_ratio
+            ),
+        )
+
+    def rule_emergency_exit(self, index="st_strategy"):
+        print("  Strategy.setEmergencyExit()")
+        self.transact(
+            lambda: self.strategies[index].setEmergencyExit({"from": self.gov}),
+            lambda _: self.strategy_models[index].set_emergency_exit(),
+        )
+
+    def rule_emergency_shutdown(self, active="st_bool"):
+        print(f"  Vault.setEmergencyShutdown({active})")
+        self.transact(
+            lambda: self.vault.setEmergencyShutdown(active, {"from": self.gov}),
+            lambda _: self.model.set_emergency_shutdown(active),
+        )
+
+    def rule_set_fees(
+        self,
+        performance_fee="st_performance_fee",
+        management_fee="st_management_fee",
+        withdrawal_fee="st_withdrawal_fee",
+    ):
+        print(f"  Vault fees: {performance_fee}, {management_fee}, {withdrawal_fee}")
+        self.transact(
+            lambda: self.vault.setPerformanceFee(performance_fee, {"from": self.gov}),
+            lambda _: self.model.set_performance_fee(performance_fee),
+        )
+        self.transact(
+            lambda: self.vault.setManagementFee(management_fee, {"from": self.gov}),
+            lambda _: self.model.set_management_fee(management_fee),
+        )
+        self.transact(
+            lambda: self.vault.setWithdrawalFee(withdrawal_fee, {"from": self.gov}),
+            lambda _: self.model.set_withdrawal_fee(withdrawal_fee),
+        )
+
+    def invariant_model_matches_vault(self):
+        assert mismatches(self.model, self.vault, self.token, self.holders) == {}
+
+        # NOTE: Views are evaluated at the latest block
+        block = self.chain[-1]
+        assert self.vault.pricePerShare(
+            block_identifier=block.number
+        ) == self.model.price_per_share(block.timestamp)
+
+
+def test_model_matches_vault(
+    accounts,
+    chain,
+    gov,
+    andre,
+    keeper,
+    strategist,
+    token,
+    vault,
+    TestStrategy,
+    state_machine,
+):
+    strategies = []
+    for debt_ratio in (4_000, 3_000):
+        strategy = strategist.deploy(TestStrategy)
+        strategy.initialize(vault, strategist, strategist, keeper, {"from": strategist})
+        vault.addStrategy(strategy, debt_ratio, 0, MAX_UINT256, 1_000, {"from": gov})
+        strategies.append(strategy)
+
+    users = accounts[6:9]
+    for user in users:
+        token.transfer(user, token.totalSupply() // 100, {"from": andre})
+        token.approve(vault, MAX_UINT256, {"from": user})
+
+    state_machine(
+        DifferentialOperation,
+        chain,
+        token,
+        vault,
+        strategies,
+        users,
+        andre,
+        gov,
+        keeper,
+    )